@@ -1,10 +1,22 @@
+import argparse
 import ast
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FormatStrFormatter
 
+from src.run_log import RunLogReader, RUN_LOG_FIELDS
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot the results of the evolutionary algorithm")
+    parser.add_argument("--follow", metavar="RUN_LOG", help="Plot the run log of a running run and update the plot while it grows")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between two updates when following a run log")
+    arguments = parser.parse_args()
+
+    if arguments.follow is not None:
+        follow_run_log(arguments.follow, arguments.interval)
+        return
+
     data_standard = list(np.array(read_list_from_log("results_benchmark/2025_01_24T15_19_10_standard.log")) / 10000000)
     data_baldwinian = list(np.array(read_list_from_log("results_benchmark/2025_01_24T16_29_48_baldwinian.log")) / 10000000)
     data_lamarckian = list(np.array(read_list_from_log("results_benchmark/2025_01_24T16_30_47_lamarckian.log")) / 10000000)
@@ -89,6 +101,15 @@ def pad_list_to_length(data_list, target_length):
 
 
 def read_list_from_log(file_path):
+    """
+    Read the best fitness of each generation from a run log (see src/run_log.py) or from a log of the former format,
+    holding the whole history as a list literal on its second line.
+    """
+    with open(file_path, 'r') as file:
+        is_run_log = file.readline().strip() == ",".join(RUN_LOG_FIELDS)
+    if is_run_log:
+        return [record.best_fitness for record in RunLogReader(file_path).read()]
+
     with open(file_path, 'r') as file:
         lines = file.readlines()
         # Assuming the list is on the second line
@@ -96,5 +117,37 @@ def read_list_from_log(file_path):
     return data_list
 
 
+def follow_run_log(file_path, interval):
+    """
+    Plot the best, mean and worst fitness of a run log and append the records written since the last update every
+    interval seconds, until the window is closed.
+    """
+    reader = RunLogReader(file_path)
+    generations, best, mean, worst = [], [], [], []
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    best_line, = ax.plot([], [], label='Best')
+    mean_line, = ax.plot([], [], label='Mean')
+    worst_line, = ax.plot([], [], label='Worst')
+    ax.set_title(file_path)
+    ax.set_xlabel('Generation')
+    ax.set_ylabel('Fitness')
+    ax.legend()
+
+    while plt.fignum_exists(fig.number):
+        records = reader.read()
+        if records:
+            generations.extend(record.generation for record in records)
+            best.extend(record.best_fitness for record in records)
+            mean.extend(record.mean_fitness for record in records)
+            worst.extend(record.worst_fitness for record in records)
+            best_line.set_data(generations, best)
+            mean_line.set_data(generations, mean)
+            worst_line.set_data(generations, worst)
+            ax.relim()
+            ax.autoscale_view()
+        plt.pause(interval)
+
+
 if __name__ == '__main__':
     main()
@@ -1,52 +1,334 @@
-import datetime
-import sys
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields, replace
+from typing import Any, Iterable, Iterator, NamedTuple
 
-from src.main import run_evolution_algorithm
-from src import config
+import numpy as np
+
+from src.solver import Solver, SolverConfig, local_search_functions
 
 VARIANTS_FOR_BENCHMARK = ["standard", "baldwinian", "lamarckian"]
 PROBLEMS_TO_BENCHMARK = ["bur26a.dat", "chr18b.dat", "nug16a.dat", "tai60a.dat", "tai256c.dat"]
+NUMBER_OF_SEEDS = 5
+
+# Further SolverConfig fields to vary, e.g. {"mutation_prob": [0.1, 0.3]}. Every combination is run
+HYPERPARAMETER_GRID: dict[str, list] = {}
+
+# Environment variables limiting the threads of the BLAS libraries. Each cell runs in its own process, so threaded
+# BLAS in every worker would oversubscribe the cores
+BLAS_THREAD_VARIABLES = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                         "NUMEXPR_NUM_THREADS"]
+
+# Columns of the summary table, see summarize
+SUMMARY_FIELDS = ("variant", "problem", "hyperparameters", "runs", "best_fitness", "mean_fitness", "std_fitness",
+                  "best_time_to_solution", "mean_time_to_solution", "std_time_to_solution", "mean_total_time")
+
+
+class Cell(NamedTuple):
+    """
+    One run of the grid: a variant with its hyperparameters on a problem with a seed.
+    """
+    variant: str
+    problem: str
+    seed: int
+    hyperparameters: tuple[tuple[str, Any], ...]
+    config: SolverConfig
+
+    @property
+    def name(self) -> str:
+        """
+        :return: The name of the cell, unique within a grid and used for its files
+        """
+        hyperparameters = "".join(f"_{name}={value}" for name, value in self.hyperparameters)
+        return f"{self.variant}_{self.problem.removesuffix('.dat')}{hyperparameters}_seed{self.seed}"
 
 
 def main():
     """
-    Main function to run the benchmark
-    """
-    fitness_function_str = "bulk_basic"
-    selection_function_str = "roulette_wheel"
-    recombination_function_str = "partially_mapped"
-    mutation_function_str = "swap"
-
-    for variant in VARIANTS_FOR_BENCHMARK:
-        if variant == "standard":
-            monkeypatch_config("POPULATION_SIZE", 100)
-            monkeypatch_config("NUMBER_OF_GENERATIONS", 1000)
-            monkeypatch_config("MUTATION_PROB", 0.3)
-        if variant == "baldwinian" or variant == "lamarckian":
-            monkeypatch_config("POPULATION_SIZE", 20)
-            monkeypatch_config("NUMBER_OF_GENERATIONS", 250)
-            monkeypatch_config("MUTATION_PROB", 0.1)
-        for problem in PROBLEMS_TO_BENCHMARK:
-            date = datetime.datetime.now().strftime('%Y_%m_%dT%H_%M_%S')
-            num = int(''.join(filter(str.isdigit, problem.split('.')[0])))
-            monkeypatch_config("NUMBER_OF_FACILITIES", num)
-            run_evolution_algorithm(variant, fitness_function_str, selection_function_str, recombination_function_str,
-                                    mutation_function_str, date, problem, "results_benchmark")
-
-
-def monkeypatch_config(key, value):
-    """
-    Monkeypatch the config module and all modules that imported it. This is necessary to change the config values for the benchmark
-    :param key: The key/name of the config value to change
-    :param value: The desired value of the config key
-    """
-    # Patch the value in the config module
-    setattr(config, key, value)
-
-    # Update the attribute in all modules that imported it
-    for module in sys.modules.values():
-        if hasattr(module, key):
-            setattr(module, key, value)
+    Run the benchmark grid (skipping cells finished before) and print the summary table
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the variants on several problems, seeds and hyperparameters")
+    parser.add_argument("--folder", default="results_benchmark", help="Folder for the results of the cells and the summary")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of cells run in parallel")
+    parser.add_argument("--seeds", type=int, default=NUMBER_OF_SEEDS, help="Number of seeds per combination")
+    parser.add_argument("--variants", nargs="*", default=VARIANTS_FOR_BENCHMARK, help="Variants to benchmark")
+    parser.add_argument("--problems", nargs="*", default=PROBLEMS_TO_BENCHMARK, help="Problems to benchmark")
+    parser.add_argument("--local-search", nargs="+", choices=local_search_functions,
+                        help="Local searches of the memetic variants to compare, the one of SolverConfig by default")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="FIELD=VALUE[,VALUE...]",
+                        help="Vary a SolverConfig field over the given values, may be repeated")
+    parser.add_argument("--summary-only", action="store_true", help="Only summarize the finished cells")
+    arguments = parser.parse_args()
+
+    grid = dict(HYPERPARAMETER_GRID)
+    if arguments.local_search is not None:
+        grid["local_search_function"] = arguments.local_search
+    grid.update(parse_setting(setting) for setting in arguments.settings)
+    if not arguments.summary_only:
+        # Progress bars of parallel cells would only garble the output
+        cells = grid_cells(arguments.variants, arguments.problems, range(arguments.seeds), grid, SolverConfig(progress_bar=False))
+        run_grid(cells, arguments.folder, arguments.workers)
+
+    summary = summarize(load_cell_results(arguments.folder))
+    write_summary(summary, f"{arguments.folder}/summary.csv")
+    print_summary(summary)
+
+
+def benchmark_config(base_config: SolverConfig, variant: str) -> SolverConfig:
+    """
+    Set the hyperparameters used to benchmark a variant. The number of facilities is taken from each instance.
+    :param base_config: The configuration providing the functions and the remaining parameters
+    :param variant: The variant to benchmark
+    :return: The configuration of the variant
+    """
+    if variant == "standard":
+        return replace(base_config, variant=variant, population_size=100, number_of_generations=1000, mutation_prob=0.3)
+    return replace(base_config, variant=variant, population_size=20, number_of_generations=250, mutation_prob=0.1)
+
+
+def grid_cells(
+        variants: list[str],
+        problems: list[str],
+        seeds: Iterable[int],
+        hyperparameter_grid: dict[str, list],
+        base_config: SolverConfig = SolverConfig()
+) -> list[Cell]:
+    """
+    Build the cells of the grid, that is, every combination of variant, problem, seed and hyperparameter values.
+    :param variants: The variants, see benchmark_config
+    :param problems: The file names of the problems
+    :param seeds: The seeds
+    :param hyperparameter_grid: The values of further SolverConfig fields, overriding those of benchmark_config
+    :param base_config: The configuration providing the functions and the remaining parameters
+    :return: A list containing the cells
+    """
+    names = sorted(hyperparameter_grid)
+    combinations = [tuple(zip(names, values)) for values in itertools.product(*(hyperparameter_grid[name] for name in names))]
+    cells = []
+    for variant, problem, seed, hyperparameters in itertools.product(variants, problems, seeds, combinations):
+        config = replace(benchmark_config(base_config, variant), seed=seed, **dict(hyperparameters))
+        cells.append(Cell(variant, problem, seed, hyperparameters, config))
+    return cells
+
+
+def run_grid(cells: list[Cell], folder: str, number_of_workers: int) -> int:
+    """
+    Run the cells whose result is not in folder/cells yet, in a pool of number_of_workers processes (or in this process
+    if number_of_workers is 1). The workers are started with limited BLAS threads, see BLAS_THREAD_VARIABLES. Since a
+    result is written only once its cell finished, an interrupted grid continues with the unfinished cells.
+    :param cells: The cells of the grid, see grid_cells
+    :param folder: The folder for the results
+    :param number_of_workers: The number of cells run in parallel
+    :return: The number of cells run
+    """
+    os.makedirs(f"{folder}/cells", exist_ok=True)
+    pending = [cell for cell in cells if not os.path.exists(cell_result_path(folder, cell))]
+    print(f"{len(cells) - len(pending)} of {len(cells)} cells are finished, running {len(pending)}")
+
+    if number_of_workers <= 1:
+        for cell in pending:
+            print(f"Finished {cell.name}: {run_cell(cell, folder)['best_fitness']}")
+        return len(pending)
+
+    # Spawned workers load numpy (and with it BLAS) after the environment variables are set, forked ones would not
+    with limited_blas_threads():
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=number_of_workers, mp_context=context) as executor:
+            futures = {executor.submit(run_cell, cell, folder): cell for cell in pending}
+            for future in as_completed(futures):
+                print(f"Finished {futures[future].name}: {future.result()['best_fitness']}")
+    return len(pending)
+
+
+@contextlib.contextmanager
+def limited_blas_threads(number_of_threads: int = 1) -> Iterator[None]:
+    """
+    Context manager setting the BLAS thread limits (see BLAS_THREAD_VARIABLES) for the processes started in its body.
+    :param number_of_threads: The number of threads per process
+    """
+    previous = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+    os.environ.update({name: str(number_of_threads) for name in BLAS_THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+
+def run_cell(cell: Cell, folder: str) -> dict:
+    """
+    Solve the problem of a cell and write its result to folder/cells/{name}.json. The output of the solver is written
+    to folder/cells/{name}.out and the statistics of each generation to the run log folder/cells/{name}_run.csv.
+    :param cell: The cell to run
+    :param folder: The folder for the results
+    :return: The result of the cell
+    """
+    prefix = f"{folder}/cells/{cell.name}"
+    start_time = time.perf_counter()
+    with open(f"{prefix}.out", "w") as output, contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        result = Solver(cell.config).solve(cell.problem, run_log_path=f"{prefix}_run.csv")
+    total_time = time.perf_counter() - start_time
+
+    cell_result = {
+        "variant": cell.variant,
+        "problem": cell.problem,
+        "seed": cell.seed,
+        "hyperparameters": dict(cell.hyperparameters),
+        "best_fitness": int(result.best_fitness),
+        "time_to_solution": time_to_solution(result.best_fitness_each_generation, result.time_per_generation),
+        "total_time": total_time,
+        "number_of_generations_run": len(result.time_per_generation),
+        "stop_reason": result.stop_reason,
+        "best_chromosome": [int(gene) for gene in result.best_chromosome],
+    }
+    write_json_atomically(cell_result_path(folder, cell), cell_result)
+    return cell_result
+
+
+def cell_result_path(folder: str, cell: Cell) -> str:
+    """
+    :param folder: The folder for the results
+    :param cell: The cell
+    :return: The path of the result of the cell
+    """
+    return f"{folder}/cells/{cell.name}.json"
+
+
+def time_to_solution(best_fitness_each_generation: list[float], time_per_generation: list[float]) -> float:
+    """
+    :param best_fitness_each_generation: The best fitness of the initial population and of each generation
+    :param time_per_generation: The time of each generation in seconds
+    :return: The time spent in the generations until the best fitness of the run was first reached
+    """
+    return float(np.sum(time_per_generation[:int(np.argmin(best_fitness_each_generation))]))
+
+
+def write_json_atomically(path: str, content: dict):
+    """
+    Write JSON to a temporary file first and then move it to path, such that path only exists once it is complete.
+    :param path: The path of the file
+    :param content: The content to write
+    """
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump(content, file, indent=2)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def load_cell_results(folder: str) -> list[dict]:
+    """
+    :param folder: The folder of the grid
+    :return: The results of all finished cells in folder/cells
+    """
+    cells_folder = f"{folder}/cells"
+    if not os.path.isdir(cells_folder):
+        return []
+    results = []
+    for file_name in sorted(os.listdir(cells_folder)):
+        if file_name.endswith(".json"):
+            with open(f"{cells_folder}/{file_name}") as file:
+                results.append(json.load(file))
+    return results
+
+
+def summarize(cell_results: list[dict]) -> list[dict]:
+    """
+    Aggregate the results of the cells over the seeds. The standard deviations are sample standard deviations (0 for a
+    single run).
+    :param cell_results: The results of the cells, see run_cell
+    :return: One row per variant, problem and hyperparameter values, with the columns SUMMARY_FIELDS
+    """
+    groups: dict[tuple, list[dict]] = {}
+    for cell_result in cell_results:
+        hyperparameters = ";".join(f"{name}={value}" for name, value in sorted(cell_result["hyperparameters"].items()))
+        groups.setdefault((cell_result["variant"], cell_result["problem"], hyperparameters), []).append(cell_result)
+
+    summary = []
+    for (variant, problem, hyperparameters), results in sorted(groups.items()):
+        fitness = np.array([result["best_fitness"] for result in results], dtype=np.float64)
+        times_to_solution = np.array([result["time_to_solution"] for result in results])
+        degrees_of_freedom = 1 if len(results) > 1 else 0
+        summary.append({
+            "variant": variant,
+            "problem": problem,
+            "hyperparameters": hyperparameters,
+            "runs": len(results),
+            "best_fitness": int(np.min(fitness)),
+            "mean_fitness": float(np.mean(fitness)),
+            "std_fitness": float(np.std(fitness, ddof=degrees_of_freedom)),
+            "best_time_to_solution": float(np.min(times_to_solution)),
+            "mean_time_to_solution": float(np.mean(times_to_solution)),
+            "std_time_to_solution": float(np.std(times_to_solution, ddof=degrees_of_freedom)),
+            "mean_total_time": float(np.mean([result["total_time"] for result in results])),
+        })
+    return summary
+
+
+def write_summary(summary: list[dict], path: str):
+    """
+    Write the summary table as CSV.
+    :param summary: The rows of the summary, see summarize
+    :param path: The path of the file
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        file.write(",".join(SUMMARY_FIELDS) + "\n")
+        for row in summary:
+            file.write(",".join(str(row[field]) for field in SUMMARY_FIELDS) + "\n")
+
+
+def print_summary(summary: list[dict]):
+    """
+    Print the summary table with aligned columns.
+    :param summary: The rows of the summary, see summarize
+    """
+    rows = [SUMMARY_FIELDS] + [tuple(format_value(row[field]) for field in SUMMARY_FIELDS) for row in summary]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(SUMMARY_FIELDS))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def format_value(value: Any) -> str:
+    """
+    :param value: A value of the summary
+    :return: The value as shown in the printed table
+    """
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value) if value != "" else "-"
+
+
+def parse_setting(setting: str) -> tuple[str, list]:
+    """
+    Parse a hyperparameter setting of the command line, converting the values to the type of the SolverConfig field.
+    :param setting: The setting, e.g. "mutation_prob=0.1,0.3"
+    :return: A tuple of the field name and the list of values
+    """
+    name, _, values = setting.partition("=")
+    field_types = {field.name: field.type for field in fields(SolverConfig)}
+    if name not in field_types or not values:
+        raise ValueError(f"Invalid setting {setting}, expected FIELD=VALUE[,VALUE...] with a field of SolverConfig")
+
+    field_type = field_types[name]
+    if field_type is bool:
+        return name, [value.lower() in ("1", "true", "yes") for value in values.split(",")]
+    if field_type not in (int, float, str):
+        raise ValueError(f"Field {name} of type {field_type} cannot be set from the command line")
+    return name, [field_type(value) for value in values.split(",")]
 
 
 if __name__ == "__main__":
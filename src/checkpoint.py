@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from typing import NamedTuple
+
+import numpy as np
+from numpy import ndarray
+
+# Version of the checkpoint format, increased on incompatible changes
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint(NamedTuple):
+    """
+    State of basic_evolution_loop before a generation, sufficient to continue the run bit-for-bit.
+    """
+    generation: int
+    population: ndarray
+    population_fitness: ndarray
+    best_fitness_each_generation: list[float]
+    time_per_generation: list[float]
+    random_state: tuple
+    cache_state: dict[str, ndarray]
+    run_parameters: dict
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint):
+    """
+    Write a checkpoint as an uncompressed .npz file. The file is written to a temporary file in the same folder first
+    and then moved to path, such that path always holds a complete checkpoint, even if the process is killed.
+    :param path: The path of the checkpoint file
+    :param checkpoint: The checkpoint to write
+    """
+    algorithm, keys, position, has_gauss, cached_gaussian = checkpoint.random_state
+    arrays = {
+        "version": np.array(CHECKPOINT_VERSION),
+        "generation": np.array(checkpoint.generation),
+        "population": checkpoint.population,
+        "population_fitness": checkpoint.population_fitness,
+        "best_fitness_each_generation": np.array(checkpoint.best_fitness_each_generation, dtype=np.int64),
+        "time_per_generation": np.array(checkpoint.time_per_generation, dtype=np.float64),
+        "random_algorithm": np.array(algorithm),
+        "random_keys": keys,
+        "random_position": np.array(position),
+        "random_has_gauss": np.array(has_gauss),
+        "random_cached_gaussian": np.array(cached_gaussian),
+        "run_parameters": np.array(json.dumps(checkpoint.run_parameters)),
+    }
+    arrays.update({f"cache_{name}": value for name, value in checkpoint.cache_state.items()})
+
+    folder = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=folder, prefix=".checkpoint_", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            np.savez(file, **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    """
+    Read a checkpoint written by save_checkpoint.
+    :param path: The path of the checkpoint file
+    :return: The checkpoint
+    """
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["version"]) != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {int(data['version'])} in {path}")
+
+        random_state = (str(data["random_algorithm"]), data["random_keys"], int(data["random_position"]),
+                        int(data["random_has_gauss"]), float(data["random_cached_gaussian"]))
+        cache_state = {name.removeprefix("cache_"): data[name] for name in data.files if name.startswith("cache_")}
+        return Checkpoint(
+            generation=int(data["generation"]),
+            population=data["population"],
+            population_fitness=data["population_fitness"],
+            best_fitness_each_generation=list(data["best_fitness_each_generation"]),
+            time_per_generation=list(data["time_per_generation"]),
+            random_state=random_state,
+            cache_state=cache_state,
+            run_parameters=json.loads(str(data["run_parameters"])),
+        )
@@ -5,6 +5,47 @@ NUMBER_OF_FACILITIES: int = 256
 MUTATION_PROB: float = 0.1
 TOURNAMENT_SIZE: int = 10
 NUMBER_OF_ITERATIONS_FOR_OPT: int = 1
+NUMBER_OF_MOVES_FOR_BATCHED_OPT: int = 500
+LOCAL_SEARCH_CHUNK_SIZE: int = 16
+# Flow and location neighbours per position scanned by two_opt_dont_look_bits, 0 scans all positions
+CANDIDATE_LIST_SIZE: int = 0
+# Iterations and seconds (0 disables the time limit) of robust_tabu_search per individual
+TABU_SEARCH_ITERATIONS: int = 100
+TABU_SEARCH_TIME_BUDGET: float = 0
+# Swaps sampled by simulated_annealing per individual, its start and end temperature relative to the mean absolute
+# delta cost of the chromosome's swaps and its cooling schedule, see cooling_schedules
+SIMULATED_ANNEALING_MOVES: int = 5000
+SIMULATED_ANNEALING_INITIAL_TEMPERATURE: float = 0.1
+SIMULATED_ANNEALING_FINAL_TEMPERATURE: float = 0.01
+COOLING_SCHEDULE: str = "geometric"
+LOCAL_SEARCH_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+# Performance
+NUMBER_OF_WORKERS: int = 1
+KERNEL_BACKEND: str = "numpy"
+FITNESS_CHUNK_SIZE: int = 16
+# Flow matrices with at most this fraction of nonzero entries use the sparse kernels (see run_sparse_flow), 0 disables them
+SPARSE_FLOW_DENSITY: float = 0.25
+INCREMENTAL_EVALUATION: bool = True
+# Profile the run with cProfile (--profile), see run_evolution_algorithm
+PROFILE: bool = False
+# Show a progress bar of the local search of each generation (imports tqdm), see local_search_each
+PROGRESS_BAR: bool = True
+
+# Stopping criteria ending a run before NUMBER_OF_GENERATIONS, 0 disables a criterion
+TIME_BUDGET: float = 0  # seconds spent in generations
+TARGET_FITNESS: int = 0  # e.g. the best known solution of the instance
+MAX_GENERATIONS_WITHOUT_IMPROVEMENT: int = 0
+MAX_FITNESS_EVALUATIONS: int = 0
+
+# Checkpoints (every CHECKPOINT_INTERVAL generations, 0 disables them)
+CHECKPOINT_INTERVAL: int = 50
+
+# Island model (used if NUMBER_OF_ISLANDS > 1, each island has POPULATION_SIZE individuals)
+NUMBER_OF_ISLANDS: int = 1
+MIGRATION_INTERVAL: int = 25
+NUMBER_OF_MIGRANTS: int = 2
+MIGRATION_TOPOLOGY: str = "ring"
 
 # Testing
 TESTING: bool = False
@@ -0,0 +1,89 @@
+import importlib.util
+import warnings
+from functools import partial
+from typing import Callable, NamedTuple
+
+from numpy import ndarray
+
+from src.config import KERNEL_BACKEND
+from src.evolutionary_tools.fitness_function import basic_fitness_function, sparse_fitness_function
+from src.evolutionary_tools.greedy_optimizations import two_opt, calculate_delta_cost_numpy, calculate_delta_cost_symmetric, \
+    calculate_delta_cost_sparse
+from src.evolutionary_tools.sparse_flow import SparseFlow
+
+
+class KernelBackend(NamedTuple):
+    """
+    The kernels of one backend. All backends compute the same results, they only differ in speed.
+    """
+    name: str
+    delta_cost: Callable[[ndarray, ndarray, ndarray, int, int], float]
+    two_opt: Callable[[ndarray, ndarray, ndarray], ndarray]
+    fitness: Callable[[ndarray, ndarray, ndarray], float]
+
+
+NUMPY_BACKEND = KernelBackend("numpy", calculate_delta_cost_numpy, two_opt, basic_fitness_function)
+SYMMETRIC_NUMPY_BACKEND = KernelBackend("numpy", calculate_delta_cost_symmetric, partial(two_opt, symmetric=True),
+                                        basic_fitness_function)
+
+
+def available_backends() -> list[str]:
+    """
+    :return: The names of the backends that can be used in this environment
+    """
+    backends = ["numpy"]
+    if importlib.util.find_spec("numba") is not None:
+        backends.append("numba")
+    return backends
+
+
+def get_backend(name: str | None = None, symmetric: bool = False, sparse_flow: SparseFlow | None = None) -> KernelBackend:
+    """
+    Get the kernels of a backend. The "numba" backend provides compiled loops and falls back to the "numpy" backend
+    (with a warning) if numba is not installed.
+    :param name: Name of the backend, KERNEL_BACKEND by default
+    :param symmetric: Whether to get the delta cost and two_opt kernels specialized for symmetric instances (see
+    is_symmetric_instance), which compute the same results with about half the arithmetic. The fitness of a single
+    chromosome is computed by the general kernel, gathering only half of the distances does not pay off there
+    (see bulk_symmetric_fitness_function for populations)
+    :param sparse_flow: Optional flow matrix in sparse form (see run_sparse_flow) to get the kernels iterating over the
+    nonzero flows only. The compiled symmetric delta cost kernel streams through contiguous rows and is faster than the
+    sparse one at the densities of the QAPLIB instances, so numba uses the sparse delta cost for asymmetric instances only
+    :return: The kernels of the backend
+    """
+    if name is None:
+        name = KERNEL_BACKEND
+
+    match name:
+        case "numpy":
+            return _numpy_backend(symmetric, sparse_flow)
+        case "numba":
+            try:
+                from src.evolutionary_tools.numba_kernels import numba_calculate_delta_cost, numba_two_opt, \
+                    numba_basic_fitness_function, numba_calculate_delta_cost_symmetric, numba_calculate_delta_cost_sparse, \
+                    numba_sparse_fitness_function
+            except ImportError:
+                warnings.warn("numba is not installed, falling back to the numpy backend")
+                return _numpy_backend(symmetric, sparse_flow)
+            fitness = numba_basic_fitness_function
+            if sparse_flow is not None:
+                fitness = partial(numba_sparse_fitness_function, sparse_flow=sparse_flow)
+            if symmetric:
+                return KernelBackend("numba", numba_calculate_delta_cost_symmetric, partial(numba_two_opt, symmetric=True),
+                                     fitness)
+            if sparse_flow is not None:
+                return KernelBackend("numba", partial(numba_calculate_delta_cost_sparse, sparse_flow=sparse_flow),
+                                     partial(numba_two_opt, sparse_flow=sparse_flow), fitness)
+            return KernelBackend("numba", numba_calculate_delta_cost, numba_two_opt, fitness)
+
+    raise ValueError(f"Invalid kernel backend provided: {name}")
+
+
+def _numpy_backend(symmetric: bool, sparse_flow: SparseFlow | None) -> KernelBackend:
+    """
+    :return: The numpy kernels for the instance, see get_backend
+    """
+    if sparse_flow is not None:
+        return KernelBackend("numpy", partial(calculate_delta_cost_sparse, sparse_flow=sparse_flow),
+                             partial(two_opt, sparse_flow=sparse_flow), partial(sparse_fitness_function, sparse_flow=sparse_flow))
+    return SYMMETRIC_NUMPY_BACKEND if symmetric else NUMPY_BACKEND
@@ -1,13 +1,21 @@
 import numpy as np
 from numpy import ndarray
+from numpy.random import RandomState
 
+from src.evolutionary_tools.dtypes import permutation_dtype
+from src.evolutionary_tools.random_state import resolve_random_state
 
-def generate_random_chromosomes(number_of_chromosomes: int, number_of_facilities: int) -> ndarray:
+
+def generate_random_chromosomes(number_of_chromosomes: int, number_of_facilities: int, random_state: RandomState | None = None) -> ndarray:
     """
     Generate random chromosomes. Individual chromosomes are represented as a one-dimensional numpy array (permutation list)
-    and generated using np.random.permutation.
+    and generated using random_state.permutation. The chromosomes are stored in the narrowest type holding their genes,
+    see permutation_dtype.
     :param number_of_chromosomes: The number of chromosomes to generate
     :param number_of_facilities: The number of facilities (length of the permutation)
+    :param random_state: The random number generator, the global one by default
     :return: A two-dimensional numpy array representing the list of chromosomes
     """
-    return np.array([np.random.permutation(np.arange(number_of_facilities)) for i in range(number_of_chromosomes)])
+    random_state = resolve_random_state(random_state)
+    return np.array([random_state.permutation(np.arange(number_of_facilities)) for i in range(number_of_chromosomes)],
+                    dtype=permutation_dtype(number_of_facilities))
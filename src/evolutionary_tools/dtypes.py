@@ -0,0 +1,42 @@
+import numpy as np
+from numpy import ndarray
+
+# Candidate storage types from narrowest to widest. Nonnegative values are stored unsigned, others signed
+UNSIGNED_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+SIGNED_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def narrowest_dtype(minimum: int, maximum: int) -> np.dtype:
+    """
+    Choose the narrowest integer type holding all values from minimum to maximum. Arrays of this type are only used for
+    storage and gathering, all kernels accumulate (and subtract) in int64, such that a narrow type cannot overflow.
+    :param minimum: The smallest value to hold
+    :param maximum: The largest value to hold
+    :return: The integer type
+    """
+    for dtype in UNSIGNED_DTYPES if minimum >= 0 else SIGNED_DTYPES:
+        information = np.iinfo(dtype)
+        if information.min <= minimum and maximum <= information.max:
+            return np.dtype(dtype)
+    raise ValueError(f"No integer type holds the values from {minimum} to {maximum}")
+
+
+def compact_matrix(matrix: ndarray) -> ndarray:
+    """
+    Store a flow or distance matrix in the narrowest type holding its entries, e.g. uint8 for the 0/1 flows of tai256c,
+    which reduces the memory traffic of the gathers in the fitness functions and local searches.
+    :param matrix: Two-dimensional integer numpy array
+    :return: The matrix in the narrowest type (the matrix itself if it already has this type)
+    """
+    if matrix.size == 0:
+        return matrix
+    return matrix.astype(narrowest_dtype(int(matrix.min()), int(matrix.max())), copy=False)
+
+
+def permutation_dtype(length: int) -> np.dtype:
+    """
+    :param length: The length of the permutations, i.e. the number of facilities
+    :return: The narrowest type holding the values of a permutation of the given length, uint8 up to 256 facilities
+    and uint16 up to 65536
+    """
+    return narrowest_dtype(0, max(length - 1, 0))
@@ -1,8 +1,15 @@
+from functools import lru_cache, partial
+from typing import Callable
+
 import numpy as np
 from numpy import ndarray
-from tqdm import tqdm
 
-from src.evolutionary_tools.greedy_optimizations import two_opt
+from src.config import NUMBER_OF_WORKERS, FITNESS_CHUNK_SIZE, PROGRESS_BAR
+from src.evolutionary_tools.greedy_optimizations import two_opt, bulk_two_opt, apply_local_search
+from src.evolutionary_tools.local_search_cache import LocalSearchCache, chromosome_key
+from src.evolutionary_tools.metrics import current_metrics
+from src.evolutionary_tools.parallel import WorkerPool, parallel_optimize, in_worker_process
+from src.evolutionary_tools.sparse_flow import SparseFlow, build_sparse_flow, flow_edges
 
 
 def basic_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray) -> float:
@@ -13,22 +20,197 @@ def basic_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chrom
     :param chromosome: One-dimensional numpy array representing the chromosome
     :return: The fitness value of the chromosome
     """
-    return np.sum(flow_matrix * distance_matrix[chromosome[:, np.newaxis], chromosome[np.newaxis, :]])
+    return np.multiply(flow_matrix, distance_matrix[chromosome[:, np.newaxis], chromosome[np.newaxis, :]], dtype=np.int64).sum()
 
 
 def bulk_basic_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chromosomes: ndarray, final: bool = False, generation: int = 0) -> tuple[ndarray, ndarray]:
     """
-    Calculate the fitness value of multiple chromosomes at once.
+    Calculate the fitness value of multiple chromosomes at once. The chromosomes are processed in chunks of
+    FITNESS_CHUNK_SIZE. For each chunk the permuted distance matrices are gathered and multiplied with the flattened
+    flow matrix in a single matrix-vector product, such that the memory used is O(FITNESS_CHUNK_SIZE * n^2)
+    independent of the number of chromosomes.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosomes: Three-dimensional numpy array representing the chromosomes
+    :param final: Boolean indicating if this is the final fitness calculation. Unused for this function
+    :return: One-dimensional numpy array containing the fitness values of the chromosomes
+    """
+    flattened_flow = flow_matrix.ravel().astype(np.int64)
+    fitness_values = np.empty(len(chromosomes), dtype=np.int64)
+    for start in range(0, len(chromosomes), FITNESS_CHUNK_SIZE):
+        chunk = chromosomes[start:start + FITNESS_CHUNK_SIZE]
+        permuted_distance = distance_matrix[chunk[:, :, np.newaxis], chunk[:, np.newaxis, :]]
+        fitness_values[start:start + FITNESS_CHUNK_SIZE] = permuted_distance.reshape(len(chunk), -1) @ flattened_flow
+    return chromosomes, fitness_values
+
+
+def bulk_symmetric_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chromosomes: ndarray, final: bool = False, generation: int = 0) -> tuple[ndarray, ndarray]:
+    """
+    Calculate the fitness value of multiple chromosomes of a symmetric instance (see is_symmetric_instance) at once like
+    bulk_basic_fitness_function. Since each pair of facilities contributes twice the same cost and the diagonal
+    contributes nothing, only the distances of the pairs above the diagonal are gathered and multiplied with twice the
+    flows, which halves the memory traffic and the arithmetic.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosomes: Three-dimensional numpy array representing the chromosomes
+    :param final: Boolean indicating if this is the final fitness calculation. Unused for this function
+    :return: One-dimensional numpy array containing the fitness values of the chromosomes
+    """
+    n = chromosomes.shape[1]
+    rows, columns = upper_triangle_indices(n)
+    doubled_flow = 2 * flow_matrix[rows, columns].astype(np.int64)
+    flattened_distance = distance_matrix.ravel()
+    fitness_values = np.empty(len(chromosomes), dtype=np.int64)
+    for start in range(0, len(chromosomes), FITNESS_CHUNK_SIZE):
+        chunk = chromosomes[start:start + FITNESS_CHUNK_SIZE]
+        # Flat indices in intp, the product overflows the narrow type of the chromosomes
+        flat_indices = chunk[:, rows].astype(np.intp) * n + chunk[:, columns]
+        fitness_values[start:start + FITNESS_CHUNK_SIZE] = flattened_distance[flat_indices] @ doubled_flow
+    return chromosomes, fitness_values
+
+
+def sparse_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, sparse_flow: SparseFlow | None = None) -> float:
+    """
+    Calculate the fitness value of a single chromosome from the nonzero flows only, costing O(nnz) instead of O(n^2).
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosome: One-dimensional numpy array representing the chromosome
+    :param sparse_flow: The flow matrix in sparse form, built from flow_matrix if not given
+    :return: The fitness value of the chromosome
+    """
+    if sparse_flow is None:
+        sparse_flow = build_sparse_flow(flow_matrix)
+    sources, targets, weights = flow_edges(sparse_flow)
+    return distance_matrix.ravel()[chromosome[sources].astype(np.intp) * len(chromosome) + chromosome[targets]] @ weights
+
+
+def bulk_sparse_fitness_function(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        final: bool = False,
+        generation: int = 0,
+        sparse_flow: SparseFlow | None = None
+) -> tuple[ndarray, ndarray]:
+    """
+    Calculate the fitness value of multiple chromosomes at once like bulk_basic_fitness_function, but gather only the
+    distances between the facilities connected by a nonzero flow (see flow_edges). The work and memory traffic scale
+    with the number of nonzero flows instead of n^2, which pays off for sparse flow matrices such as that of tai256c.
     :param flow_matrix: Two-dimensional numpy array representing the flow matrix
     :param distance_matrix: Two-dimensional numpy array representing the distance matrix
     :param chromosomes: Three-dimensional numpy array representing the chromosomes
     :param final: Boolean indicating if this is the final fitness calculation. Unused for this function
+    :param sparse_flow: The flow matrix in sparse form, built from flow_matrix if not given
+    :return: One-dimensional numpy array containing the fitness values of the chromosomes
+    """
+    if sparse_flow is None:
+        sparse_flow = build_sparse_flow(flow_matrix)
+    sources, targets, weights = flow_edges(sparse_flow)
+    n = chromosomes.shape[1]
+    flattened_distance = distance_matrix.ravel()
+    fitness_values = np.empty(len(chromosomes), dtype=np.int64)
+    for start in range(0, len(chromosomes), FITNESS_CHUNK_SIZE):
+        chunk = chromosomes[start:start + FITNESS_CHUNK_SIZE]
+        flat_indices = chunk[:, sources].astype(np.intp) * n + chunk[:, targets]
+        fitness_values[start:start + FITNESS_CHUNK_SIZE] = flattened_distance[flat_indices] @ weights
+    return chromosomes, fitness_values
+
+
+@lru_cache(maxsize=8)
+def upper_triangle_indices(n: int) -> tuple[ndarray, ndarray]:
+    """
+    :param n: The number of facilities
+    :return: The row and column indices of the entries above the diagonal of an n x n matrix
+    """
+    return np.triu_indices(n, 1)
+
+
+def bulk_incremental_fitness_function(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        reference_chromosomes: ndarray,
+        reference_fitness: ndarray,
+        chromosomes: ndarray,
+        changed_positions: ndarray
+) -> ndarray:
+    """
+    Calculate the fitness values of multiple chromosomes from the known fitness values of reference chromosomes they
+    only differ from in a few positions (e.g. the parents of children). Only the terms of the fitness involving the k
+    changed positions are recomputed, costing O(k * n) per chromosome instead of O(n^2). Chromosomes which differ in
+    more than an eighth of the positions are evaluated from scratch with bulk_basic_fitness_function.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param reference_chromosomes: Two-dimensional numpy array representing the reference chromosomes
+    :param reference_fitness: One-dimensional numpy array containing the fitness values of the reference chromosomes
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes to evaluate
+    :param changed_positions: Two-dimensional boolean numpy array marking the positions in which the chromosomes
+    (possibly) differ from their reference chromosomes
+    :return: One-dimensional numpy array containing the fitness values of the chromosomes
+    """
+    number_of_changes = changed_positions.sum(axis=1)
+    # Beyond about n / 8 changed positions, gathering the affected rows and columns costs more than a full evaluation
+    full_evaluation = number_of_changes > chromosomes.shape[1] // 8
+    fitness_values = np.asarray(reference_fitness, dtype=np.int64).copy()
+
+    if np.any(full_evaluation):
+        fitness_values[full_evaluation] = bulk_basic_fitness_function(flow_matrix, distance_matrix, chromosomes[full_evaluation])[1]
+
+    incremental = np.flatnonzero(~full_evaluation & (number_of_changes > 0))
+    for chunk in np.array_split(incremental, max(1, -(-len(incremental) // FITNESS_CHUNK_SIZE))):
+        if len(chunk) == 0:
+            continue
+        fitness_values[chunk] += (cost_involving_positions(flow_matrix, distance_matrix, chromosomes[chunk], changed_positions[chunk]) -
+                                  cost_involving_positions(flow_matrix, distance_matrix, reference_chromosomes[chunk], changed_positions[chunk]))
+    return fitness_values
+
+
+def cost_involving_positions(flow_matrix: ndarray, distance_matrix: ndarray, chromosomes: ndarray, positions: ndarray) -> ndarray:
+    """
+    Calculate for each chromosome the part of its fitness consisting of the terms flow[k, l] * distance[p[k], p[l]] in
+    which k or l is one of the given positions of the chromosome.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes
+    :param positions: Two-dimensional boolean numpy array marking the positions of each chromosome
+    :return: One-dimensional numpy array containing the sum of the terms involving the positions of each chromosome
+    """
+    # All (chromosome, position) pairs, the terms of each pair are gathered in one row
+    chromosome_index, position = np.nonzero(positions)
+    location = chromosomes[chromosome_index, position]
+    row_terms = flow_matrix[position, :].astype(np.int64) * distance_matrix[location[:, np.newaxis], chromosomes[chromosome_index]]
+    column_terms = flow_matrix[:, position].T.astype(np.int64) * distance_matrix[chromosomes[chromosome_index], location[:, np.newaxis]]
+    # Terms with both indices in the positions are contained in the rows and the columns
+    both_terms = np.where(positions[chromosome_index], row_terms, 0)
+    pair_costs = row_terms.sum(axis=1) + column_terms.sum(axis=1) - both_terms.sum(axis=1)
+    costs = np.zeros(len(chromosomes), dtype=np.int64)
+    np.add.at(costs, chromosome_index, pair_costs)
+    return costs
+
+
+def lookup_population_fitness(population: ndarray, population_fitness: ndarray, chromosomes: ndarray) -> ndarray:
+    """
+    Look up the fitness values of chromosomes taken from the population (e.g. by selection) without evaluating them.
+    :param population: Two-dimensional numpy array representing the population
+    :param population_fitness: One-dimensional numpy array containing the fitness values of the population
+    :param chromosomes: Two-dimensional numpy array representing chromosomes contained in the population
     :return: One-dimensional numpy array containing the fitness values of the chromosomes
     """
-    return chromosomes, np.sum(flow_matrix[np.newaxis, :, :] * distance_matrix[chromosomes[:, :, np.newaxis], chromosomes[:, np.newaxis, :]], axis=(1, 2))
+    fitness_by_chromosome = {chromosome.tobytes(): fitness for chromosome, fitness in zip(population, population_fitness)}
+    return np.array([fitness_by_chromosome[chromosome.tobytes()] for chromosome in chromosomes])
 
 
-def bulk_basic_fitness_function_baldwinian(flow_matrix: ndarray, distance_matrix: ndarray, chromosomes: ndarray, final: bool = False, generation: int = 0) -> tuple[ndarray, ndarray]:
+def bulk_basic_fitness_function_baldwinian(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        final: bool = False,
+        generation: int = 0,
+        local_search_function: Callable[[ndarray, ndarray, ndarray], ndarray] = two_opt,
+        cache: LocalSearchCache | None = None,
+        number_of_workers: int | None = None,
+        progress_bar: bool | None = None,
+        worker_pool: WorkerPool | None = None
+) -> tuple[ndarray, ndarray]:
     """
     Calculate the fitness value of multiple chromosomes using Baldwinian evolution with 2-opt.
     :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
@@ -36,34 +218,274 @@ def bulk_basic_fitness_function_baldwinian(flow_matrix: ndarray, distance_matrix
     :param chromosomes: Three-dimensional numpy array representing the chromosomes.
     :param final: Boolean indicating if this is the final fitness calculation.
     In the case of final == True, the optimized chromosomes will be returned instead.
+    :param generation: The current generation, used for the progress bar.
+    :param local_search_function: The local search used to optimize the chromosomes, two_opt by default.
+    :param cache: The cache for the local search results, None to only skip duplicates within the chromosomes.
+    :param number_of_workers: The number of worker processes for the local search, NUMBER_OF_WORKERS by default.
+    :param worker_pool: The pool of worker processes for the local search, see parallel_map.
+    :param progress_bar: Whether to show a progress bar of the local search, PROGRESS_BAR by default.
     :return: One-dimensional numpy array containing the fitness values of the chromosomes.
     """
-    optimized_routes = chromosomes.copy()
-
-    progress_bar_range = enumerate(tqdm(chromosomes, desc=f"Generation: {generation}"))
-    for index, chromosome in progress_bar_range:
-        optimized_routes[index] = two_opt(flow_matrix, distance_matrix, chromosome)
+    optimized_routes, fitness_values = optimize_population(
+        flow_matrix, distance_matrix, chromosomes,
+        lambda missing: local_search_each(flow_matrix, distance_matrix, missing, local_search_function, generation, number_of_workers,
+                                          progress_bar=progress_bar, worker_pool=worker_pool),
+        cache)
 
     if final:
-        return bulk_basic_fitness_function(flow_matrix, distance_matrix, optimized_routes)
+        return optimized_routes, fitness_values
     else:
-        fitness_values = bulk_basic_fitness_function(flow_matrix, distance_matrix, optimized_routes)[1]
         return chromosomes, fitness_values
 
 
-def bulk_basic_fitness_function_lamarckian(flow_matrix: ndarray, distance_matrix: ndarray, chromosomes: ndarray, final: bool = False, generation: int = 0) -> tuple[ndarray, ndarray]:
+def bulk_basic_fitness_function_lamarckian(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        final: bool = False,
+        generation: int = 0,
+        local_search_function: Callable[[ndarray, ndarray, ndarray], ndarray] = two_opt,
+        cache: LocalSearchCache | None = None,
+        number_of_workers: int | None = None,
+        changed_positions: ndarray | None = None,
+        progress_bar: bool | None = None,
+        worker_pool: WorkerPool | None = None
+) -> tuple[ndarray, ndarray]:
     """
     Calculate the fitness value of multiple chromosomes using Lamarckian evolution with 2-opt.
     :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
     :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
     :param chromosomes: Three-dimensional numpy array representing the chromosomes.
     :param final: Boolean indicating if this is the final fitness calculation. Unused for this function
+    :param generation: The current generation, used for the progress bar.
+    :param local_search_function: The local search used to optimize the chromosomes, two_opt by default.
+    :param cache: The cache for the local search results, None to only skip duplicates within the chromosomes.
+    :param number_of_workers: The number of worker processes for the local search, NUMBER_OF_WORKERS by default.
+    :param worker_pool: The pool of worker processes for the local search, see parallel_map.
+    :param changed_positions: Optional two-dimensional boolean numpy array marking the positions in which each
+    chromosome differs from its reference parent, see track_changes_to_parents. Since the parents are locally
+    optimized, the other positions start with their don't-look bits set, which requires a local search taking
+    dont_look_bits such as two_opt_dont_look_bits.
+    :param progress_bar: Whether to show a progress bar of the local search, PROGRESS_BAR by default.
+    :return: One-dimensional numpy array containing the fitness values of the chromosomes.
+    """
+    return optimize_population(
+        flow_matrix, distance_matrix, chromosomes,
+        lambda missing, dont_look_bits=None: local_search_each(flow_matrix, distance_matrix, missing, local_search_function,
+                                                               generation, number_of_workers, dont_look_bits, progress_bar,
+                                                               worker_pool),
+        cache, None if changed_positions is None else ~changed_positions)
+
+
+def bulk_batched_fitness_function_baldwinian(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        final: bool = False,
+        generation: int = 0,
+        best_improvement: bool = True,
+        number_of_moves: int | None = None,
+        cache: LocalSearchCache | None = None,
+        number_of_workers: int | None = None,
+        worker_pool: WorkerPool | None = None
+) -> tuple[ndarray, ndarray]:
+    """
+    Calculate the fitness value of multiple chromosomes using Baldwinian evolution with 2-opt, optimizing the whole
+    population at once with bulk_two_opt instead of one chromosome at a time.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param final: Boolean indicating if this is the final fitness calculation.
+    In the case of final == True, the optimized chromosomes will be returned instead.
+    :param generation: The current generation. Unused for this function
+    :param best_improvement: Whether bulk_two_opt performs best improving swaps instead of first improving ones.
+    :param number_of_moves: Maximum number of swaps per chromosome, NUMBER_OF_MOVES_FOR_BATCHED_OPT by default.
+    :param cache: The cache for the local search results, None to only skip duplicates within the chromosomes.
+    :param number_of_workers: The number of worker processes for the local search, NUMBER_OF_WORKERS by default.
+    :param worker_pool: The pool of worker processes for the local search, see parallel_map.
+    :return: One-dimensional numpy array containing the fitness values of the chromosomes.
+    """
+    optimized_routes, fitness_values = optimize_population(
+        flow_matrix, distance_matrix, chromosomes,
+        lambda missing: bulk_local_search(flow_matrix, distance_matrix, missing, best_improvement, number_of_workers, number_of_moves,
+                                          worker_pool),
+        cache)
+
+    if final:
+        return optimized_routes, fitness_values
+    else:
+        return chromosomes, fitness_values
+
+
+def bulk_batched_fitness_function_lamarckian(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        final: bool = False,
+        generation: int = 0,
+        best_improvement: bool = True,
+        number_of_moves: int | None = None,
+        cache: LocalSearchCache | None = None,
+        number_of_workers: int | None = None,
+        worker_pool: WorkerPool | None = None
+) -> tuple[ndarray, ndarray]:
+    """
+    Calculate the fitness value of multiple chromosomes using Lamarckian evolution with 2-opt, optimizing the whole
+    population at once with bulk_two_opt instead of one chromosome at a time.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param final: Boolean indicating if this is the final fitness calculation. Unused for this function
+    :param generation: The current generation. Unused for this function
+    :param best_improvement: Whether bulk_two_opt performs best improving swaps instead of first improving ones.
+    :param number_of_moves: Maximum number of swaps per chromosome, NUMBER_OF_MOVES_FOR_BATCHED_OPT by default.
+    :param cache: The cache for the local search results, None to only skip duplicates within the chromosomes.
+    :param number_of_workers: The number of worker processes for the local search, NUMBER_OF_WORKERS by default.
+    :param worker_pool: The pool of worker processes for the local search, see parallel_map.
     :return: One-dimensional numpy array containing the fitness values of the chromosomes.
     """
-    optimized_routes = np.zeros_like(chromosomes)
-    progress_bar_range = enumerate(tqdm(chromosomes, desc=f"Generation: {generation}"))
+    return optimize_population(
+        flow_matrix, distance_matrix, chromosomes,
+        lambda missing: bulk_local_search(flow_matrix, distance_matrix, missing, best_improvement, number_of_workers, number_of_moves,
+                                          worker_pool),
+        cache)
+
+
+def optimize_population(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        optimize_chromosomes: Callable[[ndarray], ndarray],
+        cache: LocalSearchCache | None = None,
+        dont_look_bits: ndarray | None = None
+) -> tuple[ndarray, ndarray]:
+    """
+    Apply a local search to multiple chromosomes and calculate the fitness of the optimized chromosomes. Results are
+    looked up in and stored to the cache, such that chromosomes which have been optimized before (e.g. the elite and
+    duplicates carried over between generations) as well as duplicates within the chromosomes skip the local search.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param optimize_chromosomes: Function applying the local search to a two-dimensional array of chromosomes
+    :param cache: The cache for the local search results, None to only skip duplicates within the chromosomes
+    :param dont_look_bits: Optional two-dimensional boolean numpy array of the don't-look bits of each chromosome. If
+    provided, optimize_chromosomes is called with the bits of the chromosomes to optimize as second argument, and the
+    results are cached per chromosome and bits, see chromosome_key
+    :return: A tuple of the optimized chromosomes and their fitness values
+    """
+    optimized_routes = np.empty_like(chromosomes)
+    fitness_values = np.empty(len(chromosomes), dtype=np.int64)
+
+    # Group the chromosomes by key to look up and optimize duplicates only once
+    indices_by_key: dict[bytes, list[int]] = {}
+    for index, chromosome in enumerate(chromosomes):
+        key = chromosome_key(chromosome, None if dont_look_bits is None else dont_look_bits[index])
+        indices_by_key.setdefault(key, []).append(index)
+
+    missing_keys = []
+    for key, indices in indices_by_key.items():
+        cached = None if cache is None else cache.lookup(key)
+        if cached is None:
+            missing_keys.append(key)
+        else:
+            optimized_routes[indices], fitness_values[indices] = cached
+    metrics = current_metrics()
+    metrics.count("cache_hits", len(indices_by_key) - len(missing_keys))
+    metrics.count("cache_misses", len(missing_keys))
+
+    if len(missing_keys) > 0:
+        missing_indices = [indices_by_key[key][0] for key in missing_keys]
+        metrics.count("local_searches", len(missing_keys))
+        with metrics.phase("local_search"):
+            if dont_look_bits is None:
+                optimized_missing = optimize_chromosomes(chromosomes[missing_indices])
+            else:
+                optimized_missing = optimize_chromosomes(chromosomes[missing_indices], dont_look_bits[missing_indices])
+        fitness_missing = bulk_basic_fitness_function(flow_matrix, distance_matrix, optimized_missing)[1]
+        for key, optimized_chromosome, fitness in zip(missing_keys, optimized_missing, fitness_missing):
+            optimized_routes[indices_by_key[key]], fitness_values[indices_by_key[key]] = optimized_chromosome, fitness
+            if cache is not None:
+                cache.store(key, optimized_chromosome, fitness)
+
+    return optimized_routes, fitness_values
+
+
+def local_search_each(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        local_search_function: Callable[[ndarray, ndarray, ndarray], ndarray],
+        generation: int = 0,
+        number_of_workers: int | None = None,
+        dont_look_bits: ndarray | None = None,
+        progress_bar: bool | None = None,
+        worker_pool: WorkerPool | None = None
+) -> ndarray:
+    """
+    Apply a local search to each chromosome one after another, optionally showing a progress bar. If number_of_workers is larger
+    than one, the chromosomes are distributed over a pool of worker processes instead, unless the caller already is a
+    worker process (e.g. evolving an island).
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param local_search_function: The local search to apply to each chromosome
+    :param generation: The current generation, used for the progress bar.
+    :param number_of_workers: The number of worker processes, NUMBER_OF_WORKERS by default.
+    :param dont_look_bits: Optional two-dimensional boolean numpy array of the initial don't-look bits of each
+    chromosome, passed on to the local search, see two_opt_dont_look_bits.
+    :param progress_bar: Whether to show a progress bar, PROGRESS_BAR by default. tqdm is only imported if it is shown.
+    :param worker_pool: The pool of worker processes, see parallel_map.
+    :return: Two-dimensional numpy array containing the optimized chromosomes
+    """
+    if number_of_workers is None:
+        number_of_workers = NUMBER_OF_WORKERS
+    if progress_bar is None:
+        progress_bar = PROGRESS_BAR
+    if number_of_workers > 1 and not in_worker_process():
+        return parallel_optimize(flow_matrix, distance_matrix, chromosomes,
+                                 partial(apply_local_search, local_search_function=local_search_function), number_of_workers,
+                                 dont_look_bits, worker_pool)
+
+    optimized_routes = np.empty_like(chromosomes)
+    if progress_bar:
+        from tqdm import tqdm
+        progress_bar_range = enumerate(tqdm(chromosomes, desc=f"Generation: {generation}"))
+    else:
+        progress_bar_range = enumerate(chromosomes)
     for index, chromosome in progress_bar_range:
-        optimized_routes[index] = two_opt(flow_matrix, distance_matrix, chromosome)
+        if dont_look_bits is None:
+            optimized_routes[index] = local_search_function(flow_matrix, distance_matrix, chromosome)
+        else:
+            optimized_routes[index] = local_search_function(flow_matrix, distance_matrix, chromosome,
+                                                            dont_look_bits=dont_look_bits[index])
+    return optimized_routes
 
-    return bulk_basic_fitness_function(flow_matrix, distance_matrix, optimized_routes)
 
+def bulk_local_search(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        best_improvement: bool = True,
+        number_of_workers: int | None = None,
+        number_of_moves: int | None = None,
+        worker_pool: WorkerPool | None = None
+) -> ndarray:
+    """
+    Apply bulk_two_opt to the chromosomes. If number_of_workers is larger than one, the chromosomes are distributed
+    over a pool of worker processes, unless the caller already is a worker process.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param best_improvement: Whether bulk_two_opt performs best improving swaps instead of first improving ones.
+    :param number_of_workers: The number of worker processes, NUMBER_OF_WORKERS by default.
+    :param number_of_moves: Maximum number of swaps per chromosome, NUMBER_OF_MOVES_FOR_BATCHED_OPT by default.
+    :param worker_pool: The pool of worker processes, see parallel_map.
+    :return: Two-dimensional numpy array containing the optimized chromosomes
+    """
+    if number_of_workers is None:
+        number_of_workers = NUMBER_OF_WORKERS
+    if number_of_workers > 1 and not in_worker_process():
+        return parallel_optimize(flow_matrix, distance_matrix, chromosomes,
+                                 partial(bulk_two_opt, best_improvement=best_improvement, number_of_moves=number_of_moves),
+                                 number_of_workers, worker_pool=worker_pool)
+    return bulk_two_opt(flow_matrix, distance_matrix, chromosomes, best_improvement, number_of_moves=number_of_moves)
@@ -1,57 +1,647 @@
+import time
+import zlib
+from functools import partial
+from typing import Callable, NamedTuple
+
 import numpy as np
 from numpy import ndarray
+from numpy.random import RandomState
 
-from src.config import NUMBER_OF_ITERATIONS_FOR_OPT
-
-
-CACHE_FOR_OPTIMIZATION = []
-NUM_CACHE_HITS = 0
+from src.config import NUMBER_OF_ITERATIONS_FOR_OPT, LOCAL_SEARCH_CHUNK_SIZE, NUMBER_OF_MOVES_FOR_BATCHED_OPT, \
+    TABU_SEARCH_ITERATIONS, TABU_SEARCH_TIME_BUDGET, SIMULATED_ANNEALING_MOVES, SIMULATED_ANNEALING_INITIAL_TEMPERATURE, \
+    SIMULATED_ANNEALING_FINAL_TEMPERATURE, COOLING_SCHEDULE
+from src.evolutionary_tools.metrics import current_metrics
+from src.evolutionary_tools.sparse_flow import SparseFlow
 
 
-def two_opt(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray) -> ndarray:
+def two_opt(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        number_of_iterations: int | None = None,
+        symmetric: bool = False,
+        sparse_flow: SparseFlow | None = None
+) -> ndarray:
     """
-    Perform a 2-opt optimization on a given chromosome using delta costs to determine if a swap is beneficial and
-    caching unoptimizable chromosomes for future function calls.
+    Perform a 2-opt optimization on a given chromosome using delta costs to determine if a swap is beneficial.
+    Results are cached by the fitness functions, see local_search_cache.
     :param chromosome: One-dimensional numpy array representing a single chromosome.
     :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
     :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param number_of_iterations: Maximum number of passes over all pairs, NUMBER_OF_ITERATIONS_FOR_OPT by default.
+    :param symmetric: Whether the instance is symmetric (see is_symmetric_instance), such that the delta costs can be
+    calculated with calculate_delta_cost_symmetric. The same swaps are performed either way.
+    :param sparse_flow: Optional flow matrix in sparse form, such that the delta costs are calculated with
+    calculate_delta_cost_sparse instead. The same swaps are performed either way.
     :return: Optimized chromosome as a numpy array.
     """
-    global NUM_CACHE_HITS
+    if number_of_iterations is None:
+        number_of_iterations = NUMBER_OF_ITERATIONS_FOR_OPT
+    if sparse_flow is not None:
+        delta_cost = partial(calculate_delta_cost_sparse, sparse_flow=sparse_flow)
+    else:
+        delta_cost = calculate_delta_cost_symmetric if symmetric else calculate_delta_cost_numpy
     best_chromosome = chromosome.copy()
     n = len(chromosome)
     improved = True
-    improved_changed = False
-    cache_hit = False
     number_of_iteration = 0
+    number_of_swaps = 0
 
-    # Check for cache hit
-    for chromosome in CACHE_FOR_OPTIMIZATION:
-        if np.array_equal(chromosome, best_chromosome):
-            NUM_CACHE_HITS += 1
-            improved_changed = True
-            cache_hit = True
-
-    while improved and number_of_iteration < NUMBER_OF_ITERATIONS_FOR_OPT and not cache_hit:
+    while improved and number_of_iteration < number_of_iterations:
         number_of_iteration += 1
         improved = False
         for i in range(1, n - 1):
             for j in range(i + 1, n):
-                cost_delta = calculate_delta_cost_numpy(flow_matrix, distance_matrix, best_chromosome, i, j)
+                cost_delta = delta_cost(flow_matrix, distance_matrix, best_chromosome, i, j)
                 if cost_delta < 0:
                     # Perform the 2-opt swap
                     tmp = best_chromosome[j]
                     best_chromosome[j] = best_chromosome[i]
                     best_chromosome[i] = tmp
                     improved = True
-                    improved_changed = True
+                    number_of_swaps += 1
+
+    count_local_search(number_of_iteration, number_of_iteration * (n - 2) * (n - 1) // 2, number_of_swaps)
+    return best_chromosome
+
+
+def count_local_search(iterations: int, delta_evaluations: int, accepted_swaps: int):
+    """
+    Add the work of a local search to the counters of the current metrics.
+    :param iterations: The number of passes over the neighbourhood (or lockstep steps of bulk_two_opt)
+    :param delta_evaluations: The number of delta costs computed or updated
+    :param accepted_swaps: The number of swaps performed
+    """
+    metrics = current_metrics()
+    metrics.count("local_search_iterations", iterations)
+    metrics.count("delta_evaluations", delta_evaluations)
+    metrics.count("accepted_swaps", accepted_swaps)
+
+
+def apply_local_search(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        local_search_function: Callable[[ndarray, ndarray, ndarray], ndarray],
+        dont_look_bits: ndarray | None = None
+) -> ndarray:
+    """
+    Apply a local search to each of the chromosomes.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param local_search_function: The local search to apply to each chromosome, e.g. two_opt.
+    :param dont_look_bits: Optional two-dimensional boolean numpy array of the initial don't-look bits of each
+    chromosome, passed on to the local search, see two_opt_dont_look_bits.
+    :return: Two-dimensional numpy array containing the optimized chromosomes.
+    """
+    optimized_chromosomes = np.empty_like(chromosomes)
+    for index, chromosome in enumerate(chromosomes):
+        if dont_look_bits is None:
+            optimized_chromosomes[index] = local_search_function(flow_matrix, distance_matrix, chromosome)
+        else:
+            optimized_chromosomes[index] = local_search_function(flow_matrix, distance_matrix, chromosome,
+                                                                 dont_look_bits=dont_look_bits[index])
+    return optimized_chromosomes
+
+
+def two_opt_delta_matrix(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, number_of_iterations: int | None = None) -> ndarray:
+    """
+    Perform a 2-opt optimization on a given chromosome like two_opt, but keep the delta costs of all swaps in a delta
+    matrix. The matrix is computed once per chromosome and updated after each accepted swap instead of recomputing the
+    delta cost of every pair. The pairs are visited in the same order as in two_opt, such that the same swaps are
+    accepted and the same local optimum is reached (given exact delta costs, see calculate_delta_matrix).
+    :param chromosome: One-dimensional numpy array representing a single chromosome.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param number_of_iterations: Maximum number of passes over all pairs, NUMBER_OF_ITERATIONS_FOR_OPT by default.
+    :return: Optimized chromosome as a numpy array.
+    """
+    if number_of_iterations is None:
+        number_of_iterations = NUMBER_OF_ITERATIONS_FOR_OPT
+    best_chromosome = chromosome.copy()
+    n = len(chromosome)
+
+    # Work on a batch of size one to share the update code with the bulk kernels
+    chromosomes = best_chromosome[np.newaxis, :]
+    permuted_distance = permute_distance_matrix(distance_matrix, chromosomes)
+    delta_matrix = calculate_delta_rows(flow_matrix, permuted_distance, np.arange(n)[np.newaxis, :])
+
+    improved = True
+    number_of_iteration = 0
+    number_of_swaps = 0
+    while improved and number_of_iteration < number_of_iterations:
+        number_of_iteration += 1
+        improved = False
+        for i in range(1, n - 1):
+            j = i + 1
+            while j < n:
+                # Find the next improving swap partner of i in scan order
+                improving = np.flatnonzero(delta_matrix[0, i, j:] < 0)
+                if len(improving) == 0:
+                    break
+                j += improving[0]
+                swap_and_update_delta_matrix(delta_matrix, flow_matrix, distance_matrix, chromosomes,
+                                             permuted_distance, np.array([i]), np.array([j]))
+                improved = True
+                number_of_swaps += 1
+                j += 1
+
+    # The delta matrix is computed once and every swap updates all of its entries
+    count_local_search(number_of_iteration, (1 + number_of_swaps) * n * n, number_of_swaps)
+    return best_chromosome
+
+
+# Range of the tabu tenure of robust_tabu_search relative to the number of facilities (Taillard, 1991)
+TABU_TENURE_RANGE = (0.9, 1.1)
+# A move is forced if it was not made for this many iterations times the squared number of facilities
+TABU_ASPIRATION_FACTOR = 5
+
+
+def robust_tabu_search(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        number_of_iterations: int | None = None,
+        time_budget: float | None = None,
+        seed: int | None = None
+) -> ndarray:
+    """
+    Perform a robust tabu search (Taillard, Robust taboo search for the quadratic assignment problem, 1991) on a given
+    chromosome. Each iteration performs the best swap according to the delta matrix, which is updated after each swap
+    like in two_opt_delta_matrix, even if the swap worsens the chromosome. A facility may not return to a location it
+    left during the last tenure iterations, unless the swap improves on the best chromosome found (aspiration). The
+    tenure is drawn from TABU_TENURE_RANGE every two maximum tenures, and a swap placing a facility on a location it has
+    not occupied for a long time is forced (see TABU_ASPIRATION_FACTOR).
+    The tenures are drawn from a generator seeded with the chromosome (and the seed), see local_search_random_state.
+    :param chromosome: One-dimensional numpy array representing a single chromosome.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param number_of_iterations: Number of swaps to perform, TABU_SEARCH_ITERATIONS by default.
+    :param time_budget: Seconds after which the search stops early, TABU_SEARCH_TIME_BUDGET by default, 0 disables it.
+    :param seed: Optional seed mixed into the seed of the tenure generator, e.g. the seed of the run.
+    :return: The best chromosome found as a numpy array.
+    """
+    if number_of_iterations is None:
+        number_of_iterations = TABU_SEARCH_ITERATIONS
+    if time_budget is None:
+        time_budget = TABU_SEARCH_TIME_BUDGET
+    start_time = time.perf_counter()
+    current_chromosome = chromosome.copy()
+    n = len(chromosome)
+    random_state = local_search_random_state(chromosome, seed)
+
+    chromosomes = current_chromosome[np.newaxis, :]
+    permuted_distance = permute_distance_matrix(distance_matrix, chromosomes)
+    delta_matrix = calculate_delta_rows(flow_matrix, permuted_distance, np.arange(n)[np.newaxis, :])
+    current_cost = int((flow_matrix.astype(np.int64) * permuted_distance[0]).sum())
+    best_chromosome, best_cost = current_chromosome.copy(), current_cost
+
+    minimum_tenure = max(1, int(TABU_TENURE_RANGE[0] * n))
+    maximum_tenure = max(minimum_tenure, int(np.ceil(TABU_TENURE_RANGE[1] * n)))
+    aspiration = TABU_ASPIRATION_FACTOR * n * n
+    # Iteration until which facility k may not return to location l, staggered such that forced moves start one by one
+    tabu_until = -np.arange(n * n, dtype=np.int64).reshape(n, n)
+    pairs = np.triu(np.ones((n, n), dtype=bool), 1)
+    tenure = minimum_tenure
+
+    number_of_iteration = 0
+    while number_of_iteration < number_of_iterations and n > 1:
+        if time_budget > 0 and time.perf_counter() - start_time >= time_budget:
+            break
+        if number_of_iteration % (2 * maximum_tenure) == 0:
+            tenure = random_state.randint(minimum_tenure, maximum_tenure + 1)
+        number_of_iteration += 1
+        delta = delta_matrix[0]
+
+        # Entry [r, s] refers to moving facility r to the location of facility s
+        tabu_until_moved = tabu_until[:, current_chromosome]
+        tabu = (tabu_until_moved >= number_of_iteration) & (tabu_until_moved.T >= number_of_iteration)
+        forced = pairs & ((tabu_until_moved < number_of_iteration - aspiration) |
+                          (tabu_until_moved.T < number_of_iteration - aspiration))
+        allowed = pairs & (~tabu | (current_cost + delta < best_cost))
+        candidates = forced if forced.any() else allowed if allowed.any() else pairs
+        r, s = np.unravel_index(np.argmin(np.where(candidates, delta, np.iinfo(np.int64).max)), delta.shape)
+
+        tabu_until[r, current_chromosome[r]] = number_of_iteration + tenure
+        tabu_until[s, current_chromosome[s]] = number_of_iteration + tenure
+        current_cost += int(delta[r, s])
+        swap_and_update_delta_matrix(delta_matrix, flow_matrix, distance_matrix, chromosomes, permuted_distance,
+                                     np.array([r]), np.array([s]))
+        if current_cost < best_cost:
+            best_chromosome, best_cost = current_chromosome.copy(), current_cost
+
+    # The delta matrix is computed once and every swap updates all of its entries
+    count_local_search(number_of_iteration, (1 + number_of_iteration) * n * n, number_of_iteration)
+    return best_chromosome
+
+
+cooling_schedules = ["geometric", "linear"]
+
+
+def simulated_annealing(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        number_of_moves: int | None = None,
+        initial_temperature: float | None = None,
+        final_temperature: float | None = None,
+        cooling_schedule: str | None = None,
+        seed: int | None = None
+) -> ndarray:
+    """
+    Perform simulated annealing on a given chromosome. Each move samples a random swap, whose delta cost is looked up
+    in the delta matrix, and accepts it if it does not worsen the chromosome or with probability exp(-delta / T) at
+    the current temperature T. Only accepted swaps update the delta matrix (see two_opt_delta_matrix), such that a
+    rejected move costs O(1). The temperature falls from the initial to the final temperature over the moves.
+    The swaps are drawn from a generator seeded with the chromosome (and the seed), see local_search_random_state.
+    :param chromosome: One-dimensional numpy array representing a single chromosome.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param number_of_moves: Number of swaps to sample, SIMULATED_ANNEALING_MOVES by default.
+    :param initial_temperature: Temperature of the first move relative to the mean absolute delta cost of the swaps of
+    the chromosome, SIMULATED_ANNEALING_INITIAL_TEMPERATURE by default.
+    :param final_temperature: Temperature of the last move relative to the same mean absolute delta cost,
+    SIMULATED_ANNEALING_FINAL_TEMPERATURE by default.
+    :param cooling_schedule: Either "geometric", where the temperature falls by a constant factor each move, or
+    "linear", where it falls by a constant amount. COOLING_SCHEDULE by default.
+    :param seed: Optional seed mixed into the seed of the generator, e.g. the seed of the run.
+    :return: The best chromosome found as a numpy array.
+    """
+    if number_of_moves is None:
+        number_of_moves = SIMULATED_ANNEALING_MOVES
+    if initial_temperature is None:
+        initial_temperature = SIMULATED_ANNEALING_INITIAL_TEMPERATURE
+    if final_temperature is None:
+        final_temperature = SIMULATED_ANNEALING_FINAL_TEMPERATURE
+    if cooling_schedule is None:
+        cooling_schedule = COOLING_SCHEDULE
+    if cooling_schedule not in cooling_schedules:
+        raise ValueError(f"Invalid cooling schedule: {cooling_schedule}")
+    current_chromosome = chromosome.copy()
+    n = len(chromosome)
+    if n < 2:
+        return current_chromosome
+    random_state = local_search_random_state(chromosome, seed)
+
+    chromosomes = current_chromosome[np.newaxis, :]
+    permuted_distance = permute_distance_matrix(distance_matrix, chromosomes)
+    delta_matrix = calculate_delta_rows(flow_matrix, permuted_distance, np.arange(n)[np.newaxis, :])
+    delta = delta_matrix[0]
+    current_cost = int((flow_matrix.astype(np.int64) * permuted_distance[0]).sum())
+    best_chromosome, best_cost = current_chromosome.copy(), current_cost
+
+    # A move is accepted if delta <= -T * log(u) for u uniform in (0, 1], i.e. with probability min(1, exp(-delta / T))
+    scale = np.abs(delta).sum() / (n * (n - 1))
+    progress = np.linspace(0, 1, number_of_moves)
+    if cooling_schedule == "geometric":
+        temperatures = scale * initial_temperature * (final_temperature / initial_temperature) ** progress
+    else:
+        temperatures = scale * (initial_temperature + (final_temperature - initial_temperature) * progress)
+    thresholds = -temperatures * np.log(1 - random_state.random_sample(number_of_moves))
+    first = random_state.randint(0, n, size=number_of_moves)
+    second = random_state.randint(0, n - 1, size=number_of_moves)
+    second += second >= first
+
+    number_of_swaps = 0
+    for r, s, threshold in zip(first, second, thresholds):
+        if delta[r, s] > threshold:
+            continue
+        current_cost += int(delta[r, s])
+        swap_and_update_delta_matrix(delta_matrix, flow_matrix, distance_matrix, chromosomes, permuted_distance,
+                                     np.array([r]), np.array([s]))
+        number_of_swaps += 1
+        if current_cost < best_cost:
+            best_chromosome, best_cost = current_chromosome.copy(), current_cost
+
+    # The delta matrix is computed once and every accepted swap updates all of its entries
+    count_local_search(number_of_moves, (1 + number_of_swaps) * n * n, number_of_swaps)
+    return best_chromosome
+
+
+def local_search_random_state(chromosome: ndarray, seed: int | None) -> RandomState:
+    """
+    Create the random number generator of a randomized local search. Seeding it with the chromosome makes the result
+    depend on the chromosome only, as assumed by the local search cache and parallel_optimize.
+    :param chromosome: One-dimensional numpy array representing the chromosome to optimize.
+    :param seed: Optional seed mixed into the seed of the generator, e.g. the seed of the run.
+    :return: The random number generator
+    """
+    return RandomState([zlib.crc32(np.ascontiguousarray(chromosome).tobytes()), 0 if seed is None else seed])
+
+
+class CandidateLists(NamedTuple):
+    """
+    Candidate swap partners of each position for two_opt_dont_look_bits, see build_candidate_lists.
+    """
+    # Entry [i] contains the facilities with the largest flow to and from facility i
+    flow_neighbours: ndarray
+    # Entry [l] contains the locations closest to location l
+    location_neighbours: ndarray
+
+
+def build_candidate_lists(flow_matrix: ndarray, distance_matrix: ndarray, size: int) -> CandidateLists:
+    """
+    Build the candidate lists of an instance. Swapping a facility with one it exchanges much flow with, or with the
+    facility at a location close to its own, is most likely to improve an assignment, such that the neighbourhood of
+    a position can be restricted to these 2 * size partners.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param size: The number of flow neighbours and the number of location neighbours of each position.
+    :return: The candidate lists
+    """
+    n = len(flow_matrix)
+    size = min(size, n - 1)
+    # Sorted ascending, such that the largest flows come first and the position itself last
+    negative_interaction = -(flow_matrix.astype(np.int64) + flow_matrix.T)
+    np.fill_diagonal(negative_interaction, np.iinfo(np.int64).max)
+    proximity = distance_matrix.astype(np.int64) + distance_matrix.T
+    np.fill_diagonal(proximity, np.iinfo(np.int64).max)
+    return CandidateLists(np.argsort(negative_interaction, axis=1, kind="stable")[:, :size],
+                          np.argsort(proximity, axis=1, kind="stable")[:, :size])
+
+
+def two_opt_dont_look_bits(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        number_of_iterations: int | None = None,
+        dont_look_bits: ndarray | None = None,
+        candidate_lists: CandidateLists | None = None
+) -> ndarray:
+    """
+    Perform a 2-opt optimization on a given chromosome, pruning the neighbourhood with don't-look bits. A position
+    whose bit is set is not scanned. Positions are scanned in order, each swapping with its best improving partner until
+    it has none left, at which point its bit is set. The bits of both positions of an accepted swap are reset. A pass
+    ends after every position whose bit was reset at its start has been scanned. Since a swap changes the delta costs
+    of all pairs but only resets two bits, the result is not guaranteed to be a local optimum of the full
+    neighbourhood. Delta costs are exact and computed only for the scanned pairs, see calculate_delta_costs.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing a single chromosome.
+    :param number_of_iterations: Maximum number of passes, NUMBER_OF_ITERATIONS_FOR_OPT by default.
+    :param dont_look_bits: Optional boolean numpy array of the initial bits, e.g. set for the positions a child shares
+    with its locally optimal parent. All bits are reset by default.
+    :param candidate_lists: Optional candidate lists restricting the partners of each position, see
+    build_candidate_lists. All other positions are partners by default.
+    :return: Optimized chromosome as a numpy array.
+    """
+    if number_of_iterations is None:
+        number_of_iterations = NUMBER_OF_ITERATIONS_FOR_OPT
+    best_chromosome = chromosome.copy()
+    n = len(chromosome)
+    dont_look = np.zeros(n, dtype=bool) if dont_look_bits is None else dont_look_bits.copy()
+    positions = np.arange(n)
+    # Position of each location, to look up the facilities at the closest locations
+    inverse_chromosome = np.empty_like(best_chromosome)
+    inverse_chromosome[best_chromosome] = positions
+
+    number_of_iteration = 0
+    number_of_swaps = 0
+    number_of_delta_evaluations = 0
+    while number_of_iteration < number_of_iterations and not dont_look.all():
+        number_of_iteration += 1
+        for i in np.flatnonzero(~dont_look):
+            while True:
+                if candidate_lists is None:
+                    partners = np.delete(positions, i)
+                else:
+                    partners = np.union1d(candidate_lists.flow_neighbours[i],
+                                          inverse_chromosome[candidate_lists.location_neighbours[best_chromosome[i]]])
+                deltas = calculate_delta_costs(flow_matrix, distance_matrix, best_chromosome, i, partners)
+                number_of_delta_evaluations += len(partners)
+
+                best_partner = np.argmin(deltas)
+                if deltas[best_partner] >= 0:
+                    dont_look[i] = True
+                    break
+                j = partners[best_partner]
+                best_chromosome[i], best_chromosome[j] = best_chromosome[j], best_chromosome[i]
+                inverse_chromosome[best_chromosome[i]], inverse_chromosome[best_chromosome[j]] = i, j
+                dont_look[j] = False
+                number_of_swaps += 1
 
-    if not improved_changed:
-        # Cache the chromosome if opt makes no sense
-        CACHE_FOR_OPTIMIZATION.append(best_chromosome.copy())
+    count_local_search(number_of_iteration, number_of_delta_evaluations, number_of_swaps)
     return best_chromosome
 
 
+def calculate_delta_costs(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, i: int, partners: ndarray) -> ndarray:
+    """
+    Calculate the exact delta costs of swapping the i-th element of a chromosome with each of the partners, see
+    calculate_delta_matrix, in O(n) per partner.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :param i: Index of the first element to swap.
+    :param partners: One-dimensional numpy array containing the indices of the second elements, all different from i.
+    :return: One-dimensional numpy array (int64) containing the delta cost of each swap.
+    """
+    a, b = chromosome[i], chromosome[partners]
+    flow_i_k = flow_matrix[i].astype(np.int64)
+    flow_j_k = flow_matrix[partners].astype(np.int64)
+    flow_k_i = flow_matrix[:, i].astype(np.int64)
+    flow_k_j = flow_matrix[:, partners].T.astype(np.int64)
+    distance_i_k = distance_matrix[a, chromosome].astype(np.int64)
+    distance_j_k = distance_matrix[b[:, np.newaxis], chromosome].astype(np.int64)
+    distance_k_i = distance_matrix[chromosome, a].astype(np.int64)
+    distance_k_j = distance_matrix[chromosome, b[:, np.newaxis]].astype(np.int64)
+
+    # Terms between the swapped elements and all other elements k
+    terms = (flow_i_k - flow_j_k) * (distance_j_k - distance_i_k) + (flow_k_i - flow_k_j) * (distance_k_j - distance_k_i)
+    terms[:, i] = 0
+    terms[np.arange(len(partners)), partners] = 0
+    delta = terms.sum(axis=1)
+
+    # Terms between the swapped elements themselves
+    delta += ((np.int64(flow_matrix[i, i]) - flow_matrix[partners, partners]) *
+              (distance_matrix[b, b].astype(np.int64) - distance_matrix[a, a]) +
+              (flow_matrix[i, partners].astype(np.int64) - flow_matrix[partners, i]) *
+              (distance_matrix[b, a].astype(np.int64) - distance_matrix[a, b]))
+    return delta
+
+
+def bulk_two_opt(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        best_improvement: bool = True,
+        chunk_size: int | None = None,
+        number_of_moves: int | None = None
+) -> ndarray:
+    """
+    Perform a 2-opt optimization on multiple chromosomes at once. The delta matrices of all chromosomes are computed
+    together and in each step every chromosome which can still be improved performs one swap in lockstep: the best
+    improving swap or the first improving one (in the order of two_opt). The steps are repeated until no chromosome
+    can be improved anymore or number_of_moves swaps have been performed. The population is processed
+    in chunks to bound the memory used by the delta matrices to O(chunk_size * n^2).
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param best_improvement: Whether to perform the best improving swap in each step instead of the first one.
+    :param chunk_size: Number of chromosomes optimized at once, LOCAL_SEARCH_CHUNK_SIZE by default.
+    :param number_of_moves: Maximum number of swaps per chromosome, NUMBER_OF_MOVES_FOR_BATCHED_OPT by default.
+    :return: Two-dimensional numpy array containing the optimized chromosomes.
+    """
+    if chunk_size is None:
+        chunk_size = LOCAL_SEARCH_CHUNK_SIZE
+    if number_of_moves is None:
+        number_of_moves = NUMBER_OF_MOVES_FOR_BATCHED_OPT
+    n = chromosomes.shape[1]
+    optimized_chromosomes = chromosomes.copy()
+    upper_triangle = np.triu(np.ones((n, n), dtype=bool), k=1)
+
+    for start in range(0, len(chromosomes), chunk_size):
+        chunk = optimized_chromosomes[start:start + chunk_size]
+        permuted_distance = permute_distance_matrix(distance_matrix, chunk)
+        delta_matrices = calculate_delta_rows(flow_matrix, permuted_distance, np.tile(np.arange(n), (len(chunk), 1)))
+        count_local_search(0, len(chunk) * n * n, 0)
+
+        active = np.arange(len(chunk))
+        for _ in range(number_of_moves):
+            flat_deltas = delta_matrices[active].reshape(len(active), -1)
+            if best_improvement:
+                moves = np.argmin(flat_deltas, axis=1)
+            else:
+                moves = np.argmax((flat_deltas < 0) & upper_triangle.ravel(), axis=1)
+
+            # Chromosomes without an improving swap are locally optimal and drop out
+            improving = flat_deltas[np.arange(len(active)), moves] < 0
+            count_local_search(len(active), np.count_nonzero(improving) * n * n, np.count_nonzero(improving))
+            active, moves = active[improving], moves[improving]
+            if len(active) == 0:
+                break
+            swap_and_update_delta_matrix(delta_matrices, flow_matrix, distance_matrix, chunk, permuted_distance,
+                                         moves // n, moves % n, active)
+
+    return optimized_chromosomes
+
+
+def permute_distance_matrix(distance_matrix: ndarray, chromosomes: ndarray) -> ndarray:
+    """
+    Reorder the distance matrix according to the chromosomes. That is, entry [p, k, l] of the result is the distance
+    between the locations facilities k and l are assigned to in the p-th chromosome.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :return: Three-dimensional numpy array (int64) containing one permuted distance matrix per chromosome.
+    """
+    return distance_matrix[chromosomes[:, :, np.newaxis], chromosomes[:, np.newaxis, :]].astype(np.int64)
+
+
+def calculate_delta_matrix(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray) -> ndarray:
+    """
+    Calculate the delta costs of all 2-opt swaps of a chromosome at once. That is, entry [i, j] of the result is the
+    resulting change in cost if the i-th and j-th elements in the chromosome are swapped. In contrast to
+    calculate_delta_cost, the delta costs are exact, i.e. they also contain the terms between the i-th and j-th element
+    themselves. These terms vanish if the distance matrix has a zero diagonal and one of the matrices is symmetric.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :return: Two-dimensional numpy array (int64) containing the delta costs of all swaps.
+    """
+    permuted_distance = permute_distance_matrix(distance_matrix, chromosome[np.newaxis, :])
+    return calculate_delta_rows(flow_matrix, permuted_distance, np.arange(len(chromosome))[np.newaxis, :])[0]
+
+
+def calculate_delta_rows(flow_matrix: ndarray, permuted_distance: ndarray, rows: ndarray) -> ndarray:
+    """
+    Calculate the given rows of the delta matrices of multiple chromosomes, see calculate_delta_matrix. The computation
+    is done with a few matrix products, costing O(m * n^2) per chromosome for m rows.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param permuted_distance: Three-dimensional numpy array of the permuted distance matrices of the chromosomes,
+    see permute_distance_matrix.
+    :param rows: Two-dimensional numpy array containing the indices of the rows to compute for each chromosome.
+    :return: Three-dimensional numpy array (int64) containing the requested rows of the delta matrices.
+    """
+    flow = flow_matrix.astype(np.int64)
+    flow_transposed = flow.T
+    permuted_distance_transposed = np.swapaxes(permuted_distance, 1, 2)
+    batch = np.arange(len(permuted_distance))[:, np.newaxis]
+
+    # Rows and columns of the selected indices i, such that the result is indexed by [p, i, j]
+    flow_i_j = flow[rows]
+    flow_j_i = flow_transposed[rows]
+    distance_i_j = permuted_distance[batch, rows]
+    distance_j_i = permuted_distance_transposed[batch, rows]
+
+    # Sum over all k of (f_ik - f_jk)(d_jk - d_ik) + (f_ki - f_kj)(d_kj - d_ki), expanded into matrix products
+    cross_terms = (flow_i_j @ permuted_distance_transposed + distance_i_j @ flow_transposed +
+                   flow_j_i @ permuted_distance + distance_j_i @ flow)
+    diagonal_terms = (flow[np.newaxis, :, :] * permuted_distance).sum(axis=2) + (flow[np.newaxis, :, :] * permuted_distance).sum(axis=1)
+    delta = cross_terms - np.take_along_axis(diagonal_terms, rows, axis=1)[:, :, np.newaxis] - diagonal_terms[:, np.newaxis, :]
+
+    # Replace the terms for k = i and k = j by the exact change of the terms between i and j
+    flow_diagonal = np.diagonal(flow)
+    distance_diagonal = np.diagonal(permuted_distance, axis1=1, axis2=2)
+    flow_i_i = flow_diagonal[rows][:, :, np.newaxis]
+    flow_j_j = flow_diagonal[np.newaxis, np.newaxis, :]
+    distance_i_i = np.take_along_axis(distance_diagonal, rows, axis=1)[:, :, np.newaxis]
+    distance_j_j = distance_diagonal[:, np.newaxis, :]
+
+    delta -= ((flow_i_i - flow_j_i) * (distance_j_i - distance_i_i) + (flow_i_i - flow_i_j) * (distance_i_j - distance_i_i) +
+              (flow_i_j - flow_j_j) * (distance_j_j - distance_i_j) + (flow_j_i - flow_j_j) * (distance_j_j - distance_j_i))
+    delta += (flow_i_i * (distance_j_j - distance_i_i) + flow_j_j * (distance_i_i - distance_j_j) +
+              flow_i_j * (distance_j_i - distance_i_j) + flow_j_i * (distance_i_j - distance_j_i))
+
+    # Swapping an element with itself does not change anything
+    delta[rows[:, :, np.newaxis] == np.arange(permuted_distance.shape[1])[np.newaxis, np.newaxis, :]] = 0
+    return delta
+
+
+def swap_and_update_delta_matrix(
+        delta_matrix: ndarray,
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        permuted_distance: ndarray,
+        r: ndarray,
+        s: ndarray,
+        batch: ndarray | None = None
+):
+    """
+    Swap the r-th and s-th element of each chromosome and update the permuted distance matrices and delta matrices in
+    place. Entries of pairs disjoint from {r, s} are updated in O(1) each using the delta update formula of Taillard
+    (Robust taboo search for the quadratic assignment problem, 1991), rows and columns r and s are recomputed.
+    :param delta_matrix: Three-dimensional numpy array of the delta matrices of the chromosomes
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param permuted_distance: Three-dimensional numpy array of the permuted distance matrices of the chromosomes.
+    :param r: One-dimensional numpy array containing the first index to swap for each chromosome.
+    :param s: One-dimensional numpy array containing the second index to swap for each chromosome.
+    :param batch: Indices of the chromosomes to swap, r and s are given for these chromosomes only. All chromosomes
+    by default.
+    """
+    if batch is None:
+        batch = np.arange(len(chromosomes))
+
+    # Perform the swaps
+    chromosomes[batch, r], chromosomes[batch, s] = chromosomes[batch, s], chromosomes[batch, r]
+    swapped_chromosomes = chromosomes[batch]
+    location_r, location_s = chromosomes[batch, r][:, np.newaxis], chromosomes[batch, s][:, np.newaxis]
+    swapped_rows = distance_matrix[location_r, swapped_chromosomes].astype(np.int64), \
+        distance_matrix[location_s, swapped_chromosomes].astype(np.int64)
+    swapped_columns = distance_matrix[swapped_chromosomes, location_r].astype(np.int64), \
+        distance_matrix[swapped_chromosomes, location_s].astype(np.int64)
+    permuted_distance[batch, r], permuted_distance[batch, s] = swapped_rows
+    permuted_distance[batch, :, r], permuted_distance[batch, :, s] = swapped_columns
+
+    # O(1) update for all pairs (u, v) with u, v not in {r, s}
+    flow = flow_matrix.astype(np.int64)
+    flow_rows = flow[r] - flow[s]
+    flow_columns = flow[:, r].T - flow[:, s].T
+    distance_rows = swapped_rows[1] - swapped_rows[0]
+    distance_columns = swapped_columns[1] - swapped_columns[0]
+    delta_matrix[batch] += ((flow_rows[:, :, np.newaxis] - flow_rows[:, np.newaxis, :]) *
+                            (distance_rows[:, :, np.newaxis] - distance_rows[:, np.newaxis, :]) +
+                            (flow_columns[:, :, np.newaxis] - flow_columns[:, np.newaxis, :]) *
+                            (distance_columns[:, :, np.newaxis] - distance_columns[:, np.newaxis, :]))
+
+    # Recompute the rows and columns of the swapped elements
+    new_rows = calculate_delta_rows(flow_matrix, permuted_distance[batch], np.stack([r, s], axis=1))
+    delta_matrix[batch, r], delta_matrix[batch, s] = new_rows[:, 0], new_rows[:, 1]
+    delta_matrix[batch, :, r], delta_matrix[batch, :, s] = new_rows[:, 0], new_rows[:, 1]
+
+
 def calculate_delta_cost(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, i: int, j: int) -> float:
     """
     Calculate the delta cost of a 2-opt swap. That is, the resulting change in cost if the i-th and j-th elements in the
@@ -75,10 +665,13 @@ def calculate_delta_cost(flow_matrix: ndarray, distance_matrix: ndarray, chromos
     for k in range(n):
         if k != i and k != j:
             c = chromosome[k]
-            delta += (flow_matrix[i, k] * (distance_matrix[b, c] - distance_matrix[a, c]) +
-                      flow_matrix[j, k] * (distance_matrix[a, c] - distance_matrix[b, c]) +
-                      flow_matrix[k, i] * (distance_matrix[c, b] - distance_matrix[c, a]) +
-                      flow_matrix[k, j] * (distance_matrix[c, a] - distance_matrix[c, b]))
+            # In int64, differences of unsigned matrix entries would wrap around
+            distance_b_c, distance_a_c = np.int64(distance_matrix[b, c]), np.int64(distance_matrix[a, c])
+            distance_c_b, distance_c_a = np.int64(distance_matrix[c, b]), np.int64(distance_matrix[c, a])
+            delta += (flow_matrix[i, k] * (distance_b_c - distance_a_c) +
+                      flow_matrix[j, k] * (distance_a_c - distance_b_c) +
+                      flow_matrix[k, i] * (distance_c_b - distance_c_a) +
+                      flow_matrix[k, j] * (distance_c_a - distance_c_b))
     return delta
 
 
@@ -103,16 +696,16 @@ def calculate_delta_cost_numpy(flow_matrix: ndarray, distance_matrix: ndarray, c
     mask = np.ones(len(chromosome), dtype=bool)
     mask[[i, j]] = False
 
-    # Get the relevant rows and columns
-    flow_i = flow_matrix[i, mask]
-    flow_j = flow_matrix[j, mask]
-    flow_k_i = flow_matrix[mask, i]
-    flow_k_j = flow_matrix[mask, j]
+    # Get the relevant rows and columns, in int64 such that the differences of unsigned entries do not wrap around
+    flow_i = flow_matrix[i, mask].astype(np.int64)
+    flow_j = flow_matrix[j, mask].astype(np.int64)
+    flow_k_i = flow_matrix[mask, i].astype(np.int64)
+    flow_k_j = flow_matrix[mask, j].astype(np.int64)
 
-    distance_b = distance_matrix[b, chromosome[mask]]
-    distance_a = distance_matrix[a, chromosome[mask]]
-    distance_c_b = distance_matrix[chromosome[mask], b]
-    distance_c_a = distance_matrix[chromosome[mask], a]
+    distance_b = distance_matrix[b, chromosome[mask]].astype(np.int64)
+    distance_a = distance_matrix[a, chromosome[mask]].astype(np.int64)
+    distance_c_b = distance_matrix[chromosome[mask], b].astype(np.int64)
+    distance_c_a = distance_matrix[chromosome[mask], a].astype(np.int64)
 
     # Calculate the delta cost
     delta = np.sum(flow_i * (distance_b - distance_a) +
@@ -123,9 +716,75 @@ def calculate_delta_cost_numpy(flow_matrix: ndarray, distance_matrix: ndarray, c
     return delta
 
 
-def reset_cache():
+
+def calculate_delta_cost_symmetric(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, i: int, j: int) -> float:
+    """
+    Calculate the delta cost of a 2-opt swap like calculate_delta_cost_numpy for a symmetric instance, see
+    is_symmetric_instance. The terms of the flows from and to each other element are then equal, such that only the
+    flows from the i-th and j-th element and the distances from their locations are needed, half of the four terms.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :param i: Index of the first element to swap.
+    :param j: Index of the second element to swap.
+    :return: The delta cost of the swap.
+    """
+    if i == j:
+        return 0
+
+    a, b = chromosome[i], chromosome[j]
+    mask = np.ones(len(chromosome), dtype=bool)
+    mask[[i, j]] = False
+    locations = chromosome[mask]
+
+    flow_differences = flow_matrix[i, mask].astype(np.int64) - flow_matrix[j, mask]
+    return 2 * np.sum(flow_differences * (distance_matrix[b, locations].astype(np.int64) - distance_matrix[a, locations]))
+
+
+def calculate_delta_cost_sparse(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        i: int,
+        j: int,
+        sparse_flow: SparseFlow
+) -> float:
+    """
+    Calculate the delta cost of a 2-opt swap like calculate_delta_cost_numpy from the nonzero flows from and to the i-th
+    and j-th element only, costing O(nnz / n) instead of O(n) for a flow matrix with nnz nonzero entries.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix. Unused, the flows are taken from
+    sparse_flow.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :param i: Index of the first element to swap.
+    :param j: Index of the second element to swap.
+    :param sparse_flow: The flow matrix in sparse form, see build_sparse_flow.
+    :return: The delta cost of the swap.
+    """
+    if i == j:
+        return 0
+
+    a, b = chromosome[i], chromosome[j]
+    # Sum over k of (f_ik - f_jk)(d_bk - d_ak), the rows of i and j hold the nonzero terms
+    others, flows = _sparse_flow_differences(sparse_flow.indptr, sparse_flow.indices, sparse_flow.data, i, j)
+    locations = chromosome[others]
+    delta = flows @ (distance_matrix[b, locations].astype(np.int64) - distance_matrix[a, locations])
+    if sparse_flow.symmetric:
+        return 2 * delta
+
+    # Sum over k of (f_ki - f_kj)(d_kb - d_ka)
+    others, flows = _sparse_flow_differences(sparse_flow.transposed_indptr, sparse_flow.transposed_indices,
+                                             sparse_flow.transposed_data, i, j)
+    locations = chromosome[others]
+    return delta + flows @ (distance_matrix[locations, b].astype(np.int64) - distance_matrix[locations, a])
+
+
+def _sparse_flow_differences(indptr: ndarray, indices: ndarray, data: ndarray, i: int, j: int) -> tuple[ndarray, ndarray]:
     """
-    Reset the cache to avoid memory issues.
+    :return: The facilities k other than i and j with a nonzero flow in row i or j of a CSR matrix (possibly repeated)
+    and the flow of row i or the negated flow of row j, such that the terms sum to the differences f_ik - f_jk
     """
-    global CACHE_FOR_OPTIMIZATION
-    CACHE_FOR_OPTIMIZATION = []
+    others = np.concatenate([indices[indptr[i]:indptr[i + 1]], indices[indptr[j]:indptr[j + 1]]])
+    flows = np.concatenate([data[indptr[i]:indptr[i + 1]], -data[indptr[j]:indptr[j + 1]]])
+    keep = (others != i) & (others != j)
+    return others[keep], flows[keep]
@@ -0,0 +1,139 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from numpy import ndarray
+
+from src.config import LOCAL_SEARCH_CACHE_MAX_BYTES
+
+# Size of the keys in bytes, see chromosome_key
+KEY_SIZE = 16
+
+# Rough per entry overhead of the dictionary entry, the key and the tuple holding the result
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class LocalSearchCache:
+    """
+    LRU cache mapping chromosomes to the result of the local search, that is, the optimized chromosome and its fitness.
+    Chromosomes are keyed by a digest of their bytes (see chromosome_key), such that lookups take O(n) for hashing
+    instead of comparing against every cached chromosome. If the estimated memory of the cache exceeds max_bytes, the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, max_bytes: int = LOCAL_SEARCH_CACHE_MAX_BYTES):
+        """
+        :param max_bytes: Maximum estimated memory of the cache in bytes
+        """
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[bytes, tuple[ndarray, int]] = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, key: bytes) -> tuple[ndarray, int] | None:
+        """
+        Look up the local search result of a chromosome and mark it as recently used.
+        :param key: The key of the chromosome, see chromosome_key
+        :return: A tuple of the optimized chromosome and its fitness or None if the chromosome is not cached
+        """
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def store(self, key: bytes, optimized_chromosome: ndarray, fitness: int):
+        """
+        Store the local search result of a chromosome, evicting the least recently used entries if necessary.
+        :param key: The key of the chromosome before the local search, see chromosome_key
+        :param optimized_chromosome: One-dimensional numpy array representing the chromosome after the local search
+        :param fitness: The fitness of the optimized chromosome
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+
+        self.entries[key] = (optimized_chromosome.copy(), int(fitness))
+        self.used_bytes += entry_size(optimized_chromosome)
+        while self.used_bytes > self.max_bytes and len(self.entries) > 0:
+            _, (evicted_chromosome, _) = self.entries.popitem(last=False)
+            self.used_bytes -= entry_size(evicted_chromosome)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters.
+        """
+        self.entries.clear()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def state(self) -> dict[str, ndarray]:
+        """
+        Export the entries (from least to most recently used) and the counters as arrays, e.g. for checkpoints.
+        :return: A dictionary of numpy arrays which can be passed to restore
+        """
+        chromosomes = [chromosome for chromosome, _ in self.entries.values()]
+        return {
+            "keys": np.frombuffer(b"".join(self.entries.keys()), dtype=np.uint8).reshape(-1, KEY_SIZE),
+            "chromosomes": np.array(chromosomes) if chromosomes else np.empty((0, 0), dtype=np.int64),
+            "fitness": np.array([fitness for _, fitness in self.entries.values()], dtype=np.int64),
+            "counters": np.array([self.hits, self.misses, self.evictions], dtype=np.int64),
+        }
+
+    def restore(self, state: dict[str, ndarray]):
+        """
+        Replace the entries and counters by those exported with state.
+        :param state: A dictionary of numpy arrays as returned by state
+        """
+        self.clear()
+        for key, optimized_chromosome, fitness in zip(state["keys"], state["chromosomes"], state["fitness"]):
+            self.entries[key.tobytes()] = (optimized_chromosome.copy(), int(fitness))
+            self.used_bytes += entry_size(optimized_chromosome)
+        self.hits, self.misses, self.evictions = (int(counter) for counter in state["counters"])
+
+    def statistics(self) -> dict[str, int]:
+        """
+        :return: A dictionary containing the number of hits, misses, evictions, entries and the estimated memory used
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "used_bytes": self.used_bytes,
+        }
+
+
+def chromosome_key(chromosome: ndarray, dont_look_bits: ndarray | None = None) -> bytes:
+    """
+    Calculate the cache key of a chromosome as a 128-bit digest of its bytes. A local search started with don't-look
+    bits set (see two_opt_dont_look_bits) may end in a different local optimum, so the bits are part of the key unless
+    none of them is set.
+    :param chromosome: One-dimensional numpy array representing the chromosome
+    :param dont_look_bits: Optional one-dimensional boolean numpy array of the don't-look bits the search starts with
+    :return: The digest of the chromosome and its don't-look bits
+    """
+    digest = hashlib.blake2b(chromosome.tobytes(), digest_size=KEY_SIZE)
+    if dont_look_bits is not None and dont_look_bits.any():
+        digest.update(np.packbits(dont_look_bits).tobytes())
+    return digest.digest()
+
+
+def entry_size(optimized_chromosome: ndarray) -> int:
+    """
+    Estimate the memory used by a cache entry.
+    :param optimized_chromosome: The optimized chromosome stored in the entry
+    :return: The estimated size in bytes
+    """
+    return optimized_chromosome.nbytes + ENTRY_OVERHEAD_BYTES
+
@@ -0,0 +1,118 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class Metrics:
+    """
+    Per-phase timers and event counters of a run. Phases are timed with the monotonic time.perf_counter and may be
+    nested (e.g. local_search is part of evaluation). Metrics collected in worker processes are merged into the
+    metrics of the parent process by parallel_map, such that the phase times of parallel work are summed over workers.
+    """
+
+    def __init__(self):
+        self.phase_seconds: defaultdict[str, float] = defaultdict(float)
+        self.phase_calls: defaultdict[str, int] = defaultdict(int)
+        self.counters: defaultdict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Context manager adding the time spent in its body to the phase.
+        :param name: The name of the phase, e.g. "selection"
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - start_time
+            self.phase_calls[name] += 1
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Increase a counter.
+        :param name: The name of the counter, e.g. "accepted_swaps"
+        :param amount: The amount to increase the counter by
+        """
+        self.counters[name] += int(amount)
+
+    def clear(self):
+        """
+        Reset all timers and counters.
+        """
+        self.phase_seconds.clear()
+        self.phase_calls.clear()
+        self.counters.clear()
+
+    def state(self) -> dict[str, dict]:
+        """
+        :return: A dictionary containing the phase times, the number of calls of each phase and the counters
+        """
+        return {
+            "phase_seconds": dict(self.phase_seconds),
+            "phase_calls": dict(self.phase_calls),
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, state: dict[str, dict]):
+        """
+        Add the timers and counters of another Metrics object, e.g. of a worker process.
+        :param state: The state of the other Metrics object, see state
+        """
+        for name, seconds in state["phase_seconds"].items():
+            self.phase_seconds[name] += seconds
+        for name, calls in state["phase_calls"].items():
+            self.phase_calls[name] += calls
+        for name, amount in state["counters"].items():
+            self.counters[name] += amount
+
+    def summary(self) -> dict[str, dict]:
+        """
+        :return: The state extended by the local search counters per locally searched individual
+        """
+        summary = self.state()
+        local_searches = self.counters.get("local_searches", 0)
+        if local_searches > 0:
+            summary["per_individual"] = {
+                name: self.counters.get(name, 0) / local_searches
+                for name in ["local_search_iterations", "delta_evaluations", "accepted_swaps"]
+            }
+        return summary
+
+    def export(self, path: str):
+        """
+        Write the summary as JSON.
+        :param path: The path of the file to write
+        """
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+
+METRICS = Metrics()
+
+# Metrics the instrumented code reports to, METRICS unless replaced by use_metrics (e.g. by a Solver)
+_CURRENT_METRICS: ContextVar[Metrics] = ContextVar("current_metrics", default=METRICS)
+
+
+def current_metrics() -> Metrics:
+    """
+    :return: The metrics of the current context (thread), see use_metrics
+    """
+    return _CURRENT_METRICS.get()
+
+
+@contextmanager
+def use_metrics(metrics: Metrics) -> Iterator[Metrics]:
+    """
+    Context manager reporting the timers and counters of the code in its body (in the current thread) to the given
+    metrics instead of METRICS, such that concurrent runs collect separate metrics.
+    :param metrics: The metrics to report to
+    """
+    token = _CURRENT_METRICS.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _CURRENT_METRICS.reset(token)
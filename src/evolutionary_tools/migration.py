@@ -0,0 +1,84 @@
+import numpy as np
+from numpy import ndarray
+
+from src.evolutionary_tools.selection import row_hashes
+
+migration_topologies = ["ring", "fully_connected"]
+
+
+def migrate(populations: list[ndarray], populations_fitness: list[ndarray], number_of_migrants: int, topology: str):
+    """
+    Exchange the fittest individuals between islands (in place). Every island sends its number_of_migrants fittest
+    individuals to its neighbours in the topology and replaces its worst individuals by the fittest immigrants it does
+    not contain yet. All emigrants are chosen before any island is changed, so the result does not depend on the order
+    of the islands.
+    :param populations: List containing the population of each island
+    :param populations_fitness: List containing the fitness values of the population of each island
+    :param number_of_migrants: The number of individuals each island sends to (and at most receives from) its neighbours
+    :param topology: Either "ring", where island i sends to island i + 1, or "fully_connected", where every island sends
+    to all others
+    """
+    emigrants = [select_emigrants(population, population_fitness, number_of_migrants)
+                 for population, population_fitness in zip(populations, populations_fitness)]
+
+    for island in range(len(populations)):
+        sources = source_islands(island, len(populations), topology)
+        immigrants = np.concatenate([emigrants[source][0] for source in sources])
+        immigrants_fitness = np.concatenate([emigrants[source][1] for source in sources])
+        integrate_immigrants(populations[island], populations_fitness[island], immigrants, immigrants_fitness, number_of_migrants)
+
+
+def select_emigrants(population: ndarray, population_fitness: ndarray, number_of_migrants: int) -> tuple[ndarray, ndarray]:
+    """
+    Select the fittest individuals of an island for migration.
+    :param population: The population of the island
+    :param population_fitness: The population's fitness values
+    :param number_of_migrants: The number of individuals to select
+    :return: A tuple of copies of the fittest individuals and their fitness values
+    """
+    fittest = np.argsort(population_fitness, kind="stable")[:number_of_migrants]
+    return population[fittest].copy(), population_fitness[fittest].copy()
+
+
+def source_islands(island: int, number_of_islands: int, topology: str) -> list[int]:
+    """
+    Determine the islands sending individuals to the given island.
+    :param island: The index of the receiving island
+    :param number_of_islands: The number of islands
+    :param topology: The migration topology, see migrate
+    :return: A list containing the indexes of the sending islands
+    """
+    match topology:
+        case "ring":
+            return [(island - 1) % number_of_islands] if number_of_islands > 1 else []
+        case "fully_connected":
+            return [source for source in range(number_of_islands) if source != island]
+    raise ValueError(f"Invalid migration topology: {topology}")
+
+
+def integrate_immigrants(
+        population: ndarray,
+        population_fitness: ndarray,
+        immigrants: ndarray,
+        immigrants_fitness: ndarray,
+        number_of_migrants: int
+):
+    """
+    Replace the worst individuals of an island by the fittest immigrants which are not part of the island yet (in place).
+    :param population: The population of the island
+    :param population_fitness: The population's fitness values
+    :param immigrants: The individuals sent to the island
+    :param immigrants_fitness: The fitness values of the immigrants
+    :param number_of_migrants: The maximum number of individuals to replace
+    """
+    if len(immigrants) == 0:
+        return
+    # Immigrants the island (or an earlier immigrant) already contains would only reduce its diversity
+    immigrant_hashes = row_hashes(immigrants)
+    _, first_occurrences = np.unique(immigrant_hashes, return_index=True)
+    new = first_occurrences[~np.isin(immigrant_hashes[first_occurrences], row_hashes(population))]
+    new = new[np.argsort(immigrants_fitness[new], kind="stable")][:min(number_of_migrants, len(population) - 1)]
+
+    worst = np.argsort(population_fitness, kind="stable")[::-1][:len(new)]
+    population[worst] = immigrants[new]
+    population_fitness[worst] = immigrants_fitness[new]
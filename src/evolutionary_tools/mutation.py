@@ -1,29 +1,47 @@
 import numpy as np
 from numpy import ndarray
+from numpy.random import RandomState
 
+from src.evolutionary_tools.random_state import resolve_random_state
 
-def apply_mutation_to_population(population: ndarray, mutation_function: callable, mutation_rate: float) -> ndarray:
+
+def apply_mutation_to_population(population: ndarray, mutation_function: callable, mutation_rate: float, changed_positions: ndarray | None = None,
+                                 random_state: RandomState | None = None) -> ndarray:
     """
     Apply a mutation function to a population with a given mutation rate.
     :param population: The population to mutate
     :param mutation_function: The mutation function to apply
     :param mutation_rate: The mutation rate
+    :param changed_positions: Optional two-dimensional boolean numpy array of the same shape as the population. If
+    provided, the positions changed by the mutation are marked in it (in place).
+    :param random_state: The random number generator, also passed to the mutation function, the global one by default
     :return: The mutated population
     """
+    random_state = resolve_random_state(random_state)
     for chromosome_index in range(population.shape[0]):
-        if np.random.rand() < mutation_rate:
-            population[chromosome_index] = mutation_function(population[chromosome_index])
+        if random_state.rand() < mutation_rate:
+            if changed_positions is None:
+                population[chromosome_index] = mutation_function(population[chromosome_index], random_state=random_state)
+            else:
+                population[chromosome_index], positions = mutation_function(population[chromosome_index], return_changed_positions=True,
+                                                                            random_state=random_state)
+                changed_positions[chromosome_index, positions] = True
     return population
 
 
-def swap_mutation(chromosome: ndarray) -> ndarray:
+def swap_mutation(chromosome: ndarray, return_changed_positions: bool = False, random_state: RandomState | None = None) -> ndarray | tuple[ndarray, ndarray]:
     """
     Perform a swap mutation on the chromosome.
     :param chromosome: The chromosome to mutate
-    :return: The mutated chromosome
+    :param return_changed_positions: Whether to additionally return the positions changed by the mutation
+    :param random_state: The random number generator, the global one by default
+    :return: The mutated chromosome or, if return_changed_positions is True, a tuple of the mutated chromosome and a
+    numpy array containing the two swapped positions
     """
-    index1, index2 = np.random.choice(chromosome.shape[0], 2, replace=False)
+    index1, index2 = resolve_random_state(random_state).choice(chromosome.shape[0], 2, replace=False)
     chromosome_entry_one = chromosome[index1]
     chromosome[index1] = chromosome[index2]
     chromosome[index2] = chromosome_entry_one
+    if return_changed_positions:
+        return chromosome, np.array([index1, index2])
     return chromosome
@@ -0,0 +1,237 @@
+import numpy as np
+from numba import njit
+from numpy import ndarray
+
+from src.config import NUMBER_OF_ITERATIONS_FOR_OPT
+from src.evolutionary_tools.greedy_optimizations import count_local_search
+from src.evolutionary_tools.sparse_flow import SparseFlow, flow_edges
+
+
+def numba_two_opt(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        number_of_iterations: int | None = None,
+        symmetric: bool = False,
+        sparse_flow: SparseFlow | None = None
+) -> ndarray:
+    """
+    Compiled version of greedy_optimizations.two_opt, performing the same swaps in the same order.
+    :param chromosome: One-dimensional numpy array representing a single chromosome.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param number_of_iterations: Maximum number of passes over all pairs, NUMBER_OF_ITERATIONS_FOR_OPT by default.
+    :param symmetric: Whether the instance is symmetric, see greedy_optimizations.two_opt.
+    :param sparse_flow: Optional flow matrix in sparse form, see greedy_optimizations.two_opt.
+    :return: Optimized chromosome as a numpy array.
+    """
+    if number_of_iterations is None:
+        number_of_iterations = NUMBER_OF_ITERATIONS_FOR_OPT
+    best_chromosome = chromosome.copy()
+    if sparse_flow is not None:
+        number_of_iterations, number_of_swaps = _sparse_two_opt_kernel(distance_matrix, best_chromosome, number_of_iterations,
+                                                                       *sparse_flow)
+    else:
+        number_of_iterations, number_of_swaps = _two_opt_kernel(flow_matrix, distance_matrix, best_chromosome,
+                                                                number_of_iterations, symmetric)
+    n = len(chromosome)
+    count_local_search(number_of_iterations, number_of_iterations * (n - 2) * (n - 1) // 2, number_of_swaps)
+    return best_chromosome
+
+
+def numba_calculate_delta_cost(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, i: int, j: int) -> float:
+    """
+    Compiled version of greedy_optimizations.calculate_delta_cost.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :param i: Index of the first element to swap.
+    :param j: Index of the second element to swap.
+    :return: The delta cost of the swap.
+    """
+    return _delta_cost_kernel(flow_matrix, distance_matrix, chromosome, i, j)
+
+
+def numba_calculate_delta_cost_symmetric(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, i: int, j: int) -> float:
+    """
+    Compiled version of greedy_optimizations.calculate_delta_cost_symmetric.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :param i: Index of the first element to swap.
+    :param j: Index of the second element to swap.
+    :return: The delta cost of the swap.
+    """
+    return _symmetric_delta_cost_kernel(flow_matrix, distance_matrix, chromosome, i, j)
+
+
+def numba_calculate_delta_cost_sparse(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        i: int,
+        j: int,
+        sparse_flow: SparseFlow
+) -> float:
+    """
+    Compiled version of greedy_optimizations.calculate_delta_cost_sparse.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix. Unused, the flows are taken from
+    sparse_flow.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosome: One-dimensional numpy array representing the chromosome.
+    :param i: Index of the first element to swap.
+    :param j: Index of the second element to swap.
+    :param sparse_flow: The flow matrix in sparse form, see build_sparse_flow.
+    :return: The delta cost of the swap.
+    """
+    return _sparse_delta_cost_kernel(distance_matrix, chromosome, i, j, *sparse_flow)
+
+
+def numba_sparse_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray, sparse_flow: SparseFlow) -> float:
+    """
+    Compiled version of fitness_function.sparse_fitness_function.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix. Unused, the flows are taken from
+    sparse_flow
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosome: One-dimensional numpy array representing the chromosome
+    :param sparse_flow: The flow matrix in sparse form, see build_sparse_flow
+    :return: The fitness value of the chromosome
+    """
+    return _sparse_fitness_kernel(distance_matrix, chromosome, *flow_edges(sparse_flow))
+
+
+def numba_basic_fitness_function(flow_matrix: ndarray, distance_matrix: ndarray, chromosome: ndarray) -> float:
+    """
+    Compiled version of fitness_function.basic_fitness_function.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosome: One-dimensional numpy array representing the chromosome
+    :return: The fitness value of the chromosome
+    """
+    return _fitness_kernel(flow_matrix, distance_matrix, chromosome)
+
+
+@njit(cache=True)
+def _two_opt_kernel(flow_matrix, distance_matrix, chromosome, number_of_iterations, symmetric):
+    n = len(chromosome)
+    improved = True
+    number_of_iteration = 0
+    number_of_swaps = 0
+    while improved and number_of_iteration < number_of_iterations:
+        number_of_iteration += 1
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                if symmetric:
+                    delta = _symmetric_delta_cost_kernel(flow_matrix, distance_matrix, chromosome, i, j)
+                else:
+                    delta = _delta_cost_kernel(flow_matrix, distance_matrix, chromosome, i, j)
+                if delta < 0:
+                    tmp = chromosome[j]
+                    chromosome[j] = chromosome[i]
+                    chromosome[i] = tmp
+                    improved = True
+                    number_of_swaps += 1
+    return number_of_iteration, number_of_swaps
+
+
+@njit(cache=True)
+def _delta_cost_kernel(flow_matrix, distance_matrix, chromosome, i, j):
+    delta = np.int64(0)
+    if i == j:
+        return delta
+
+    a, b = chromosome[i], chromosome[j]
+    for k in range(len(chromosome)):
+        if k != i and k != j:
+            c = chromosome[k]
+            distance_b_c, distance_a_c = np.int64(distance_matrix[b, c]), np.int64(distance_matrix[a, c])
+            distance_c_b, distance_c_a = np.int64(distance_matrix[c, b]), np.int64(distance_matrix[c, a])
+            delta += (np.int64(flow_matrix[i, k]) * (distance_b_c - distance_a_c) +
+                      np.int64(flow_matrix[j, k]) * (distance_a_c - distance_b_c) +
+                      np.int64(flow_matrix[k, i]) * (distance_c_b - distance_c_a) +
+                      np.int64(flow_matrix[k, j]) * (distance_c_a - distance_c_b))
+    return delta
+
+
+@njit(cache=True)
+def _symmetric_delta_cost_kernel(flow_matrix, distance_matrix, chromosome, i, j):
+    delta = np.int64(0)
+    if i == j:
+        return delta
+
+    a, b = chromosome[i], chromosome[j]
+    for k in range(len(chromosome)):
+        if k != i and k != j:
+            c = chromosome[k]
+            delta += ((np.int64(flow_matrix[i, k]) - np.int64(flow_matrix[j, k])) *
+                      (np.int64(distance_matrix[b, c]) - np.int64(distance_matrix[a, c])))
+    return 2 * delta
+
+
+@njit(cache=True)
+def _sparse_two_opt_kernel(distance_matrix, chromosome, number_of_iterations, indptr, indices, data, transposed_indptr,
+                           transposed_indices, transposed_data, symmetric):
+    n = len(chromosome)
+    improved = True
+    number_of_iteration = 0
+    number_of_swaps = 0
+    while improved and number_of_iteration < number_of_iterations:
+        number_of_iteration += 1
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                if _sparse_delta_cost_kernel(distance_matrix, chromosome, i, j, indptr, indices, data, transposed_indptr,
+                                             transposed_indices, transposed_data, symmetric) < 0:
+                    tmp = chromosome[j]
+                    chromosome[j] = chromosome[i]
+                    chromosome[i] = tmp
+                    improved = True
+                    number_of_swaps += 1
+    return number_of_iteration, number_of_swaps
+
+
+@njit(cache=True)
+def _sparse_delta_cost_kernel(distance_matrix, chromosome, i, j, indptr, indices, data, transposed_indptr,
+                              transposed_indices, transposed_data, symmetric):
+    delta = np.int64(0)
+    if i == j:
+        return delta
+
+    a, b = chromosome[i], chromosome[j]
+    for row, sign in ((i, 1), (j, -1)):
+        for entry in range(indptr[row], indptr[row + 1]):
+            k = indices[entry]
+            if k != i and k != j:
+                c = chromosome[k]
+                delta += sign * data[entry] * (np.int64(distance_matrix[b, c]) - np.int64(distance_matrix[a, c]))
+    if symmetric:
+        return 2 * delta
+
+    for row, sign in ((i, 1), (j, -1)):
+        for entry in range(transposed_indptr[row], transposed_indptr[row + 1]):
+            k = transposed_indices[entry]
+            if k != i and k != j:
+                c = chromosome[k]
+                delta += sign * transposed_data[entry] * (np.int64(distance_matrix[c, b]) - np.int64(distance_matrix[c, a]))
+    return delta
+
+
+@njit(cache=True)
+def _sparse_fitness_kernel(distance_matrix, chromosome, sources, targets, weights):
+    fitness = np.int64(0)
+    for edge in range(len(weights)):
+        fitness += weights[edge] * np.int64(distance_matrix[chromosome[sources[edge]], chromosome[targets[edge]]])
+    return fitness
+
+
+@njit(cache=True)
+def _fitness_kernel(flow_matrix, distance_matrix, chromosome):
+    fitness = np.int64(0)
+    n = len(chromosome)
+    for k in range(n):
+        location = chromosome[k]
+        for l in range(n):
+            fitness += np.int64(flow_matrix[k, l]) * np.int64(distance_matrix[location, chromosome[l]])
+    return fitness
+
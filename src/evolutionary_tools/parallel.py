@@ -0,0 +1,269 @@
+import atexit
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+from numpy import ndarray
+
+from src.evolutionary_tools.local_search_cache import LocalSearchCache
+from src.evolutionary_tools.metrics import current_metrics
+
+# Number of tasks per worker and generation, more tasks balance the load better at the cost of more messages
+TASKS_PER_WORKER = 2
+
+# State of the worker processes: the attached shared memory blocks, the matrices backed by them and the local search
+# cache, see worker_local_search_cache. Each pool belongs to one owner (e.g. a Solver), so is this state
+_WORKER_SHARED_MEMORY: list[SharedMemory] = []
+_WORKER_MATRICES: tuple[ndarray, ndarray] | None = None
+_WORKER_LOCAL_SEARCH_CACHE: LocalSearchCache | None = None
+
+
+def parallel_optimize(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosomes: ndarray,
+        optimize_chromosomes: Callable[[ndarray, ndarray, ndarray], ndarray],
+        number_of_workers: int,
+        dont_look_bits: ndarray | None = None,
+        worker_pool: "WorkerPool | None" = None
+) -> ndarray:
+    """
+    Optimize the chromosomes in a persistent pool of worker processes. The flow and distance matrices are placed in
+    shared memory once per pool, such that only the chromosomes are sent to and received from the workers.
+    Since the chromosomes are optimized independently, the result is the same as optimize_chromosomes(flow_matrix,
+    distance_matrix, chromosomes) for deterministic local searches.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes.
+    :param optimize_chromosomes: Picklable function (e.g. a module level function or a partial of one) taking the flow
+    matrix, the distance matrix and a two-dimensional array of chromosomes and returning the optimized chromosomes
+    :param number_of_workers: The number of worker processes
+    :param dont_look_bits: Optional two-dimensional boolean numpy array of the don't-look bits of each chromosome,
+    passed on to optimize_chromosomes as dont_look_bits for the chromosomes of each task
+    :param worker_pool: The pool of worker processes, see parallel_map
+    :return: Two-dimensional numpy array containing the optimized chromosomes
+    """
+    number_of_tasks = min(len(chromosomes), number_of_workers * TASKS_PER_WORKER)
+    tasks = np.array_split(chromosomes, number_of_tasks)
+    if dont_look_bits is not None:
+        tasks = list(zip(tasks, np.array_split(dont_look_bits, number_of_tasks)))
+        optimize_chromosomes = partial(_optimize_with_dont_look_bits, optimize_chromosomes)
+    return np.concatenate(parallel_map(flow_matrix, distance_matrix, optimize_chromosomes, tasks, number_of_workers, worker_pool))
+
+
+def _optimize_with_dont_look_bits(
+        optimize_chromosomes: Callable[..., ndarray],
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        task: tuple[ndarray, ndarray]
+) -> ndarray:
+    """
+    Task of parallel_optimize for chromosomes with don't-look bits.
+    :param optimize_chromosomes: The function optimizing the chromosomes, see parallel_optimize
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param task: A tuple of the chromosomes and their don't-look bits
+    :return: Two-dimensional numpy array containing the optimized chromosomes
+    """
+    chromosomes, dont_look_bits = task
+    return optimize_chromosomes(flow_matrix, distance_matrix, chromosomes, dont_look_bits=dont_look_bits)
+
+
+def parallel_map(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        function: Callable[[ndarray, ndarray, Any], Any],
+        items: Iterable,
+        number_of_workers: int,
+        worker_pool: "WorkerPool | None" = None
+) -> list:
+    """
+    Apply a function to each item in the persistent pool of worker processes, see parallel_optimize. The metrics
+    collected by the workers while applying the function are merged into the current metrics.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param function: Picklable function taking the flow matrix, the distance matrix and an item
+    :param items: The (picklable) items
+    :param number_of_workers: The number of worker processes
+    :param worker_pool: The pool of worker processes. A Solver always passes its own pool, without one the pool selected
+    with use_worker_pool (DEFAULT_WORKER_POOL unless selected otherwise) is used by calls outside of a Solver
+    :return: A list containing the result of function(flow_matrix, distance_matrix, item) for each item, in order
+    """
+    if worker_pool is None:
+        pool = get_worker_pool(flow_matrix, distance_matrix, number_of_workers)
+    else:
+        pool = worker_pool.get(flow_matrix, distance_matrix, number_of_workers)
+    metrics = current_metrics()
+    results = []
+    for result, metrics_state in pool.map(_run_in_worker, repeat(function), items):
+        metrics.merge(metrics_state)
+        results.append(result)
+    return results
+
+
+def in_worker_process() -> bool:
+    """
+    :return: Whether the calling process is a worker of the pool, in which case it must not start a pool itself
+    """
+    return _WORKER_MATRICES is not None
+
+
+def worker_local_search_cache(max_bytes: int) -> LocalSearchCache:
+    """
+    Get the local search cache of the calling worker process, which is kept across the tasks of its pool (e.g. the
+    epochs of an island, see evolve_island) and discarded with the pool.
+    :param max_bytes: Maximum estimated memory of the cache in bytes, used when the cache is created
+    :return: The cache of the worker process
+    """
+    global _WORKER_LOCAL_SEARCH_CACHE
+    if not in_worker_process():
+        raise RuntimeError("The worker local search cache is only available in the worker processes of a pool")
+    if _WORKER_LOCAL_SEARCH_CACHE is None:
+        _WORKER_LOCAL_SEARCH_CACHE = LocalSearchCache(max_bytes)
+    return _WORKER_LOCAL_SEARCH_CACHE
+
+
+class WorkerPool:
+    """
+    A pool of worker processes together with the shared memory blocks holding the matrices the workers operate on.
+    The processes are started on first use and replaced if the matrices or the number of workers change.
+    """
+
+    def __init__(self):
+        self.executor: ProcessPoolExecutor | None = None
+        self.shared_memory: list[SharedMemory] = []
+        # Digests of the matrices and the number of workers of the running executor
+        self.key: tuple | None = None
+        self.lock = threading.Lock()
+
+    def get(self, flow_matrix: ndarray, distance_matrix: ndarray, number_of_workers: int) -> ProcessPoolExecutor:
+        """
+        Get the executor for the given matrices, creating it (and shutting down the previous one) if the matrices or
+        the number of workers changed.
+        :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+        :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+        :param number_of_workers: The number of worker processes
+        :return: The executor
+        """
+        key = (_matrix_digest(flow_matrix), _matrix_digest(distance_matrix), number_of_workers)
+        with self.lock:
+            if self.executor is not None and self.key == key:
+                return self.executor
+
+            self._shutdown()
+            matrix_descriptions = []
+            for matrix in (flow_matrix, distance_matrix):
+                shared_memory = SharedMemory(create=True, size=max(matrix.nbytes, 1))
+                np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shared_memory.buf)[:] = matrix
+                self.shared_memory.append(shared_memory)
+                matrix_descriptions.append((shared_memory.name, matrix.shape, matrix.dtype.str))
+
+            self.executor = ProcessPoolExecutor(max_workers=number_of_workers, initializer=_attach_matrices,
+                                                initargs=(matrix_descriptions,))
+            self.key = key
+            return self.executor
+
+    def shutdown(self):
+        """
+        Shut down the worker processes (if any) and release the shared memory holding the matrices.
+        """
+        with self.lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+            self.key = None
+        for shared_memory in self.shared_memory:
+            shared_memory.close()
+            shared_memory.unlink()
+        self.shared_memory.clear()
+
+
+# Pool of the module level functions called without a pool outside of a Solver, unless another one is selected with
+# use_worker_pool. A Solver passes its own pool explicitly
+DEFAULT_WORKER_POOL = WorkerPool()
+_CURRENT_WORKER_POOL: ContextVar[WorkerPool] = ContextVar("current_worker_pool", default=DEFAULT_WORKER_POOL)
+
+
+@contextmanager
+def use_worker_pool(pool: WorkerPool) -> Iterator[WorkerPool]:
+    """
+    Context manager running the parallel work of its body (in the current thread) in the given pool instead of
+    DEFAULT_WORKER_POOL, such that concurrent runs do not replace each other's worker processes.
+    :param pool: The pool to use
+    """
+    token = _CURRENT_WORKER_POOL.set(pool)
+    try:
+        yield pool
+    finally:
+        _CURRENT_WORKER_POOL.reset(token)
+
+
+def get_worker_pool(flow_matrix: ndarray, distance_matrix: ndarray, number_of_workers: int) -> ProcessPoolExecutor:
+    """
+    Get the executor of the current pool (see use_worker_pool) for the given matrices, see WorkerPool.get.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix.
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix.
+    :param number_of_workers: The number of worker processes
+    :return: The executor
+    """
+    return _CURRENT_WORKER_POOL.get().get(flow_matrix, distance_matrix, number_of_workers)
+
+
+def shutdown_worker_pool():
+    """
+    Shut down the worker processes of the current pool (if any) and release the shared memory holding the matrices.
+    """
+    _CURRENT_WORKER_POOL.get().shutdown()
+
+
+def _attach_matrices(matrix_descriptions: list[tuple[str, tuple[int, ...], str]]):
+    """
+    Initializer of the worker processes attaching the shared memory blocks holding the flow and distance matrix.
+    :param matrix_descriptions: Name, shape and dtype of the shared memory block of each matrix
+    """
+    global _WORKER_MATRICES
+    matrices = []
+    for name, shape, dtype in matrix_descriptions:
+        shared_memory = SharedMemory(name=name)
+        _WORKER_SHARED_MEMORY.append(shared_memory)
+        matrices.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory.buf))
+    _WORKER_MATRICES = (matrices[0], matrices[1])
+
+
+def _run_in_worker(function: Callable[[ndarray, ndarray, Any], Any], item: Any) -> tuple[Any, dict[str, dict]]:
+    """
+    Task executed by the worker processes.
+    :param function: The function to apply, see parallel_map
+    :param item: The item to apply the function to
+    :return: A tuple of the result of the function and the metrics collected while applying it
+    """
+    flow_matrix, distance_matrix = _WORKER_MATRICES
+    metrics = current_metrics()
+    metrics.clear()
+    result = function(flow_matrix, distance_matrix, item)
+    return result, metrics.state()
+
+
+def _matrix_digest(matrix: ndarray) -> bytes:
+    """
+    Calculate a digest identifying the content of a matrix.
+    :param matrix: The matrix to identify
+    :return: The digest of the shape, dtype and bytes of the matrix
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str((matrix.shape, matrix.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(matrix).tobytes())
+    return digest.digest()
+
+
+atexit.register(DEFAULT_WORKER_POOL.shutdown)
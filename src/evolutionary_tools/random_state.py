@@ -0,0 +1,14 @@
+import numpy as np
+from numpy.random import RandomState
+
+
+def resolve_random_state(random_state: RandomState | None) -> RandomState:
+    """
+    Get the random number generator to draw from. Operators take an optional random_state, such that independent runs
+    (e.g. of several Solver objects) can draw from their own generators.
+    :param random_state: The random number generator or None
+    :return: random_state or, if it is None, the np.random module, whose functions draw from the global generator
+    """
+    if random_state is None:
+        return np.random
+    return random_state
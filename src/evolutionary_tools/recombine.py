@@ -3,41 +3,84 @@ from typing import Callable
 
 import numpy as np
 from numpy import ndarray
+from numpy.random import RandomState
 
+from src.evolutionary_tools.random_state import resolve_random_state
 
-def recombine_chromosomes(chromosomes: ndarray, recombination_function: Callable[[ndarray, ndarray], tuple[ndarray, ndarray]]) -> ndarray:
+
+def recombine_chromosomes(
+        chromosomes: ndarray,
+        recombination_function: Callable[[ndarray, ndarray], tuple[ndarray, ndarray]],
+        parent_fitness: ndarray | None = None,
+        random_state: RandomState | None = None
+) -> ndarray | tuple[ndarray, ndarray, ndarray, ndarray]:
     """
     Recombine the provided chromosomes (parents) to a new population of the same size using the provided recombination function.
     :param chromosomes: The chromosomes to recombine
-    :param recombination_function: The recombination function to use
-    :return: The new population
+    :param recombination_function: The recombination function to use, either a function recombining two parents or one
+    of BULK_RECOMBINATION_FUNCTIONS recombining all pairs at once
+    :param parent_fitness: Optional fitness values of the parents. If provided, the changes of each child with respect
+    to the parent it differs least from (its reference parent) are returned as well, see track_changes_to_parents
+    :param random_state: The random number generator passed to the recombination function
+    :return: The new population or, if parent_fitness is provided, a four tuple of the new population, the reference
+    parents, their fitness values and a boolean array marking the positions in which the children differ from them
     """
-    new_population = np.empty_like(chromosomes)
-    for i in range(0, len(chromosomes), 2):
-        child_one, child_two = recombination_function(chromosomes[i], chromosomes[i + 1])
-        new_population[i] = child_one
-        new_population[i + 1] = child_two
-    return new_population
+    if recombination_function in BULK_RECOMBINATION_FUNCTIONS:
+        new_population = recombination_function(chromosomes, random_state=random_state)
+    else:
+        new_population = np.empty_like(chromosomes)
+        for i in range(0, len(chromosomes), 2):
+            child_one, child_two = recombination_function(chromosomes[i], chromosomes[i + 1], random_state=random_state)
+            new_population[i] = child_one
+            new_population[i + 1] = child_two
+
+    if parent_fitness is None:
+        return new_population
+    return new_population, *track_changes_to_parents(chromosomes, parent_fitness, new_population)
 
 
-def create_children_by_copying_crossover_part_from_parents(parent_one: ndarray, parent_two: ndarray) -> tuple[ndarray, ndarray, ndarray]:
+def track_changes_to_parents(parents: ndarray, parent_fitness: ndarray, children: ndarray) -> tuple[ndarray, ndarray, ndarray]:
+    """
+    Determine for each child the parent of its pair it differs from in the fewest positions (the reference parent) and
+    the positions in which it differs from it. Children i and i + 1 are assumed to stem from parents i and i + 1.
+    :param parents: The parents the children were recombined from
+    :param parent_fitness: The fitness values of the parents
+    :param children: The children
+    :return: A three tuple of the reference parents, their fitness values and a boolean array marking the positions in
+    which each child differs from its reference parent
+    """
+    # Index of the other parent of the same pair
+    partner = np.arange(len(parents)) ^ 1
+    changed_to_own = children != parents
+    changed_to_partner = children != parents[partner]
+
+    use_partner = changed_to_partner.sum(axis=1) < changed_to_own.sum(axis=1)
+    reference = np.where(use_partner, partner, np.arange(len(parents)))
+    changed_positions = np.where(use_partner[:, np.newaxis], changed_to_partner, changed_to_own)
+    return parents[reference], parent_fitness[reference], changed_positions
+
+
+def create_children_by_copying_crossover_part_from_parents(parent_one: ndarray, parent_two: ndarray, random_state: RandomState | None = None) -> tuple[ndarray, ndarray, ndarray]:
     """
     Create two children by copying the crossover part from the parents. That is, generate two crossover points and copy the
     first parents genes in this crossover range to the first child and the second parents genes in this crossover range to
-    the second child. The remaining genes of the children are filled with -1.
+    the second child. The remaining genes of the children are filled with -1, so the children are of a signed type wide
+    enough for the genes and -1 (e.g. int16 for uint8 parents).
     :param parent_one: The first parent to copy over
     :param parent_two: The second parent to copy over
+    :param random_state: The random number generator, the global one by default
     :return: A three tuple containing the first child, the second child and an array with the two crossover points (sorted)
     """
     # Get the length of the chromosome
     chromosome_length = parent_one.shape[0]
 
     # Generate two random indices
-    crossover_points = np.random.choice(chromosome_length, 2, replace=False)
+    crossover_points = resolve_random_state(random_state).choice(chromosome_length, 2, replace=False)
     crossover_points.sort()
 
-    child_one = -1 * np.ones_like(parent_one)
-    child_two = -1 * np.ones_like(parent_two)
+    child_dtype = np.promote_types(parent_one.dtype, np.int8)
+    child_one = np.full(parent_one.shape, -1, dtype=child_dtype)
+    child_two = np.full(parent_two.shape, -1, dtype=child_dtype)
 
     child_one[crossover_points[0]:crossover_points[1]] = parent_one[crossover_points[0]:crossover_points[1]]
     child_two[crossover_points[0]:crossover_points[1]] = parent_two[crossover_points[0]:crossover_points[1]]
@@ -45,17 +88,18 @@ def create_children_by_copying_crossover_part_from_parents(parent_one: ndarray,
     return child_one, child_two, crossover_points
 
 
-def order_crossing(parent_one: ndarray, parent_two: ndarray) -> tuple[ndarray, ndarray]:
+def order_crossing(parent_one: ndarray, parent_two: ndarray, random_state: RandomState | None = None) -> tuple[ndarray, ndarray]:
     """
     Perform order crossing on the two parents. See https://en.wikipedia.org/wiki/Crossover_(evolutionary_algorithm)#Order_crossover_(OX1)
     (two point order crossover).
     :param parent_one: The first parent
     :param parent_two: The second parent
+    :param random_state: The random number generator, the global one by default
     :return: A tuple containing the two resulting children
     """
     chromosome_length = parent_one.shape[0]
 
-    child_one, child_two, crossover_points = create_children_by_copying_crossover_part_from_parents(parent_one, parent_two)
+    child_one, child_two, crossover_points = create_children_by_copying_crossover_part_from_parents(parent_one, parent_two, random_state)
 
     # Perform the crossover
     child_one_parent_index = crossover_points[1]
@@ -75,19 +119,20 @@ def order_crossing(parent_one: ndarray, parent_two: ndarray) -> tuple[ndarray, n
         child_two_parent_index = (child_two_parent_index + 1) % chromosome_length
 
         child_index = (child_index + 1) % chromosome_length
-    return child_one, child_two
+    return child_one.astype(parent_one.dtype), child_two.astype(parent_two.dtype)
 
 
-def partially_mapped_crossover(parent_one: ndarray, parent_two: ndarray) -> tuple[ndarray, ndarray]:
+def partially_mapped_crossover(parent_one: ndarray, parent_two: ndarray, random_state: RandomState | None = None) -> tuple[ndarray, ndarray]:
     """
     Perform partially mapped crossover on the two parents. See https://en.wikipedia.org/wiki/Crossover_(evolutionary_algorithm)#Partially_mapped_crossover_(PMX)
     :param parent_one: The first parent
     :param parent_two: The second parent
+    :param random_state: The random number generator, the global one by default
     :return: A tuple containing the two resulting children
     """
     chromosome_length = parent_one.shape[0]
 
-    child_one, child_two, crossover_points = create_children_by_copying_crossover_part_from_parents(parent_one, parent_two)
+    child_one, child_two, crossover_points = create_children_by_copying_crossover_part_from_parents(parent_one, parent_two, random_state)
 
     parent_one_list = list(parent_one)
     parent_two_list = list(parent_two)
@@ -112,4 +157,121 @@ def partially_mapped_crossover(parent_one: ndarray, parent_two: ndarray) -> tupl
     mask = child_two[:] == -1
     child_two[mask] = parent_one[mask]
 
-    return child_one, child_two
+    return child_one.astype(parent_one.dtype), child_two.astype(parent_two.dtype)
+
+
+def bulk_order_crossing(parents: ndarray, crossover_points: ndarray | None = None, random_state: RandomState | None = None) -> ndarray:
+    """
+    Perform order crossing (see order_crossing) on all pairs of parents at once. Parents 2i and 2i + 1 are recombined to
+    children 2i and 2i + 1.
+    :param parents: Two-dimensional numpy array representing the parents
+    :param crossover_points: Optional two-dimensional numpy array containing the sorted crossover points of each pair,
+    drawn like in create_children_by_copying_crossover_part_from_parents if not provided
+    :param random_state: The random number generator drawing the crossover points, the global one by default
+    :return: Two-dimensional numpy array containing the children
+    """
+    parent_one, parent_two = parents[0::2], parents[1::2]
+    if crossover_points is None:
+        crossover_points = generate_crossover_points(len(parent_one), parents.shape[1], random_state)
+
+    children = np.empty_like(parents)
+    children[0::2] = order_crossing_children(parent_one, parent_two, crossover_points)
+    children[1::2] = order_crossing_children(parent_two, parent_one, crossover_points)
+    return children
+
+
+def bulk_partially_mapped_crossover(parents: ndarray, crossover_points: ndarray | None = None, random_state: RandomState | None = None) -> ndarray:
+    """
+    Perform partially mapped crossover (see partially_mapped_crossover) on all pairs of parents at once. Parents 2i and
+    2i + 1 are recombined to children 2i and 2i + 1.
+    :param parents: Two-dimensional numpy array representing the parents
+    :param crossover_points: Optional two-dimensional numpy array containing the sorted crossover points of each pair,
+    drawn like in create_children_by_copying_crossover_part_from_parents if not provided
+    :param random_state: The random number generator drawing the crossover points, the global one by default
+    :return: Two-dimensional numpy array containing the children
+    """
+    parent_one, parent_two = parents[0::2], parents[1::2]
+    if crossover_points is None:
+        crossover_points = generate_crossover_points(len(parent_one), parents.shape[1], random_state)
+
+    children = np.empty_like(parents)
+    children[0::2] = partially_mapped_children(parent_one, parent_two, crossover_points)
+    children[1::2] = partially_mapped_children(parent_two, parent_one, crossover_points)
+    return children
+
+
+def generate_crossover_points(number_of_pairs: int, chromosome_length: int, random_state: RandomState | None = None) -> ndarray:
+    """
+    Generate two distinct crossover points for each pair of parents, uniformly like np.random.choice(chromosome_length,
+    2, replace=False).
+    :param number_of_pairs: The number of pairs of parents
+    :param chromosome_length: The length of the chromosomes
+    :param random_state: The random number generator, the global one by default
+    :return: Two-dimensional numpy array of shape (number_of_pairs, 2) containing the sorted crossover points
+    """
+    random_state = resolve_random_state(random_state)
+    first = random_state.randint(0, chromosome_length, size=number_of_pairs)
+    second = random_state.randint(0, chromosome_length - 1, size=number_of_pairs)
+    second += second >= first
+    return np.sort(np.stack([first, second], axis=1), axis=1)
+
+
+def order_crossing_children(segment_parents: ndarray, other_parents: ndarray, crossover_points: ndarray) -> ndarray:
+    """
+    Create one child per pair by order crossing, copying the crossover range from the segment parent and filling the
+    remaining positions, starting after the crossover range, with the missing genes in the order of the other parent.
+    :param segment_parents: Two-dimensional numpy array representing the parents providing the crossover range
+    :param other_parents: Two-dimensional numpy array representing the parents providing the order of the other genes
+    :param crossover_points: Two-dimensional numpy array containing the sorted crossover points of each pair
+    :return: Two-dimensional numpy array containing the children
+    """
+    number_of_pairs, chromosome_length = segment_parents.shape
+    rows = np.arange(number_of_pairs)[:, np.newaxis]
+    start, end = crossover_points[:, 0:1], crossover_points[:, 1:2]
+    positions = np.arange(chromosome_length)[np.newaxis, :]
+
+    # The genes of the other parent in the order they are visited, starting at the end of the crossover range
+    visited_genes = other_parents[rows, (end + positions) % chromosome_length]
+    # Position of each gene in the segment parent (inverse permutation)
+    segment_position = np.argsort(segment_parents, axis=1)
+    missing = ~((start <= segment_position[rows, visited_genes]) & (segment_position[rows, visited_genes] < end))
+
+    children = segment_parents.copy()
+    target = (end + np.cumsum(missing, axis=1) - 1) % chromosome_length
+    children[np.broadcast_to(rows, missing.shape)[missing], target[missing]] = visited_genes[missing]
+    return children
+
+
+def partially_mapped_children(segment_parents: ndarray, other_parents: ndarray, crossover_points: ndarray) -> ndarray:
+    """
+    Create one child per pair by partially mapped crossover, copying the crossover range from the segment parent and
+    the remaining positions from the other parent. Genes of the other parent which already occur in the crossover range
+    are replaced by following the mapping segment_parent[i] -> other_parent[i] until a gene outside of it is reached.
+    :param segment_parents: Two-dimensional numpy array representing the parents providing the crossover range
+    :param other_parents: Two-dimensional numpy array representing the parents providing the remaining positions
+    :param crossover_points: Two-dimensional numpy array containing the sorted crossover points of each pair
+    :return: Two-dimensional numpy array containing the children
+    """
+    number_of_pairs, chromosome_length = segment_parents.shape
+    rows = np.arange(number_of_pairs)[:, np.newaxis]
+    start, end = crossover_points[:, 0:1], crossover_points[:, 1:2]
+    positions = np.arange(chromosome_length)[np.newaxis, :]
+    in_range = (start <= positions) & (positions < end)
+
+    # Position of each gene in the segment parent (inverse permutation)
+    segment_position = np.argsort(segment_parents, axis=1)
+
+    genes = other_parents.copy()
+    gene_position = segment_position[rows, genes]
+    conflicting = ~in_range & (start <= gene_position) & (gene_position < end)
+    # Each step resolves one link of the mapping chains of all conflicting genes at once
+    while np.any(conflicting):
+        genes[conflicting] = other_parents[np.broadcast_to(rows, genes.shape)[conflicting], gene_position[conflicting]]
+        gene_position = segment_position[rows, genes]
+        conflicting &= (start <= gene_position) & (gene_position < end)
+
+    return np.where(in_range, segment_parents, genes)
+
+
+# Recombination functions taking all parents at once, see recombine_chromosomes
+BULK_RECOMBINATION_FUNCTIONS = (bulk_order_crossing, bulk_partially_mapped_crossover)
@@ -1,35 +1,69 @@
+from typing import Callable
+
 import numpy as np
 from numpy import ndarray
+from numpy.random import RandomState
+
+from src.evolutionary_tools.random_state import resolve_random_state
 
+# Maximum number of rounds for replacing equal parents, reached only if (nearly) the whole population is identical
+MAXIMUM_DEDUPLICATION_ROUNDS = 100
 
-def roulette_wheel_selection(population: ndarray, population_fitness: ndarray, tournament_size: int) -> ndarray:
+
+def roulette_wheel_selection(population: ndarray, population_fitness: ndarray, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
     """
     A basic roulette-wheel selection algorithm also known as fitness-proportionate selection.
     It selects chromosomes based on their fitness values, see https://en.wikipedia.org/wiki/Fitness_proportionate_selection
     :param population: The population of chromosomes on which to perform selection
     :param population_fitness: The population's fitness values
     :param tournament_size: Unused for this function
+    :param random_state: The random number generator, the global one by default
     :return: A numpy array of size len(population) containing the selected chromosomes (possibly containing duplicates)
     """
+    random_state = resolve_random_state(random_state)
     total_fitness = np.sum(population_fitness)
     probabilities = population_fitness / total_fitness
 
-    return population[np.random.choice(len(population), len(population), p=probabilities)]
+    return population[random_state.choice(len(population), len(population), p=probabilities)]
 
 
-def tournament_selection_two_tournament(population: ndarray, population_fitness: ndarray, tournament_size: int) -> ndarray:
+def stochastic_universal_sampling_selection(population: ndarray, population_fitness: ndarray, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
+    """
+    Fitness-proportionate selection by stochastic universal sampling, see https://en.wikipedia.org/wiki/Stochastic_universal_sampling
+    Selects with the same probabilities as roulette_wheel_selection, but with evenly spaced pointers on a single spin
+    of the wheel, such that each chromosome is selected floor or ceil of its expected number of times. The selected
+    chromosomes are shuffled, as they would otherwise be paired with themselves and their neighbours.
+    :param population: The population of chromosomes on which to perform selection
+    :param population_fitness: The population's fitness values
+    :param tournament_size: Unused for this function
+    :param random_state: The random number generator, the global one by default
+    :return: A numpy array of size len(population) containing the selected chromosomes (possibly containing duplicates)
+    """
+    random_state = resolve_random_state(random_state)
+    population_size = len(population)
+    cumulative_fitness = np.cumsum(population_fitness, dtype=np.float64)
+    distance = cumulative_fitness[-1] / population_size
+    pointers = (random_state.rand() + np.arange(population_size)) * distance
+
+    selected_indexes = np.minimum(np.searchsorted(cumulative_fitness, pointers, side="right"), population_size - 1)
+    return population[random_state.permutation(selected_indexes)]
+
+
+def tournament_selection_two_tournament(population: ndarray, population_fitness: ndarray, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
     """
     A basic biased tournament selection algorithm. The tournament size is fixed at 2. There might be fights of the same chromosome with itself.
     :param population: The population of chromosomes on which to perform selection
     :param population_fitness: The population's fitness values
     :param tournament_size: The size of the tournament. Unused for this function
+    :param random_state: The random number generator, the global one by default
     :return: A numpy array of size len(population) containing the selected chromosomes
     """
+    random_state = resolve_random_state(random_state)
     selected_chromosomes = np.empty_like(population)
 
     for i in range(len(population)):
-        first_fighter, second_fighter = np.random.choice(len(population), 2, replace=False)
-        random_number = np.random.rand()
+        first_fighter, second_fighter = random_state.choice(len(population), 2, replace=False)
+        random_number = random_state.rand()
         if population_fitness[first_fighter] > population_fitness[second_fighter]:
             selected_chromosomes[i] = population[first_fighter] if random_number < 0.9 else population[second_fighter]
         else:
@@ -38,75 +72,70 @@ def tournament_selection_two_tournament(population: ndarray, population_fitness:
     return selected_chromosomes
 
 
-def tournament_selection_two_tournament_bulk(population: ndarray, population_fitness: ndarray, tournament_size: int) -> ndarray:
+def tournament_selection_two_tournament_bulk(population: ndarray, population_fitness: ndarray, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
     """
     A basic biased tournament selection algorithm optimized for vectorized computation.
     The tournament size is fixed at 2. There might be fights of the same chromosome with itself.
     :param population: The population of chromosomes on which to perform selection
     :param population_fitness: The population's fitness values
     :param tournament_size: The size of the tournament. Unused for this function
+    :param random_state: The random number generator, the global one by default
     :return: A numpy array of size len(population) containing the selected chromosomes
     """
-    selected_fighters_indexes = np.random.choice(len(population), 2 * len(population), replace=True)
-    selected_fighters = population[selected_fighters_indexes]
+    random_state = resolve_random_state(random_state)
+    selected_fighters_indexes = random_state.choice(len(population), 2 * len(population), replace=True)
     selected_fighters_fitness = population_fitness[selected_fighters_indexes]
 
     winners_mask = (selected_fighters_fitness[::2] > selected_fighters_fitness[1::2]) & (
-                np.random.rand(len(population)) < 0.9)
-    winners = np.where(winners_mask[:, np.newaxis], selected_fighters[::2], selected_fighters[1::2])
+                random_state.rand(len(population)) < 0.9)
+    # Only the winners are gathered from the population
+    winners = population[np.where(winners_mask, selected_fighters_indexes[::2], selected_fighters_indexes[1::2])]
 
     return winners
 
 
-def tournament_selection_k_tournament_bulk(population: ndarray, population_fitness: ndarray, tournament_size: int) -> ndarray:
+def tournament_selection_k_tournament_bulk(population: ndarray, population_fitness: ndarray, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
     """
     A basic biased tournament selection algorithm optimized for vectorized computation.
     The tournament size is set by tournament_size. There might be fights of the same chromosome with itself.
     :param population: The population of chromosomes on which to perform selection
     :param population_fitness: The population's fitness values
     :param tournament_size: The size of the tournament
+    :param random_state: The random number generator, the global one by default
     :return: A numpy array of size len(population) containing the selected chromosomes
     """
-    selected_fighters_indexes = np.random.choice(len(population), tournament_size * len(population), replace=True)
-    selected_fighters = population[selected_fighters_indexes]
+    random_state = resolve_random_state(random_state)
+    selected_fighters_indexes = random_state.choice(len(population), tournament_size * len(population), replace=True)
     selected_fighters_fitness = population_fitness[selected_fighters_indexes]
 
     winners_mask = (selected_fighters_fitness[::tournament_size] > selected_fighters_fitness[1::tournament_size]) # & (np.random.rand(len(population)) < 0.9)
-    winners = np.where(winners_mask[:, np.newaxis], selected_fighters[::tournament_size], selected_fighters[1::tournament_size])
+    winners = population[np.where(winners_mask, selected_fighters_indexes[::tournament_size], selected_fighters_indexes[1::tournament_size])]
 
     return winners
 
 
-def tournament_selection_k_tournament_bulk_no_duplicates(population: ndarray, population_fitness: ndarray, tournament_size: int) -> ndarray:
+def tournament_selection_k_tournament_bulk_no_duplicates(population: ndarray, population_fitness: ndarray, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
     """
     A basic biased tournament selection algorithm optimized for vectorized computation.
     The tournament size is set by tournament_size. There will not be fights of the same chromsome with itself.
     :param population: The population of chromosomes on which to perform selection
     :param population_fitness: The population's fitness values
     :param tournament_size: The size of the tournament
+    :param random_state: The random number generator, the global one by default
     :return: A numpy array of size len(population) containing the selected chromosomes
     """
-    population_size = len(population)
-
-    # Create an array to hold the results
-    selected_fighters_indexes = np.empty(population_size * tournament_size, dtype=int)
+    selected_fighters_indexes = draw_tournaments_without_duplicates(len(population), tournament_size, random_state).ravel()
 
-    # For each slot in the population, perform a random choice with no replacement
-    for i in range(population_size):
-        selected_fighters_indexes[i * tournament_size: (i + 1) * tournament_size] = np.random.choice(
-            population_size, tournament_size, replace=False
-        )
-
-    selected_fighters = population[selected_fighters_indexes]
     selected_fighters_fitness = population_fitness[selected_fighters_indexes]
 
     winners_mask = (selected_fighters_fitness[::tournament_size] > selected_fighters_fitness[1::tournament_size]) # & (np.random.rand(len(population)) < 0.9)
-    winners = np.where(winners_mask[:, np.newaxis], selected_fighters[::tournament_size], selected_fighters[1::tournament_size])
+    winners = population[np.where(winners_mask, selected_fighters_indexes[::tournament_size], selected_fighters_indexes[1::tournament_size])]
 
     return winners
 
 
-def tournament_selection_k_tournament_no_duplicates_unbiased(population: ndarray, population_fitness: ndarray, tournament_size: int, p: float = 0.5) -> ndarray:
+def tournament_selection_k_tournament_no_duplicates_unbiased(population: ndarray, population_fitness: ndarray, tournament_size: int, p: float = 0.5,
+                                                            random_state: RandomState | None = None) -> ndarray:
     """
     A basic unbiased tournament selection algorithm optimized for vectorized computation.
     The tournament size is set by tournament_size. There will not be fights of the same chromsome with itself.
@@ -115,32 +144,101 @@ def tournament_selection_k_tournament_no_duplicates_unbiased(population: ndarray
     :param population: The population of chromosomes on which to perform selection
     :param population_fitness: The population's fitness values
     :param tournament_size: The size of the tournament
+    :param random_state: The random number generator, the global one by default
     :return: A numpy array of size len(population) containing the selected chromosomes
     """
+    random_state = resolve_random_state(random_state)
     population_size = len(population)
+    tournaments = draw_tournaments_without_duplicates(population_size, tournament_size, random_state)
 
-    # Create an array to hold the results
-    selected_fighters_indexes = np.empty(population_size * tournament_size, dtype=int)
+    # Fighters of each tournament sorted by their fitness
+    sorted_tournaments = np.take_along_axis(tournaments, np.argsort(population_fitness[tournaments], axis=1), axis=1)
 
-    # For each slot in the population, perform a random choice with no replacement
-    for i in range(population_size):
-        selected_fighters_indexes[i * tournament_size: (i + 1) * tournament_size] = np.random.choice(
-            population_size, tournament_size, replace=False
-        )
+    # The winner is the fighter at the number of consecutive successes with probability p (at most tournament_size - 1)
+    successes = random_state.rand(population_size, tournament_size - 1) < p
+    winner_ranks = np.cumprod(successes, axis=1).sum(axis=1)
 
-    selected_fighters = population[selected_fighters_indexes]
-    selected_fighters_fitness = population_fitness[selected_fighters_indexes]
+    return population[sorted_tournaments[np.arange(population_size), winner_ranks]]
 
-    winners = np.empty_like(population)
-    for index in range(population_size):
-        fighters_for_this_tournament = selected_fighters[index * tournament_size: (index + 1) * tournament_size]
-        fighters_fitness_for_this_tournament = selected_fighters_fitness[index * tournament_size: (index + 1) * tournament_size]
 
-        sorted_fighters_for_this_tournament = fighters_for_this_tournament[np.argsort(fighters_fitness_for_this_tournament)]
+def draw_tournaments_without_duplicates(population_size: int, tournament_size: int, random_state: RandomState | None = None) -> ndarray:
+    """
+    Draw one tournament per chromosome, each consisting of tournament_size distinct chromosomes chosen uniformly.
+    Tournaments are drawn with replacement and those containing duplicates are redrawn, which rarely happens for
+    tournament sizes much smaller than the population. Otherwise, random keys are sorted per tournament instead.
+    :param population_size: The size of the population (and the number of tournaments)
+    :param tournament_size: The size of each tournament
+    :param random_state: The random number generator, the global one by default
+    :return: Two-dimensional numpy array of shape (population_size, tournament_size) with the indexes of the fighters
+    """
+    if tournament_size > population_size:
+        raise ValueError(f"Tournament size {tournament_size} exceeds population size {population_size}")
+    random_state = resolve_random_state(random_state)
+    if tournament_size ** 2 > population_size:
+        return np.argsort(random_state.rand(population_size, population_size), axis=1)[:, :tournament_size]
+
+    tournaments = random_state.randint(0, population_size, size=(population_size, tournament_size))
+    while True:
+        sorted_tournaments = np.sort(tournaments, axis=1)
+        with_duplicates = np.flatnonzero(np.any(sorted_tournaments[:, 1:] == sorted_tournaments[:, :-1], axis=1))
+        if len(with_duplicates) == 0:
+            return tournaments
+        tournaments[with_duplicates] = random_state.randint(0, population_size, size=(len(with_duplicates), tournament_size))
+
+
+def replace_equal_parents(
+        selected_chromosomes: ndarray,
+        population: ndarray,
+        population_fitness: ndarray,
+        selection_function: Callable[[ndarray, ndarray, int], ndarray],
+        tournament_size: int,
+        random_state: RandomState | None = None
+) -> ndarray:
+    """
+    Replace the second parent of each pair (selected chromosomes 2i and 2i + 1) with equal parents by chromosomes from
+    further selections, until all pairs consist of different parents. Pairs are compared by row hashes (see
+    row_hashes), and only the pairs with equal hashes are compared in full.
+    :param selected_chromosomes: The selected chromosomes, modified in place
+    :param population: The population the chromosomes were selected from
+    :param population_fitness: The population's fitness values
+    :param selection_function: The selection function used for selecting the replacements
+    :param tournament_size: The tournament size passed to the selection function
+    :param random_state: The random number generator passed to the selection function
+    :return: The selected chromosomes without equal pairs, unless (nearly) the whole population is identical
+    """
+    hashes = row_hashes(selected_chromosomes)
+    first_parents, second_parents = selected_chromosomes[0::2], selected_chromosomes[1::2]
+    equal_pairs = np.flatnonzero(hashes[0::2] == hashes[1::2])
+
+    for _ in range(MAXIMUM_DEDUPLICATION_ROUNDS):
+        equal_pairs = equal_pairs[np.all(first_parents[equal_pairs] == second_parents[equal_pairs], axis=1)]
+        if len(equal_pairs) == 0:
+            break
+        alternatives = selection_function(population, population_fitness, tournament_size, random_state=random_state)[:len(equal_pairs)]
+        replaced_pairs, remaining_pairs = equal_pairs[:len(alternatives)], equal_pairs[len(alternatives):]
+        selected_chromosomes[2 * replaced_pairs + 1] = alternatives
+        equal_pairs = np.concatenate([replaced_pairs[hashes[2 * replaced_pairs] == row_hashes(alternatives)], remaining_pairs])
+    return selected_chromosomes
 
-        current_index = 0
-        while np.random.rand() < p and current_index < tournament_size - 1:
-            current_index += 1
-        winners[index] = sorted_fighters_for_this_tournament[current_index]
 
-    return winners
+def row_hashes(chromosomes: ndarray) -> ndarray:
+    """
+    Calculate a 64-bit hash of each chromosome as the wrapping dot product with fixed random odd multipliers. Equal
+    chromosomes have equal hashes, different chromosomes collide with a probability of about 2^-64.
+    :param chromosomes: Two-dimensional numpy array representing the chromosomes
+    :return: One-dimensional numpy array of type uint64 containing the hash of each chromosome
+    """
+    multipliers = position_multipliers(chromosomes.shape[1])
+    return (chromosomes.astype(np.uint64) * multipliers).sum(axis=1, dtype=np.uint64)
+
+
+def position_multipliers(length: int) -> ndarray:
+    """
+    Calculate pseudo-random odd 64-bit multipliers for the positions of a chromosome with the splitmix64 finalizer.
+    :param length: The length of the chromosomes
+    :return: One-dimensional numpy array of type uint64 containing the multiplier of each position
+    """
+    z = (np.arange(1, length + 1, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15))
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return (z ^ (z >> np.uint64(31))) | np.uint64(1)
@@ -0,0 +1,67 @@
+from typing import NamedTuple
+
+import numpy as np
+from numpy import ndarray
+
+
+class SparseFlow(NamedTuple):
+    """
+    Flow matrix in compressed sparse row (CSR) form, see build_sparse_flow. The nonzero flows from facility k are
+    data[indptr[k]:indptr[k + 1]] to the facilities indices[indptr[k]:indptr[k + 1]], the transposed arrays hold the
+    nonzero flows to each facility in the same form. The flows are int64, such that the kernels do not overflow.
+    """
+    indptr: ndarray
+    indices: ndarray
+    data: ndarray
+    transposed_indptr: ndarray
+    transposed_indices: ndarray
+    transposed_data: ndarray
+    # Whether the instance is symmetric (see is_symmetric_instance), such that the kernels need the flows from each
+    # facility only
+    symmetric: bool
+
+
+def flow_density(flow_matrix: ndarray) -> float:
+    """
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :return: The fraction of nonzero entries of the flow matrix
+    """
+    return np.count_nonzero(flow_matrix) / max(flow_matrix.size, 1)
+
+
+def build_sparse_flow(flow_matrix: ndarray, symmetric: bool = False) -> SparseFlow:
+    """
+    Convert a flow matrix to compressed sparse row form.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param symmetric: Whether the instance is symmetric, see is_symmetric_instance
+    :return: The sparse flow matrix
+    """
+    indptr, indices, data = _compress_rows(flow_matrix)
+    transposed_indptr, transposed_indices, transposed_data = _compress_rows(flow_matrix.T)
+    return SparseFlow(indptr, indices, data, transposed_indptr, transposed_indices, transposed_data, symmetric)
+
+
+def flow_edges(sparse_flow: SparseFlow) -> tuple[ndarray, ndarray, ndarray]:
+    """
+    List the nonzero flows as edges whose weighted distances sum to the fitness. For symmetric instances only the edges
+    above the diagonal are listed, with twice the flow.
+    :param sparse_flow: The sparse flow matrix
+    :return: A tuple of the source facilities, the target facilities and the weights of the edges
+    """
+    sources = np.repeat(np.arange(len(sparse_flow.indptr) - 1), np.diff(sparse_flow.indptr))
+    targets, weights = sparse_flow.indices, sparse_flow.data
+    if sparse_flow.symmetric:
+        above_diagonal = sources < targets
+        return sources[above_diagonal], targets[above_diagonal], 2 * weights[above_diagonal]
+    return sources, targets, weights
+
+
+def _compress_rows(matrix: ndarray) -> tuple[ndarray, ndarray, ndarray]:
+    """
+    :param matrix: Two-dimensional numpy array
+    :return: The row pointers, column indices and values of the nonzero entries of the matrix, see SparseFlow
+    """
+    rows, columns = np.nonzero(matrix)
+    indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=matrix.shape[0]), out=indptr[1:])
+    return indptr, columns.astype(np.int64), matrix[rows, columns].astype(np.int64)
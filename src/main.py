@@ -1,331 +1,302 @@
+import argparse
+import cProfile
 import datetime
+import os
+import pstats
 import time
-from typing import Callable
+from dataclasses import asdict, fields, replace
 
 import numpy as np
-import matplotlib.pyplot as plt
-from numpy import ndarray
-
-from src.evolutionary_tools.chromosome import generate_random_chromosomes
-from src.evolutionary_tools.greedy_optimizations import reset_cache, NUM_CACHE_HITS
-from src.evolutionary_tools.mutation import apply_mutation_to_population, swap_mutation
-from src.read_data import read_data
-from src.config import POPULATION_SIZE, NUMBER_OF_GENERATIONS, TESTING, TESTING_SIZE, NUMBER_OF_FACILITIES, \
-    MUTATION_PROB, TOURNAMENT_SIZE
-from src.evolutionary_tools.fitness_function import bulk_basic_fitness_function, bulk_basic_fitness_function_baldwinian, \
-    bulk_basic_fitness_function_lamarckian
-from src.evolutionary_tools.recombine import recombine_chromosomes, order_crossing, partially_mapped_crossover
-from src.evolutionary_tools.selection import roulette_wheel_selection, tournament_selection_two_tournament, \
-    tournament_selection_two_tournament_bulk, tournament_selection_k_tournament_bulk, \
-    tournament_selection_k_tournament_bulk_no_duplicates, tournament_selection_k_tournament_no_duplicates_unbiased
-
-variants = ["standard", "baldwinian", "lamarckian"]
-fitness_functions = ["bulk_basic"]
-selection_functions = ["roulette_wheel", "tournament_two", "tournament_two_bulk", "tournament_k_bulk", "tournament_k_bulk_no_dups", "tournament_k_no_dups_unbiased"]
-recombination_functions = ["order", "partially_mapped"]
-mutation_functions = ["swap"]
-
-
-def main():
+
+from src.checkpoint import Checkpoint, load_checkpoint
+from src.evolutionary_tools.greedy_optimizations import cooling_schedules
+from src.evolutionary_tools.migration import migration_topologies
+from src.solver import Solver, SolverConfig, SolveResult, variants, fitness_functions, selection_functions, \
+    recombination_functions, mutation_functions, local_search_functions
+
+# Problem and output folder of a run started without --problem and --output-dir
+DEFAULT_PROBLEM = "tai256c.dat"
+DEFAULT_OUTPUT_DIR = "results"
+
+# What to do with the plot of the best fitness of each generation, see plot_results
+plot_modes = ["show", "save", "none"]
+
+# Valid values of the SolverConfig fields selected by name
+FIELD_CHOICES = {
+    "variant": variants,
+    "fitness_function": fitness_functions,
+    "selection_function": selection_functions,
+    "recombination_function": recombination_functions,
+    "mutation_function": mutation_functions,
+    "local_search_function": local_search_functions,
+    "cooling_schedule": cooling_schedules,
+    "migration_topology": migration_topologies,
+}
+
+
+def main(argv: list[str] | None = None):
     """
-    Main function to run the evolutionary algorithm
+    Main function to run the evolutionary algorithm. Every field of SolverConfig can be set as an option, e.g.
+    --population-size 50 or --no-incremental-evaluation, such that runs need no changes to the source.
+    With --headless, the run neither plots nor shows progress bars, and neither matplotlib nor tqdm is imported unless
+    requested explicitly with --plot or --progress-bar.
+    :param argv: The command line arguments, sys.argv[1:] by default
     """
-    # Set config
-    variant = "lamarckian"
-    fitness_function_str = "bulk_basic"
-    selection_function_str = "roulette_wheel"
-    recombination_function_str = "partially_mapped"
-    mutation_function_str = "swap"
+    parser = build_argument_parser()
+    arguments = parser.parse_args(argv)
+    plot = arguments.plot if arguments.plot is not None else "none" if arguments.headless else "show"
+
+    if arguments.resume is not None:
+        progress_bar = arguments.progress_bar if arguments.progress_bar is not None else False if arguments.headless else None
+        resume_evolution_algorithm(arguments.resume, plot, progress_bar)
+        return
+
+    config = config_from_arguments(arguments)
     date = datetime.datetime.now().strftime('%Y_%m_%dT%H_%M_%S')
+    os.makedirs(arguments.output_dir, exist_ok=True)
 
     # Invoke algorithm
-    run_evolution_algorithm(variant, fitness_function_str, selection_function_str, recombination_function_str, mutation_function_str, date, "tai256c.dat", "results")
+    run_evolution_algorithm(config, date, arguments.problem, arguments.output_dir, plot=plot)
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    """
+    :return: The parser of the command line, with an option --field-name for each field of SolverConfig
+    """
+    parser = argparse.ArgumentParser(description="Solve a QAP instance with an evolutionary algorithm")
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="Continue the run saved in the given checkpoint file")
+    parser.add_argument("--problem", default=DEFAULT_PROBLEM, help=f"File name of the instance in the data folder "
+                                                                   f"(default: {DEFAULT_PROBLEM})")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help=f"Folder for the logs, checkpoints and plots "
+                                                                         f"(default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--headless", action="store_true",
+                        help="Do not plot or show progress bars, unless requested with --plot or --progress-bar")
+    parser.add_argument("--plot", choices=plot_modes, help="Show and save, only save or skip the plot (default: show, "
+                                                            "none if headless)")
+
+    config_options = parser.add_argument_group("run parameters", "Parameters of the run, see SolverConfig and src.config")
+    default_config = SolverConfig()
+    for field in fields(SolverConfig):
+        default = getattr(default_config, field.name)
+        option = f"--{field.name.replace('_', '-')}"
+        # The defaults are applied in config_from_arguments, such that --headless can tell which options were given
+        if isinstance(default, bool):
+            config_options.add_argument(option, action=argparse.BooleanOptionalAction, default=None,
+                                        help=f"(default: {default})")
+        elif field.name == "seed":
+            config_options.add_argument(option, type=int, default=None, help="(default: a different run each time)")
+        else:
+            config_options.add_argument(option, type=type(default), choices=FIELD_CHOICES.get(field.name), default=None,
+                                        help=f"(default: {default})")
+    # Former name of --local-search-function
+    config_options.add_argument("--local-search", dest="local_search_function", choices=local_search_functions,
+                                default=None, help=argparse.SUPPRESS)
+    return parser
+
+
+def config_from_arguments(arguments: argparse.Namespace) -> SolverConfig:
+    """
+    Build the configuration of a run from the parsed command line, see build_argument_parser.
+    :param arguments: The parsed command line
+    :return: The configuration, the given options replacing the defaults
+    """
+    values = {}
+    if arguments.headless:
+        values["progress_bar"] = False
+    for field in fields(SolverConfig):
+        value = getattr(arguments, field.name)
+        if value is not None:
+            values[field.name] = value
+    return SolverConfig(**values)
 
 
 def run_evolution_algorithm(
-        variant: str,
-        fitness_function_str: str,
-        selection_function_str: str,
-        recombination_function_str: str,
-        mutation_function_str: str,
+        config: SolverConfig,
         date: str,
         problem: str,
-        folder: str
-):
+        folder: str,
+        resume_checkpoint: Checkpoint | None = None,
+        checkpoint_path: str | None = None,
+        plot: str = "show"
+) -> SolveResult:
     """
-    Run the evolutionary algorithm with the given parameters and log the results.
-    :param variant: Variant of the evolutionary algorithm to be used
-    :param fitness_function_str: Fitness function to be used provided as a string
-    :param selection_function_str: Selection function to be used provided as a string
-    :param recombination_function_str: Recombination function to be used provided as a string
-    :param mutation_function_str: Mutation function to be used provided as a string
+    Run the evolutionary algorithm with the given parameters and log the results. Unless the checkpoint interval is 0,
+    the state of the run is saved every checkpoint_interval generations to {folder}/{date}_{variant}.checkpoint.npz.
+    The statistics of each generation are streamed to the run log {folder}/{date}_{variant}_run.csv, see RunLogWriter.
+    The time per phase and the counters of the run are written to {folder}/{date}_{variant}_metrics.json and, if
+    config.profile is set, a cProfile report to {folder}/{date}_{variant}.prof and {folder}/{date}_{variant}_profile.txt.
+    :param config: The parameters of the run, see SolverConfig
     :param date: Current date and time for logging
     :param problem: The file name of the problem to be solved
     :param folder: The folder name for the logs and plots
+    :param resume_checkpoint: Optional checkpoint to continue from, see resume_evolution_algorithm
+    :param checkpoint_path: Optional path of the checkpoint file, overriding the default one
+    :param plot: Whether to show and save ("show"), only save ("save") or skip ("none") the plot, see plot_results
+    :return: The result of the run
     """
-    fitness_function, selection_function, recombination_function, mutation_function = translate_strings_to_functions(
-        variant, fitness_function_str, selection_function_str, recombination_function_str, mutation_function_str)
-
-    start_time = time.time()
-    best_chromosome, best_fitness, best_fitness_each_generation, time_per_generation = basic_evolution_loop(
-        fitness_function, selection_function, recombination_function, mutation_function, TESTING, problem)
-    end_time = time.time()
+    solver = Solver(config)
+    variant = config.variant
+
+    if checkpoint_path is None and config.checkpoint_interval > 0 and config.number_of_islands <= 1:
+        checkpoint_path = f"{folder}/{date}_{variant}.checkpoint.npz"
+    run_parameters = {"date": date, "problem": problem, "folder": folder, "config": asdict(config)}
+
+    profiler = cProfile.Profile() if config.profile else None
+    start_time = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        result = solver.solve(problem, checkpoint_path, run_parameters, resume_checkpoint, f"{folder}/{date}_{variant}_run.csv")
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    end_time = time.perf_counter()
 
     total = end_time - start_time
     print(f"Total time: {total}")
+    print(f"Stop reason: {result.stop_reason}")
+    print(f"Time per phase: { {phase: round(seconds, 3) for phase, seconds in solver.metrics.phase_seconds.items()} }")
 
-    log_results(folder, variant, fitness_function_str, selection_function_str, recombination_function_str,
-                mutation_function_str, best_chromosome, best_fitness, total, date, time_per_generation,
-                best_fitness_each_generation)
-    plot_results(folder, best_fitness_each_generation, variant, date)
+    log_results(folder, config, result, total, date)
+    solver.metrics.export(f"{folder}/{date}_{variant}_metrics.json")
+    if profiler is not None:
+        write_profile(profiler, f"{folder}/{date}_{variant}")
+    if plot != "none":
+        plot_results(folder, result.best_fitness_each_generation, variant, date, show=plot == "show")
+    return result
 
 
-def basic_evolution_loop(
-    fitness_function: Callable[[ndarray, ndarray, ndarray, bool, int], tuple[ndarray, ndarray]],
-    selection_function: Callable[[ndarray, ndarray, int], ndarray],
-    recombination_function: Callable[[ndarray, ndarray], tuple[ndarray, ndarray]],
-    mutation_function: Callable[[ndarray], ndarray],
-    testing: bool,
-    problem: str
-) -> tuple[ndarray, float, list[float], list[float]]:
+def write_profile(profiler: cProfile.Profile, path_prefix: str, number_of_functions: int = 50):
     """
-    Basic evolutionary loop for the algorithm
-    :param fitness_function: Fitness function to be used
-    :param selection_function: Selection function to be used
-    :param recombination_function: Recombination function to be used
-    :param mutation_function: Mutation function to be used
-    :param testing: Whether to run the algorithm in testing mode
-    :param problem: Name of the file containing the problem to be solved
-    :return: A four tuple containing, the fittest individuals genes,
-    the fitness of the fittest individual, a list of the best fitness each generation
-    and a list of the time per generation
+    Write the raw profile (readable by pstats or snakeviz) and a report of the functions with the highest cumulative time.
+    :param profiler: The profiler of the run
+    :param path_prefix: The path of the files without the suffixes ".prof" and "_profile.txt"
+    :param number_of_functions: The number of functions in the report
     """
-    (flow_matrix, distance_matrix) = read_data(problem)
-
-    best_fitness_each_generation = []
-    time_per_generation = []
-
-    if testing:
-        flow_matrix = flow_matrix[:TESTING_SIZE, :TESTING_SIZE]
-        distance_matrix = distance_matrix[:TESTING_SIZE, :TESTING_SIZE]
-
-    population = generate_random_chromosomes(POPULATION_SIZE, NUMBER_OF_FACILITIES)
-    population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, False)
-    best_fitness_each_generation.append(np.min(population_fitness))
-
-    for generation in range(NUMBER_OF_GENERATIONS):
-        start_time = time.time()
-        if generation % 10 == 0:
-            print(f"Generation {generation + 1}")
-            print(f"Best fitness: {np.min(population_fitness)}")
-
-            number_of_unique_permutations = len(np.unique(population, axis=0))
-            print(f"Number of unique permutations: {number_of_unique_permutations}")
-
-            if len(time_per_generation) != 0:
-                average_time_per_generation_per_individual = np.mean(time_per_generation) / POPULATION_SIZE
-                print(f"Average time per generation per individual: {average_time_per_generation_per_individual}")
-
-        # Take the fittest individual to secure a spot in the new generation
-        index_of_fittest_individual = np.argmin(population_fitness)
-        fittest_individual = population[index_of_fittest_individual]
-        fitness_of_fittest_individual = population_fitness[index_of_fittest_individual]
-
-        # Selection
-        selected_chromosomes = selection_function(population, population_fitness, TOURNAMENT_SIZE)
-
-        # Check if parents for one child are equal in which case replace those
-        alternative_selected_chromosomes = []
-        alternative_chromosome_index = 0
-        for i in range(0, len(selected_chromosomes), 2):
-            while np.array_equal(selected_chromosomes[i], selected_chromosomes[i + 1]):
-                if len(alternative_selected_chromosomes) == 0:
-                    # This should only be encountered once
-                    alternative_selected_chromosomes = selection_function(population, population_fitness, TOURNAMENT_SIZE)
-                if alternative_chromosome_index != len(alternative_selected_chromosomes):
-                    selected_chromosomes[i + 1] = alternative_selected_chromosomes[alternative_chromosome_index]
-                    alternative_chromosome_index += 1
-                else:
-                    alternative_selected_chromosomes = selection_function(population, population_fitness, TOURNAMENT_SIZE)
-                    alternative_chromosome_index = 0
-                    selected_chromosomes[i + 1] = alternative_selected_chromosomes[alternative_chromosome_index]
-                    alternative_chromosome_index += 1
-
-        # Recombine
-        population = recombine_chromosomes(selected_chromosomes, recombination_function)
-
-        # Mutate
-        population = apply_mutation_to_population(population, mutation_function, MUTATION_PROB)
-
-        # Evaluate the new population (and possibly apply Lamarckian evolution)
-        if generation == NUMBER_OF_GENERATIONS - 1:
-            population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, True, generation + 1)
-        else:
-            population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, False, generation + 1)
+    profiler.dump_stats(f"{path_prefix}.prof")
+    with open(f"{path_prefix}_profile.txt", "w") as file:
+        stats = pstats.Stats(profiler, stream=file)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(number_of_functions)
 
-        # Force the fittest individual to survive by replacing worst in new population with best from last population
-        worst_individual = np.argmax(population_fitness)
-        population[worst_individual] = fittest_individual
-        population_fitness[worst_individual] = fitness_of_fittest_individual
 
-        # Add the fittest individual to the list
-        best_fitness_each_generation.append(np.min(population_fitness))
-
-        # Time generation
-        end_time = time.time()
-        time_per_generation.append(end_time - start_time)
-
-        # Check if cache needs to be reset
-        if generation % 125 == 0:
-            reset_cache()
-
-    print(f"Number of cache hits: {NUM_CACHE_HITS}")
-    print(f"Best solution: {population[np.argmin(population_fitness)]} with fitness {np.min(population_fitness)}")
-
-    return population[np.argmin(population_fitness)], np.min(population_fitness), best_fitness_each_generation, time_per_generation
-
-
-def translate_strings_to_functions(
-        variant: str,
-        fitness_function_str: str,
-        selection_function_str: str,
-        recombination_function_str: str,
-        mutation_function_str: str
-) -> tuple[Callable[[ndarray, ndarray, ndarray, bool, int], tuple[ndarray, ndarray]], Callable[[ndarray, ndarray, int], ndarray], Callable[[ndarray, ndarray], tuple[ndarray, ndarray]], Callable[[ndarray], ndarray]]:
+def resume_evolution_algorithm(checkpoint_path: str, plot: str = "show", progress_bar: bool | None = None):
     """
-    Translate the strings to the corresponding functions
-    :param variant: Variant of evolutionary algorithm to be used. Used to determine fitness function
-    :param fitness_function_str: Fitness function to be used, provided as a string
-    :param selection_function_str: Selection function to be used, provided as a string
-    :param recombination_function_str: Recombination function to be used, provided as a string
-    :param mutation_function_str: Mutation function to be used, provided as a string
-    :return: Four tuple of the fitness, selection, recombination and mutation function
+    Continue the run saved in a checkpoint with the same parameters, writing further checkpoints to the same file. With
+    the same configuration, the run continues bit-for-bit as if it had not been interrupted.
+    :param checkpoint_path: The path of the checkpoint file
+    :param plot: What to do with the plot, see run_evolution_algorithm
+    :param progress_bar: Whether to show progress bars, as in the saved run by default
     """
-    fitness_function, selection_function, recombination_function, mutation_function = None, None, None, None
-
-    match fitness_function_str:
-        case "bulk_basic":
-            match variant:
-                case "standard":
-                    fitness_function = bulk_basic_fitness_function
-                case "baldwinian":
-                    fitness_function = bulk_basic_fitness_function_baldwinian
-                case "lamarckian":
-                    fitness_function = bulk_basic_fitness_function_lamarckian
-
-    match selection_function_str:
-        case "roulette_wheel":
-            selection_function = roulette_wheel_selection
-        case "tournament_two":
-            selection_function = tournament_selection_two_tournament
-        case "tournament_two_bulk":
-            selection_function = tournament_selection_two_tournament_bulk
-        case "tournament_k_bulk":
-            selection_function = tournament_selection_k_tournament_bulk
-        case "tournament_k_bulk_no_dups":
-            selection_function = tournament_selection_k_tournament_bulk_no_duplicates
-        case "tournament_k_no_dups_unbiased":
-            selection_function = tournament_selection_k_tournament_no_duplicates_unbiased
-
-    match recombination_function_str:
-        case "order":
-            recombination_function = order_crossing
-        case "partially_mapped":
-            recombination_function = partially_mapped_crossover
-
-    match mutation_function_str:
-        case "swap":
-            mutation_function = swap_mutation
-
-    if not all([fitness_function, selection_function, recombination_function, mutation_function]):
-        raise ValueError("Invalid function string provided")
-
-    return fitness_function, selection_function, recombination_function, mutation_function
-
-
-def log_results(
-        folder: str,
-        variant: str,
-        fitness_function: str,
-        selection_function: str,
-        recombination_function: str,
-        mutation_function: str,
-        best_chromosome: ndarray,
-        best_fitness: float,
-        total: float,
-        date: str,
-        time_per_generation: list[float],
-        best_fitness_each_generation: list[float],
-):
+    checkpoint = load_checkpoint(checkpoint_path)
+    print(f"Resuming {checkpoint_path} at generation {checkpoint.generation + 1}")
+    run_parameters = checkpoint.run_parameters
+    if "config" in run_parameters:
+        config = SolverConfig(**run_parameters["config"])
+    else:
+        # Checkpoints written before SolverConfig store the function strings, the other parameters were those of src.config
+        config = SolverConfig(
+            variant=run_parameters["variant"],
+            fitness_function=run_parameters["fitness_function_str"],
+            selection_function=run_parameters["selection_function_str"],
+            recombination_function=run_parameters["recombination_function_str"],
+            mutation_function=run_parameters["mutation_function_str"],
+            local_search_function=run_parameters["local_search_function_str"],
+        )
+    if progress_bar is not None:
+        config = replace(config, progress_bar=progress_bar)
+    run_evolution_algorithm(config, run_parameters["date"], run_parameters["problem"], run_parameters["folder"],
+                            resume_checkpoint=checkpoint, checkpoint_path=checkpoint_path, plot=plot)
+
+
+def log_results(folder: str, config: SolverConfig, result: SolveResult, total: float, date: str):
     """
-    Log the results of the evolutionary algorithm
+    Log the functions, hyperparameters and results of the evolutionary algorithm. The history of each generation is
+    streamed to the run log during the run instead, see RunLogWriter.
     :param folder: Name of folder to save the results in
-    :param variant: Variant of the evolutionary algorithm used
-    :param fitness_function: Fitness function used, provided as a string
-    :param selection_function: Selection function used, provided as a string
-    :param recombination_function: Recombination function used, provided as a string
-    :param mutation_function: Mutation function used, provided as a string
-    :param best_chromosome: The genes of the fittest individual
-    :param best_fitness: The fitness of the fittest individual
+    :param config: The parameters of the run
+    :param result: The result of the run
     :param total: Total time taken to run the algorithm
     :param date: Current date and time for logging
-    :param time_per_generation: List of the time taken per generation
-    :param best_fitness_each_generation: List of the best fitness each generation
     """
-    average_time_per_generation_per_individual = (np.mean(time_per_generation) / POPULATION_SIZE) * 1000
+    average_time_per_generation_per_individual = (np.mean(result.time_per_generation) / config.population_size) * 1000
 
     # Cutoff total at 2 decimals
     total = round(total, 2)
     average_time_per_generation_per_individual = round(average_time_per_generation_per_individual, 3)
 
-    file_path = f"{folder}/{date}_{variant}.txt"
+    file_path = f"{folder}/{date}_{config.variant}.txt"
     with open(file_path, "w") as file:
         file.write("Functions used:\n")
-        file.write(f"Variant: {variant}\n")
-        file.write(f"Fitness function: {fitness_function}\n")
-        file.write(f"Selection function: {selection_function}\n")
-        file.write(f"Recombination function: {recombination_function}\n")
-        file.write(f"Mutation function: {mutation_function}\n")
+        file.write(f"Variant: {config.variant}\n")
+        file.write(f"Fitness function: {config.fitness_function}\n")
+        file.write(f"Selection function: {config.selection_function}\n")
+        file.write(f"Recombination function: {config.recombination_function}\n")
+        file.write(f"Mutation function: {config.mutation_function}\n")
+        if config.variant != "standard":
+            file.write(f"Local search function: {config.local_search_function}\n")
         file.write("\n")
 
         file.write("Hyperparameters:\n")
-        file.write(f"Population size: {POPULATION_SIZE}\n")
-        file.write(f"Number of generations: {NUMBER_OF_GENERATIONS}\n")
-        file.write(f"Number of facilities: {NUMBER_OF_FACILITIES}\n")
-        file.write(f"Mutation probability: {MUTATION_PROB}\n")
-        file.write(f"Tournament size: {TOURNAMENT_SIZE}\n")
-        file.write(f"Testing: {TESTING}\n")
+        file.write(f"Population size: {config.population_size}\n")
+        file.write(f"Number of generations: {config.number_of_generations}\n")
+        file.write(f"Number of facilities: {len(result.best_chromosome)}\n")
+        file.write(f"Mutation probability: {config.mutation_prob}\n")
+        file.write(f"Tournament size: {config.tournament_size}\n")
+        file.write(f"Number of workers: {config.number_of_workers}\n")
+        file.write(f"Kernel backend: {config.kernel_backend}\n")
+        if config.number_of_islands > 1:
+            file.write(f"Number of islands: {config.number_of_islands}\n")
+            file.write(f"Migration interval: {config.migration_interval}\n")
+            file.write(f"Number of migrants: {config.number_of_migrants}\n")
+            file.write(f"Migration topology: {config.migration_topology}\n")
+        file.write(f"Seed: {config.seed}\n")
+        file.write(f"Testing: {config.testing}\n")
+        file.write("\n")
+
+        file.write("Stopping criteria:\n")
+        file.write(f"Time budget: {config.time_budget} seconds\n")
+        file.write(f"Target fitness: {config.target_fitness}\n")
+        file.write(f"Maximum generations without improvement: {config.max_generations_without_improvement}\n")
+        file.write(f"Maximum fitness evaluations: {config.max_fitness_evaluations}\n")
         file.write("\n")
 
         file.write("Results:\n")
-        file.write(f"Best fitness: {best_fitness}\n")
+        file.write(f"Best fitness: {result.best_fitness}\n")
+        file.write(f"Stop reason: {result.stop_reason}\n")
+        file.write(f"Number of generations run: {len(result.time_per_generation)}\n")
         file.write(f"Total time: {total} seconds\n")
         file.write(f"Average time per generation per individual: {average_time_per_generation_per_individual} milliseconds\n")
         file.write(f"Best chromosome: \n")
-        best_chromosome = [int(gene) for gene in best_chromosome]
+        best_chromosome = [int(gene) for gene in result.best_chromosome]
         file.write(f"{best_chromosome}\n")
 
-    log_file_path = f"{folder}/{date}_{variant}.log"
-    with open(log_file_path, "w") as log_file:
-        best_fitness_each_generation = [int(fitness) for fitness in best_fitness_each_generation]
-        log_file.write(f"Best fitness each generation: \n {best_fitness_each_generation}\n")
-
 
-def plot_results(folder: str, best_fitness_each_generation: list[float], variant: str, date: str):
+def plot_results(folder: str, best_fitness_each_generation: list[float], variant: str, date: str, show: bool = True):
     """
-    Plot the results of the evolutionary algorithm
+    Plot the results of the evolutionary algorithm. matplotlib is only imported here, such that runs without a plot
+    start faster and do not need it.
     :param folder: Name of folder to save the plot in
     :param best_fitness_each_generation: List of the best fitness each generation
     :param variant: Variant of the evolutionary algorithm used
     :param date: Current date and time for logging
+    :param show: Whether to show the plot in a window (blocking until it is closed) after saving it
     """
+    import matplotlib
+    if not show:
+        # Render without a display, e.g. in unattended jobs
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure()
     plt.plot(best_fitness_each_generation)
     plt.xlabel("Generation")
     plt.ylabel("Fitness")
     plt.ylim(44759294, 53000000)
     plt.title("Fitness of the fittest individual in population over generations")
     plt.savefig(f"{folder}/{date}_{variant}.png")
-    plt.show()
+    if show:
+        plt.show()
+    plt.close()
 
 
 if __name__ == "__main__":
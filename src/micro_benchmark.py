@@ -0,0 +1,275 @@
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+from typing import Callable, NamedTuple
+
+import numpy as np
+from numpy import ndarray
+
+from src.evolutionary_tools.chromosome import generate_random_chromosomes
+from src.evolutionary_tools.dtypes import compact_matrix, permutation_dtype
+from src.evolutionary_tools.backends import available_backends, get_backend
+from src.evolutionary_tools.fitness_function import bulk_basic_fitness_function, bulk_symmetric_fitness_function, \
+    bulk_sparse_fitness_function
+from src.evolutionary_tools.greedy_optimizations import two_opt_delta_matrix
+from src.evolutionary_tools.mutation import apply_mutation_to_population, swap_mutation
+from src.evolutionary_tools.recombine import recombine_chromosomes, order_crossing, partially_mapped_crossover, \
+    bulk_order_crossing, bulk_partially_mapped_crossover
+from src.evolutionary_tools.selection import roulette_wheel_selection, stochastic_universal_sampling_selection, \
+    tournament_selection_two_tournament, tournament_selection_two_tournament_bulk, tournament_selection_k_tournament_bulk, \
+    tournament_selection_k_tournament_bulk_no_duplicates, tournament_selection_k_tournament_no_duplicates_unbiased
+from src.evolutionary_tools.sparse_flow import build_sparse_flow
+from src.read_data import read_data
+
+INSTANCES_TO_BENCHMARK = ["bur26a.dat", "chr18b.dat", "nug16a.dat", "tai60a.dat", "tai256c.dat"]
+SYNTHETIC_SIZES_TO_BENCHMARK = [512, 1024]
+BASELINE_FILE = "benchmarks/micro_benchmark_baseline.json"
+
+# Population size and tournament size of the population-level kernels
+BENCHMARK_POPULATION_SIZE = 100
+BENCHMARK_TOURNAMENT_SIZE = 10
+
+# Fast kernels are timed until they took at least MINIMUM_TIME seconds in total, but at most MAXIMUM_REPEATS times
+MINIMUM_TIME = 0.2
+MAXIMUM_REPEATS = 1000
+
+# Default relative slowdown of the minimum time against the baseline counted as a regression
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+
+
+class Instance(NamedTuple):
+    """
+    An instance to benchmark the kernels on, with a random population of BENCHMARK_POPULATION_SIZE chromosomes.
+    """
+    name: str
+    flow_matrix: ndarray
+    distance_matrix: ndarray
+    population: ndarray
+    population_fitness: ndarray
+
+
+class Kernel(NamedTuple):
+    """
+    A kernel to benchmark. The setup function prepares the arguments outside of the timed region (copying anything the
+    kernel modifies), the kernel function is timed. Kernels are only run on instances with at most max_size facilities.
+    """
+    name: str
+    setup: Callable[[Instance], tuple]
+    function: Callable
+    max_size: int = sys.maxsize
+
+
+def selection_kernel(name: str, selection_function: Callable[[ndarray, ndarray, int], ndarray]) -> Kernel:
+    """
+    :return: A kernel selecting from the population of an instance with the given selection function
+    """
+    return Kernel(f"selection/{name}", lambda instance: (instance.population, instance.population_fitness, BENCHMARK_TOURNAMENT_SIZE),
+                  selection_function)
+
+
+def recombination_kernel(name: str, recombination_function: Callable) -> Kernel:
+    """
+    :return: A kernel recombining the population of an instance with the given recombination function
+    """
+    return Kernel(f"recombination/{name}", lambda instance: (instance.population, recombination_function), recombine_chromosomes)
+
+
+def chromosome_arguments(instance: Instance) -> tuple[ndarray, ndarray, ndarray]:
+    """
+    :return: The matrices of the instance and a random chromosome
+    """
+    n = instance.flow_matrix.shape[0]
+    return instance.flow_matrix, instance.distance_matrix, np.random.permutation(n).astype(permutation_dtype(n))
+
+
+def backend_kernels(backend: str) -> list[Kernel]:
+    """
+    :return: The kernels of a backend (see get_backend) operating on a single chromosome. The kernels for symmetric
+    instances are timed on all instances, their results are only correct on the symmetric ones
+    """
+    kernels = get_backend(backend)
+    symmetric_kernels = get_backend(backend, symmetric=True)
+    return [
+        Kernel(f"fitness/{backend}", chromosome_arguments, kernels.fitness),
+        Kernel(f"delta_cost/{backend}", lambda instance: (*chromosome_arguments(instance), 1, instance.flow_matrix.shape[0] - 2),
+               kernels.delta_cost),
+        Kernel(f"delta_cost_symmetric/{backend}",
+               lambda instance: (*chromosome_arguments(instance), 1, instance.flow_matrix.shape[0] - 2),
+               symmetric_kernels.delta_cost),
+        # The pure numpy two_opt takes seconds on tai256c and minutes on the synthetic instances
+        Kernel(f"two_opt/{backend}", chromosome_arguments, kernels.two_opt, max_size=256 if backend == "numpy" else 512),
+    ]
+
+
+def benchmark_kernels() -> list[Kernel]:
+    """
+    :return: All kernels of the benchmark suite
+    """
+    kernels = [
+        Kernel("bulk_fitness", lambda instance: (instance.flow_matrix, instance.distance_matrix, instance.population),
+               bulk_basic_fitness_function),
+        Kernel("bulk_fitness_symmetric", lambda instance: (instance.flow_matrix, instance.distance_matrix, instance.population),
+               bulk_symmetric_fitness_function),
+        Kernel("bulk_fitness_sparse", lambda instance: (instance.flow_matrix, instance.distance_matrix, instance.population, False, 0,
+                                                        build_sparse_flow(instance.flow_matrix)),
+               bulk_sparse_fitness_function),
+        Kernel("two_opt_delta_matrix", chromosome_arguments, two_opt_delta_matrix, max_size=512),
+        recombination_kernel("partially_mapped", partially_mapped_crossover),
+        recombination_kernel("order", order_crossing),
+        recombination_kernel("bulk_partially_mapped", bulk_partially_mapped_crossover),
+        recombination_kernel("bulk_order", bulk_order_crossing),
+        selection_kernel("roulette_wheel", roulette_wheel_selection),
+        selection_kernel("stochastic_universal_sampling", stochastic_universal_sampling_selection),
+        selection_kernel("tournament_two", tournament_selection_two_tournament),
+        selection_kernel("tournament_two_bulk", tournament_selection_two_tournament_bulk),
+        selection_kernel("tournament_k_bulk", tournament_selection_k_tournament_bulk),
+        selection_kernel("tournament_k_bulk_no_dups", tournament_selection_k_tournament_bulk_no_duplicates),
+        selection_kernel("tournament_k_no_dups_unbiased", tournament_selection_k_tournament_no_duplicates_unbiased),
+        Kernel("mutation/swap", lambda instance: (instance.population.copy(), swap_mutation, 1.0), apply_mutation_to_population),
+    ]
+    for backend in available_backends():
+        kernels += backend_kernels(backend)
+    return kernels
+
+
+def benchmark_instances(synthetic_sizes: list[int]) -> list[Instance]:
+    """
+    Load the QAPLIB instances and generate synthetic instances with uniformly random flows and distances.
+    :param synthetic_sizes: The numbers of facilities of the synthetic instances
+    :return: A list containing the instances
+    """
+    matrices = [(file.removesuffix(".dat"), *read_data(file)) for file in INSTANCES_TO_BENCHMARK]
+    random_generator = np.random.default_rng(0)
+    for size in synthetic_sizes:
+        flow_matrix = random_generator.integers(0, 100, size=(size, size), dtype=np.int32)
+        distance_matrix = random_generator.integers(0, 100, size=(size, size), dtype=np.int32)
+        matrices.append((f"synthetic{size}", compact_matrix(flow_matrix), compact_matrix(distance_matrix)))
+
+    instances = []
+    for name, flow_matrix, distance_matrix in matrices:
+        np.random.seed(0)
+        population = generate_random_chromosomes(BENCHMARK_POPULATION_SIZE, flow_matrix.shape[0])
+        population_fitness = bulk_basic_fitness_function(flow_matrix, distance_matrix, population)[1]
+        instances.append(Instance(name, flow_matrix, distance_matrix, population, population_fitness))
+    return instances
+
+
+def time_kernel(kernel: Kernel, instance: Instance, repeat: int, max_time: float) -> dict[str, float]:
+    """
+    Time a kernel on an instance. After one untimed warm-up call (e.g. for compilation), the kernel is timed with fresh
+    arguments at least repeat times and until the calls took MINIMUM_TIME seconds in total. No further calls are
+    started once max_time seconds (including the setup) have passed.
+    :param kernel: The kernel to time
+    :param instance: The instance to time the kernel on
+    :param repeat: The minimum number of timed calls (unless max_time is exceeded)
+    :param max_time: The time in seconds after which no further calls are started
+    :return: A dictionary containing the minimum and median time in seconds and the number of timed calls
+    """
+    np.random.seed(0)
+    deadline = time.perf_counter() + max_time
+    kernel.function(*kernel.setup(instance))
+
+    times = []
+    while len(times) < MAXIMUM_REPEATS and (len(times) == 0 or time.perf_counter() < deadline):
+        if len(times) >= repeat and sum(times) >= MINIMUM_TIME:
+            break
+        arguments = kernel.setup(instance)
+        start_time = time.perf_counter()
+        kernel.function(*arguments)
+        times.append(time.perf_counter() - start_time)
+    return {"min": min(times), "median": float(np.median(times)), "repeats": len(times)}
+
+
+def run_benchmarks(synthetic_sizes: list[int], repeat: int, max_time: float, name_filter: str | None = None) -> dict:
+    """
+    Time all kernels on all instances.
+    :param synthetic_sizes: The numbers of facilities of the synthetic instances
+    :param repeat: The minimum number of timed calls per kernel and instance
+    :param max_time: The time in seconds per kernel and instance after which no further calls are started
+    :param name_filter: Optional substring, only kernels containing it in their name are run
+    :return: A dictionary containing the metadata of the run and the timings keyed by "kernel@instance"
+    """
+    results = {}
+    for instance in benchmark_instances(synthetic_sizes):
+        for kernel in benchmark_kernels():
+            if instance.flow_matrix.shape[0] > kernel.max_size or (name_filter is not None and name_filter not in kernel.name):
+                continue
+            key = f"{kernel.name}@{instance.name}"
+            results[key] = time_kernel(kernel, instance, repeat, max_time)
+            print(f"{key:60} {results[key]['min'] * 1000:12.3f} ms (median {results[key]['median'] * 1000:.3f} ms)")
+
+    metadata = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "repeat": repeat,
+    }
+    return {"metadata": metadata, "results": results}
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare the minimum times of the results to those of the baseline. The minimum is the least affected by other load
+    on the machine, see the documentation of timeit.
+    :param results: The results of run_benchmarks
+    :param baseline: Earlier results of run_benchmarks on the same machine
+    :param threshold: The relative slowdown counted as a regression, e.g. 0.25 for 25% slower
+    :return: A list containing the keys of the regressed kernels
+    """
+    regressions = []
+    print(f"{'kernel@instance':60} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for key, timing in results["results"].items():
+        if key not in baseline["results"]:
+            print(f"{key:60} {'-':>12} {timing['min'] * 1000:9.3f} ms {'new':>8}")
+            continue
+        baseline_time = baseline["results"][key]["min"]
+        ratio = timing["min"] / baseline_time
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(key)
+        print(f"{key:60} {baseline_time * 1000:9.3f} ms {timing['min'] * 1000:9.3f} ms {ratio:7.2f}x"
+              f"{' REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    """
+    Run the micro-benchmark suite, write the results as JSON and compare them to the baseline. Exits with status 1 if
+    any kernel regressed by more than the threshold.
+    """
+    parser = argparse.ArgumentParser(description="Time the hot kernels of the evolutionary algorithm")
+    parser.add_argument("--output", default="micro_benchmark_results.json", help="File to write the results to")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file instead of comparing")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Relative slowdown of the minimum time counted as a regression")
+    parser.add_argument("--repeat", type=int, default=5, help="Minimum number of timed calls per kernel and instance")
+    parser.add_argument("--max-time", type=float, default=2.0, help="Seconds per kernel and instance after which timing stops")
+    parser.add_argument("--sizes", type=int, nargs="*", default=SYNTHETIC_SIZES_TO_BENCHMARK, help="Sizes of the synthetic instances")
+    parser.add_argument("--filter", default=None, help="Only run kernels whose name contains this string")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.sizes, arguments.repeat, arguments.max_time, arguments.filter)
+
+    output = arguments.baseline if arguments.update_baseline else arguments.output
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}")
+    if arguments.update_baseline:
+        return
+
+    with open(arguments.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare_to_baseline(results, baseline, arguments.threshold)
+    if regressions:
+        print(f"{len(regressions)} kernel(s) regressed by more than {arguments.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
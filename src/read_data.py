@@ -1,14 +1,98 @@
+import hashlib
+import os
+import tempfile
+
 import numpy as np
 from numpy import ndarray
 
+from src.evolutionary_tools.dtypes import compact_matrix
+
+# Folder containing the QAPLIB instances
+DATA_FOLDER = "data"
+
+# Folder next to DATA_FOLDER containing the parsed instances, see read_data
+CACHE_FOLDER = ".instance_cache"
 
-def read_data(file: str) -> tuple[ndarray, ndarray]:
+
+def read_data(file: str, data_folder: str = DATA_FOLDER, cache_folder: str = CACHE_FOLDER) -> tuple[ndarray, ndarray]:
     """
-    Read the data from data/file and return the flow and distance matrices.
+    Read the data from data/file and return the flow and distance matrices. Each matrix is stored in the narrowest
+    integer type holding its entries (see compact_matrix), e.g. uint8 flows and uint32 distances for tai256c. Each
+    instance is parsed only once and then stored in cache_folder, one file per matrix keyed by a digest of the file's
+    content. Later calls open the cached matrices memory-mapped instead of parsing the file again. The returned
+    matrices are read-only.
+    :param file: The file name of the instance
+    :param data_folder: The folder containing the instance
+    :param cache_folder: The folder containing the cached instances
     :return: A tuple containing the flow and distance matrices
     """
-    number_of_facilities = int(np.loadtxt(f'data/{file}', max_rows=1))
-    data = np.loadtxt(f'data/{file}', skiprows=1)
-    flow_matrix = np.int32(data[:number_of_facilities])
-    distance_matrix = np.int32(data[number_of_facilities:])
+    with open(f"{data_folder}/{file}", "rb") as instance_file:
+        content = instance_file.read()
+
+    digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    cache_paths = [f"{cache_folder}/{os.path.splitext(file)[0]}-{digest}-{name}.npy" for name in ("flow", "distance")]
+    if all(os.path.exists(cache_path) for cache_path in cache_paths):
+        flow_matrix, distance_matrix = (np.asarray(np.load(cache_path, mmap_mode="r")) for cache_path in cache_paths)
+        return flow_matrix, distance_matrix
+
+    flow_matrix, distance_matrix = (compact_matrix(matrix) for matrix in parse_instance(content))
+    try:
+        for cache_path, matrix in zip(cache_paths, (flow_matrix, distance_matrix)):
+            write_cache(cache_path, matrix)
+    except OSError:
+        # A read-only checkout can still be used, just without the cache
+        pass
+    # Read-only like the memory-mapped matrices, such that the behaviour does not depend on the cache
+    flow_matrix.flags.writeable = False
+    distance_matrix.flags.writeable = False
     return flow_matrix, distance_matrix
+
+
+def is_symmetric_instance(flow_matrix: ndarray, distance_matrix: ndarray) -> bool:
+    """
+    Detect whether the specialized kernels for symmetric instances apply, see get_backend and
+    bulk_symmetric_fitness_function. That is, whether both matrices are symmetric and at least one of them has a zero
+    diagonal, such that each pair of facilities contributes the same cost in both directions and no facility
+    contributes a cost on its own.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :return: Whether the instance is symmetric
+    """
+    symmetric = np.array_equal(flow_matrix, flow_matrix.T) and np.array_equal(distance_matrix, distance_matrix.T)
+    return symmetric and (not np.diagonal(flow_matrix).any() or not np.diagonal(distance_matrix).any())
+
+
+def parse_instance(content: bytes) -> tuple[ndarray, ndarray]:
+    """
+    Parse a QAPLIB instance: the number of facilities n followed by the n x n flow and the n x n distance matrix. Any
+    whitespace separates the numbers, so rows may be wrapped over several lines.
+    :param content: The content of the instance file
+    :return: A tuple containing the flow and distance matrices as int32
+    """
+    # With a separator, any run of whitespace (including newlines) separates two numbers
+    numbers = np.fromstring(content, dtype=np.int64, sep=" ")
+    number_of_facilities = int(numbers[0])
+    matrix_size = number_of_facilities * number_of_facilities
+    if len(numbers) != 1 + 2 * matrix_size:
+        raise ValueError(f"Expected {2 * matrix_size} matrix entries for {number_of_facilities} facilities, found {len(numbers) - 1}")
+
+    matrices = numbers[1:].astype(np.int32).reshape(2, number_of_facilities, number_of_facilities)
+    return matrices[0], matrices[1]
+
+
+def write_cache(cache_path: str, matrix: ndarray):
+    """
+    Write a parsed matrix to the cache. The file is written to a temporary file first and then moved to cache_path,
+    such that concurrent runs never read a partially written cache.
+    :param cache_path: The path of the cache file
+    :param matrix: Two-dimensional numpy array containing the flow or the distance matrix
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            np.save(file, matrix)
+        os.replace(temporary_path, cache_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
@@ -0,0 +1,151 @@
+import os
+import time
+from typing import NamedTuple
+
+import numpy as np
+from numpy import ndarray
+
+from src.evolutionary_tools.selection import row_hashes
+
+# Columns of the run log, in order
+RUN_LOG_FIELDS = ("generation", "best_fitness", "mean_fitness", "worst_fitness", "unique_individuals",
+                  "generation_seconds", "elapsed_seconds")
+
+# Maximum time in seconds between a record being written and it being flushed to the file
+FLUSH_INTERVAL = 1.0
+
+
+class GenerationRecord(NamedTuple):
+    """
+    Statistics of the population after a generation. Generation 0 is the initial population.
+    """
+    generation: int
+    best_fitness: int
+    mean_fitness: float
+    worst_fitness: int
+    unique_individuals: int
+    generation_seconds: float
+    elapsed_seconds: float
+
+
+def population_statistics(population: ndarray, population_fitness: ndarray) -> tuple[int, float, int, int]:
+    """
+    Calculate the fitness statistics and the diversity of a population.
+    :param population: Two-dimensional numpy array containing the chromosomes
+    :param population_fitness: The fitness values of the population
+    :return: A four tuple of the best, mean and worst fitness and the number of unique chromosomes
+    """
+    return (int(np.min(population_fitness)), float(np.mean(population_fitness)), int(np.max(population_fitness)),
+            len(np.unique(row_hashes(population))))
+
+
+class RunLogWriter:
+    """
+    Append-only log with one CSV record per generation. Records are flushed at most FLUSH_INTERVAL seconds after they
+    are written, such that the log of a running (or crashed) run can be read with RunLogReader.
+    """
+
+    def __init__(self, path: str, resume_generation: int | None = None):
+        """
+        Open the run log. A new run log replaces an existing file, a resumed one is appended to.
+        :param path: The path of the run log
+        :param resume_generation: If given, the run continues after this generation: the existing records up to and
+        including it are kept and later records (written after the checkpoint was saved) are dropped
+        """
+        if resume_generation is not None and os.path.exists(path):
+            truncate_run_log(path, resume_generation)
+            self.file = open(path, "a")
+        else:
+            self.file = open(path, "w")
+            self.file.write(",".join(RUN_LOG_FIELDS) + "\n")
+        self.last_flush = time.monotonic()
+
+    def write(self, record: GenerationRecord):
+        """
+        Append a record to the run log.
+        :param record: The record of a generation
+        """
+        self.file.write(",".join(str(value) for value in record) + "\n")
+        if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.file.flush()
+            self.last_flush = time.monotonic()
+
+    def close(self):
+        """
+        Flush the remaining records and close the file.
+        """
+        self.file.close()
+
+    def __enter__(self) -> "RunLogWriter":
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+
+class RunLogReader:
+    """
+    Incremental reader of a run log. Each call of read returns only the records appended since the previous call, so
+    the log of a running run can be followed without parsing it from the start again.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: The path of the run log
+        """
+        self.path = path
+        self.offset = 0
+
+    def read(self) -> list[GenerationRecord]:
+        """
+        Read the complete records appended since the last call. An incomplete last line (a record being written) is
+        left for the next call.
+        :return: The new records
+        """
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            content = file.read()
+
+        end_of_complete_lines = content.rfind(b"\n") + 1
+        lines = content[:end_of_complete_lines].decode().splitlines()
+        if self.offset == 0 and len(lines) > 0:
+            if tuple(lines[0].split(",")) != RUN_LOG_FIELDS:
+                raise ValueError(f"{self.path} is not a run log, its header is {lines[0]}")
+            lines = lines[1:]
+        self.offset += end_of_complete_lines
+        return [parse_record(line) for line in lines]
+
+
+def read_run_log(path: str) -> list[GenerationRecord]:
+    """
+    Read all records of a run log.
+    :param path: The path of the run log
+    :return: The records
+    """
+    return RunLogReader(path).read()
+
+
+def parse_record(line: str) -> GenerationRecord:
+    """
+    Parse one line of a run log.
+    :param line: The line without its line break
+    :return: The record
+    """
+    generation, best, mean, worst, unique, generation_seconds, elapsed_seconds = line.split(",")
+    return GenerationRecord(int(generation), int(best), float(mean), int(worst), int(unique),
+                            float(generation_seconds), float(elapsed_seconds))
+
+
+def truncate_run_log(path: str, last_generation: int):
+    """
+    Remove the records after a generation from a run log.
+    :param path: The path of the run log
+    :param last_generation: The last generation to keep
+    """
+    with open(path, "rb+") as file:
+        offset = len(file.readline())
+        for line in iter(file.readline, b""):
+            if not line.endswith(b"\n") or int(line.split(b",", 1)[0]) > last_generation:
+                break
+            offset += len(line)
+        file.truncate(offset)
@@ -0,0 +1,771 @@
+import os
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, NamedTuple
+
+import numpy as np
+from numpy import ndarray
+from numpy.random import RandomState
+
+from src import config as default_config
+from src.checkpoint import Checkpoint, save_checkpoint
+from src.evolutionary_tools.backends import get_backend
+from src.evolutionary_tools.chromosome import generate_random_chromosomes
+from src.evolutionary_tools.dtypes import permutation_dtype
+from src.evolutionary_tools.fitness_function import bulk_basic_fitness_function, bulk_basic_fitness_function_baldwinian, \
+    bulk_basic_fitness_function_lamarckian, bulk_batched_fitness_function_baldwinian, bulk_batched_fitness_function_lamarckian, \
+    bulk_incremental_fitness_function, lookup_population_fitness, bulk_symmetric_fitness_function, bulk_sparse_fitness_function
+from src.evolutionary_tools.greedy_optimizations import two_opt_delta_matrix, two_opt_dont_look_bits, CandidateLists, \
+    build_candidate_lists, robust_tabu_search, simulated_annealing
+from src.evolutionary_tools.local_search_cache import LocalSearchCache
+from src.evolutionary_tools.metrics import Metrics, current_metrics, use_metrics
+from src.evolutionary_tools.migration import migrate, migration_topologies
+from src.evolutionary_tools.mutation import apply_mutation_to_population, swap_mutation
+from src.evolutionary_tools.parallel import WorkerPool, parallel_map, worker_local_search_cache
+from src.evolutionary_tools.recombine import recombine_chromosomes, order_crossing, partially_mapped_crossover, bulk_order_crossing, \
+    bulk_partially_mapped_crossover
+from src.evolutionary_tools.selection import roulette_wheel_selection, tournament_selection_two_tournament, \
+    tournament_selection_two_tournament_bulk, tournament_selection_k_tournament_bulk, \
+    tournament_selection_k_tournament_bulk_no_duplicates, tournament_selection_k_tournament_no_duplicates_unbiased, \
+    stochastic_universal_sampling_selection, replace_equal_parents
+from src.evolutionary_tools.sparse_flow import SparseFlow, build_sparse_flow, flow_density
+from src.read_data import read_data, is_symmetric_instance
+from src.run_log import RunLogWriter, GenerationRecord, population_statistics
+
+variants = ["standard", "baldwinian", "lamarckian"]
+fitness_functions = ["bulk_basic", "bulk_batched_best", "bulk_batched_first"]
+selection_functions = ["roulette_wheel", "stochastic_universal_sampling", "tournament_two", "tournament_two_bulk", "tournament_k_bulk", "tournament_k_bulk_no_dups", "tournament_k_no_dups_unbiased"]
+recombination_functions = ["order", "partially_mapped", "bulk_order", "bulk_partially_mapped"]
+mutation_functions = ["swap"]
+local_search_functions = ["two_opt", "two_opt_delta_matrix", "two_opt_dont_look_bits", "robust_tabu_search",
+                          "simulated_annealing"]
+stop_reasons = ["generations", "time_budget", "target_fitness", "stagnation", "fitness_evaluations"]
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    """
+    All parameters of a run, the values of src.config by default. The number of facilities is taken from the instance.
+    A stopping criterion set to 0 is disabled, see stop_reason.
+    """
+    variant: str = "lamarckian"
+    fitness_function: str = "bulk_basic"
+    selection_function: str = "roulette_wheel"
+    recombination_function: str = "partially_mapped"
+    mutation_function: str = "swap"
+    local_search_function: str = "two_opt"
+
+    population_size: int = default_config.POPULATION_SIZE
+    number_of_generations: int = default_config.NUMBER_OF_GENERATIONS
+    mutation_prob: float = default_config.MUTATION_PROB
+    tournament_size: int = default_config.TOURNAMENT_SIZE
+    number_of_iterations_for_opt: int = default_config.NUMBER_OF_ITERATIONS_FOR_OPT
+    number_of_moves_for_batched_opt: int = default_config.NUMBER_OF_MOVES_FOR_BATCHED_OPT
+    candidate_list_size: int = default_config.CANDIDATE_LIST_SIZE
+    sparse_flow_density: float = default_config.SPARSE_FLOW_DENSITY
+    tabu_search_iterations: int = default_config.TABU_SEARCH_ITERATIONS
+    tabu_search_time_budget: float = default_config.TABU_SEARCH_TIME_BUDGET
+    simulated_annealing_moves: int = default_config.SIMULATED_ANNEALING_MOVES
+    simulated_annealing_initial_temperature: float = default_config.SIMULATED_ANNEALING_INITIAL_TEMPERATURE
+    simulated_annealing_final_temperature: float = default_config.SIMULATED_ANNEALING_FINAL_TEMPERATURE
+    cooling_schedule: str = default_config.COOLING_SCHEDULE
+    local_search_cache_max_bytes: int = default_config.LOCAL_SEARCH_CACHE_MAX_BYTES
+
+    number_of_workers: int = default_config.NUMBER_OF_WORKERS
+    kernel_backend: str = default_config.KERNEL_BACKEND
+    incremental_evaluation: bool = default_config.INCREMENTAL_EVALUATION
+    progress_bar: bool = default_config.PROGRESS_BAR
+    profile: bool = default_config.PROFILE
+
+    time_budget: float = default_config.TIME_BUDGET
+    target_fitness: int = default_config.TARGET_FITNESS
+    max_generations_without_improvement: int = default_config.MAX_GENERATIONS_WITHOUT_IMPROVEMENT
+    max_fitness_evaluations: int = default_config.MAX_FITNESS_EVALUATIONS
+
+    checkpoint_interval: int = default_config.CHECKPOINT_INTERVAL
+
+    number_of_islands: int = default_config.NUMBER_OF_ISLANDS
+    migration_interval: int = default_config.MIGRATION_INTERVAL
+    number_of_migrants: int = default_config.NUMBER_OF_MIGRANTS
+    migration_topology: str = default_config.MIGRATION_TOPOLOGY
+
+    testing: bool = default_config.TESTING
+    testing_size: int = default_config.TESTING_SIZE
+
+    # Seed of the random number generator of the run, None for a different run each time
+    seed: int | None = None
+
+
+class SolveResult(NamedTuple):
+    """
+    The result of Solver.solve.
+    """
+    best_chromosome: ndarray
+    best_fitness: float
+    best_fitness_each_generation: list[float]
+    time_per_generation: list[float]
+    stop_reason: str
+
+
+class Island(NamedTuple):
+    """
+    State of one island of the island model. The state of the random number generator travels with the island, such
+    that the result does not depend on which worker process evolves it.
+    """
+    population: ndarray
+    population_fitness: ndarray | None
+    random_state: tuple
+
+
+class Solver:
+    """
+    Evolutionary algorithm for the QAP. A solver owns all state of its runs: the configuration, the random number
+    generator, the local search cache, the metrics and the pool of worker processes. Separate solvers can therefore
+    solve concurrently (e.g. in threads) without affecting each other's results, and a solver with a seed returns the
+    same result on every call of solve. A solver runs one solve at a time.
+    """
+
+    def __init__(self, config: SolverConfig = SolverConfig()):
+        """
+        :param config: The parameters of the runs
+        """
+        self.config = config
+        self.random_state = RandomState(config.seed)
+        self.cache = LocalSearchCache(config.local_search_cache_max_bytes)
+        self.metrics = Metrics()
+        self.worker_pool = WorkerPool()
+
+    def solve(
+            self,
+            problem: str,
+            checkpoint_path: str | None = None,
+            run_parameters: dict | None = None,
+            resume_checkpoint: Checkpoint | None = None,
+            run_log_path: str | None = None
+    ) -> SolveResult:
+        """
+        Solve a problem. The random number generator (unless resuming), the cache and the metrics are reset first and
+        the worker processes are shut down at the end.
+        :param problem: Name of the file containing the problem to be solved
+        :param checkpoint_path: Optional path to save a checkpoint to every checkpoint_interval generations
+        :param run_parameters: The parameters of the run stored in the checkpoints
+        :param resume_checkpoint: Optional checkpoint to continue from instead of starting with a random population
+        :param run_log_path: Optional path of the run log to stream the statistics of each generation to
+        :return: The result of the run
+        """
+        if self.config.number_of_islands > 1 and resume_checkpoint is not None:
+            raise ValueError("Resuming from a checkpoint is not supported by the island model")
+
+        self.random_state.seed(self.config.seed)
+        self.cache.clear()
+        self.metrics.clear()
+        with use_metrics(self.metrics):
+            try:
+                if self.config.number_of_islands > 1:
+                    return self.island_evolution_loop(problem, run_log_path)
+                return self.basic_evolution_loop(problem, checkpoint_path, run_parameters, resume_checkpoint, run_log_path)
+            finally:
+                self.worker_pool.shutdown()
+
+    def read_problem(self, problem: str) -> tuple[ndarray, ndarray]:
+        """
+        :param problem: Name of the file containing the problem
+        :return: A tuple containing the flow and distance matrices, cut to testing_size facilities in testing mode
+        """
+        (flow_matrix, distance_matrix) = read_data(problem)
+        if self.config.testing:
+            flow_matrix = flow_matrix[:self.config.testing_size, :self.config.testing_size]
+            distance_matrix = distance_matrix[:self.config.testing_size, :self.config.testing_size]
+        return flow_matrix, distance_matrix
+
+    def basic_evolution_loop(
+            self,
+            problem: str,
+            checkpoint_path: str | None = None,
+            run_parameters: dict | None = None,
+            resume_checkpoint: Checkpoint | None = None,
+            run_log_path: str | None = None
+    ) -> SolveResult:
+        """
+        Basic evolutionary loop for the algorithm. The loop ends after number_of_generations or as soon as one of the
+        stopping criteria is met before a generation, see stop_reason.
+        :param problem: Name of the file containing the problem to be solved
+        :param checkpoint_path: Optional path to save a checkpoint to every checkpoint_interval generations
+        :param run_parameters: The parameters of the run stored in the checkpoints
+        :param resume_checkpoint: Optional checkpoint to continue from instead of starting with a random population
+        :param run_log_path: Optional path of the run log to stream the statistics of each generation to
+        :return: The result of the run
+        """
+        config = self.config
+        flow_matrix, distance_matrix = self.read_problem(problem)
+        fitness_function, selection_function, recombination_function, mutation_function = translate_strings_for_instance(
+            config, flow_matrix, distance_matrix, self.cache, self.worker_pool)
+
+        best_fitness_each_generation = []
+        time_per_generation = []
+
+        # Without local search, children can be evaluated incrementally from their parents
+        incremental_evaluation = config.incremental_evaluation and evaluates_without_local_search(config)
+
+        run_log = None
+        if resume_checkpoint is None:
+            first_generation = 0
+            population = generate_random_chromosomes(config.population_size, flow_matrix.shape[0], self.random_state)
+            population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, False)
+            best_fitness_each_generation.append(np.min(population_fitness))
+            if run_log_path is not None:
+                run_log = RunLogWriter(run_log_path)
+                run_log.write(GenerationRecord(0, *population_statistics(population, population_fitness), 0.0, 0.0))
+        else:
+            if resume_checkpoint.population.shape != (config.population_size, flow_matrix.shape[0]):
+                raise ValueError(f"Checkpoint population of shape {resume_checkpoint.population.shape} does not match the configuration")
+            first_generation = resume_checkpoint.generation
+            # Checkpoints written before the compact dtype policy hold int64 populations
+            population = resume_checkpoint.population.astype(permutation_dtype(flow_matrix.shape[0]), copy=False)
+            population_fitness = resume_checkpoint.population_fitness
+            best_fitness_each_generation = resume_checkpoint.best_fitness_each_generation
+            time_per_generation = resume_checkpoint.time_per_generation
+            self.random_state.set_state(resume_checkpoint.random_state)
+            self.cache.restore(resume_checkpoint.cache_state)
+            if run_log_path is not None:
+                run_log = RunLogWriter(run_log_path, resume_generation=first_generation)
+        elapsed_time = float(np.sum(time_per_generation))
+        generations_without_improvement = count_generations_without_improvement(best_fitness_each_generation)
+        best_fitness_so_far = min(best_fitness_each_generation)
+
+        reason = "generations"
+        try:
+            for generation in range(first_generation, config.number_of_generations):
+                # Each generation evaluates population_size children, the initial population counts as one generation
+                reason = stop_reason(config, best_fitness_each_generation[-1], generations_without_improvement, elapsed_time,
+                                     (generation + 1) * config.population_size)
+                if reason is not None:
+                    break
+                reason = "generations"
+
+                start_time = time.perf_counter()
+                if generation % 10 == 0:
+                    print(f"Generation {generation + 1}")
+                    print(f"Best fitness: {np.min(population_fitness)}")
+
+                    number_of_unique_permutations = len(np.unique(population, axis=0))
+                    print(f"Number of unique permutations: {number_of_unique_permutations}")
+
+                    if len(time_per_generation) != 0:
+                        average_time_per_generation_per_individual = np.mean(time_per_generation) / config.population_size
+                        print(f"Average time per generation per individual: {average_time_per_generation_per_individual}")
+
+                population, population_fitness = evolve_generation(
+                    flow_matrix, distance_matrix, population, population_fitness, fitness_function, selection_function,
+                    recombination_function, mutation_function, generation, generation == config.number_of_generations - 1,
+                    incremental_evaluation, config.tournament_size, config.mutation_prob, self.random_state,
+                    inherits_dont_look_bits(config))
+
+                # Add the fittest individual to the list
+                generations_without_improvement = 0 if np.min(population_fitness) < best_fitness_so_far else generations_without_improvement + 1
+                best_fitness_so_far = min(best_fitness_so_far, np.min(population_fitness))
+                best_fitness_each_generation.append(np.min(population_fitness))
+
+                # Time generation
+                end_time = time.perf_counter()
+                time_per_generation.append(end_time - start_time)
+                elapsed_time += end_time - start_time
+
+                if run_log is not None:
+                    run_log.write(GenerationRecord(generation + 1, *population_statistics(population, population_fitness),
+                                                   end_time - start_time, elapsed_time))
+
+                # Save the state before the next generation
+                if checkpoint_path is not None and config.checkpoint_interval > 0 and (generation + 1) % config.checkpoint_interval == 0:
+                    save_checkpoint(checkpoint_path, Checkpoint(generation + 1, population, population_fitness, best_fitness_each_generation,
+                                                                time_per_generation, self.random_state.get_state(), self.cache.state(),
+                                                                run_parameters or {}))
+        finally:
+            if run_log is not None:
+                run_log.close()
+
+        best_chromosome, best_fitness = population[np.argmin(population_fitness)], np.min(population_fitness)
+        if reason != "generations":
+            best_chromosome, best_fitness = finalize_fittest_individual(flow_matrix, distance_matrix, best_chromosome, fitness_function)
+
+        print(f"Stopped after generation {len(best_fitness_each_generation) - 1}: {reason}")
+        print(f"Local search cache: {self.cache.statistics()}")
+        print(f"Counters: {dict(self.metrics.counters)}")
+        print(f"Best solution: {best_chromosome} with fitness {best_fitness}")
+
+        return SolveResult(best_chromosome, best_fitness, best_fitness_each_generation, time_per_generation, reason)
+
+    def island_evolution_loop(self, problem: str, run_log_path: str | None = None) -> SolveResult:
+        """
+        Island model of the evolutionary loop. number_of_islands populations of population_size individuals evolve
+        independently in a pool of worker processes. Every migration_interval generations, the islands exchange their
+        number_of_migrants fittest individuals over migration_topology, see migrate. The stopping criteria (see
+        stop_reason) are checked between these epochs, with number_of_islands * population_size evaluations per
+        generation. The islands use the local search cache of the worker process evolving them.
+        :param problem: Name of the file containing the problem to be solved
+        :param run_log_path: Optional path of the run log to stream the statistics of each generation to. The statistics
+        are taken over all islands, the number of unique individuals is summed over the islands
+        :return: The result of the run, with the best fitness over all islands each generation
+        """
+        config = self.config
+        if config.migration_topology not in migration_topologies:
+            raise ValueError(f"Invalid migration topology: {config.migration_topology}")
+
+        flow_matrix, distance_matrix = self.read_problem(problem)
+        # The functions are sent to the worker processes, which bind their own cache (see evolve_island). The final
+        # evaluation in this process uses the cache and pool of the solver
+        functions = translate_strings_for_instance(config, flow_matrix, distance_matrix)
+        fitness_function = bind_local_search_state(functions[0], config, self.cache, self.worker_pool)
+
+        best_fitness_each_generation = []
+        time_per_generation = []
+
+        incremental_evaluation = config.incremental_evaluation and evaluates_without_local_search(config)
+        number_of_workers = min(config.number_of_islands, os.cpu_count() or 1)
+
+        islands = []
+        for seed in self.random_state.randint(0, 2 ** 31 - 1, size=config.number_of_islands):
+            population = generate_random_chromosomes(config.population_size, flow_matrix.shape[0], self.random_state)
+            islands.append(Island(population, None, RandomState(seed).get_state()))
+
+        run_log = RunLogWriter(run_log_path) if run_log_path is not None else None
+        elapsed_time = 0.0
+        generations_without_improvement = 0
+        best_fitness_so_far = np.inf
+        generation = 0
+        reason = "generations"
+        try:
+            while generation < config.number_of_generations:
+                if len(best_fitness_each_generation) > 0:
+                    reason = stop_reason(config, best_fitness_each_generation[-1], generations_without_improvement, elapsed_time,
+                                         (generation + 1) * config.number_of_islands * config.population_size)
+                    if reason is not None:
+                        break
+                    reason = "generations"
+
+                start_time = time.perf_counter()
+                number_of_generations = min(config.migration_interval, config.number_of_generations - generation)
+                tasks = [(island, functions, generation, number_of_generations, incremental_evaluation, config) for island in islands]
+                results = parallel_map(flow_matrix, distance_matrix, evolve_island, tasks, number_of_workers, self.worker_pool)
+
+                islands = [island for island, _ in results]
+                # Statistics of shape (islands, generations, 4): best, mean and worst fitness and number of unique individuals
+                statistics = np.array([island_statistics for _, island_statistics in results])
+                for best_fitness in np.min(statistics[:, :, 0], axis=0).astype(np.int64):
+                    generations_without_improvement = 0 if best_fitness < best_fitness_so_far else generations_without_improvement + 1
+                    best_fitness_so_far = min(best_fitness_so_far, best_fitness)
+                    best_fitness_each_generation.append(best_fitness)
+                first_record = generation + 1 - statistics.shape[1] + number_of_generations
+                generation += number_of_generations
+
+                if generation < config.number_of_generations:
+                    populations = [island.population for island in islands]
+                    populations_fitness = [island.population_fitness for island in islands]
+                    with self.metrics.phase("migration"):
+                        migrate(populations, populations_fitness, config.number_of_migrants, config.migration_topology)
+
+                end_time = time.perf_counter()
+                generation_time = (end_time - start_time) / number_of_generations
+                time_per_generation.extend([generation_time] * number_of_generations)
+
+                if run_log is not None:
+                    for offset in range(statistics.shape[1]):
+                        record_generation = first_record + offset
+                        record_time = generation_time if record_generation > 0 else 0.0
+                        run_log.write(GenerationRecord(
+                            record_generation, int(np.min(statistics[:, offset, 0])), float(np.mean(statistics[:, offset, 1])),
+                            int(np.max(statistics[:, offset, 2])), int(np.sum(statistics[:, offset, 3])), record_time,
+                            elapsed_time + (record_generation - generation + number_of_generations) * generation_time))
+                elapsed_time += end_time - start_time
+
+                print(f"Generation {generation}")
+                print(f"Best fitness: {best_fitness_each_generation[-1]}")
+                print(f"Best fitness of each island: {[int(np.min(island.population_fitness)) for island in islands]}")
+        finally:
+            if run_log is not None:
+                run_log.close()
+
+        best_island = min(islands, key=lambda island: np.min(island.population_fitness))
+        best_chromosome = best_island.population[np.argmin(best_island.population_fitness)]
+        best_fitness = np.min(best_island.population_fitness)
+        if reason != "generations":
+            best_chromosome, best_fitness = finalize_fittest_individual(flow_matrix, distance_matrix, best_chromosome, fitness_function)
+        print(f"Stopped after generation {generation}: {reason}")
+        print(f"Best solution: {best_chromosome} with fitness {best_fitness}")
+
+        return SolveResult(best_chromosome, best_fitness, best_fitness_each_generation, time_per_generation, reason)
+
+
+def stop_reason(
+        config: SolverConfig,
+        best_fitness: float,
+        generations_without_improvement: int,
+        elapsed_time: float,
+        number_of_evaluations: int
+) -> str | None:
+    """
+    Check the stopping criteria which can end a run before number_of_generations. A criterion set to 0 is disabled.
+    :param config: The configuration of the run
+    :param best_fitness: The best fitness found so far
+    :param generations_without_improvement: The number of generations since the best fitness last improved
+    :param elapsed_time: The time spent in the generations so far in seconds
+    :param number_of_evaluations: The number of fitness evaluations (of individuals) so far
+    :return: The first criterion met (one of stop_reasons) or None to continue
+    """
+    if config.target_fitness > 0 and best_fitness <= config.target_fitness:
+        return "target_fitness"
+    if config.max_generations_without_improvement > 0 and generations_without_improvement >= config.max_generations_without_improvement:
+        return "stagnation"
+    if config.time_budget > 0 and elapsed_time >= config.time_budget:
+        return "time_budget"
+    if config.max_fitness_evaluations > 0 and number_of_evaluations >= config.max_fitness_evaluations:
+        return "fitness_evaluations"
+    return None
+
+
+def count_generations_without_improvement(best_fitness_each_generation: list[float]) -> int:
+    """
+    :param best_fitness_each_generation: The best fitness of the initial population and of each generation
+    :return: The number of generations since the best fitness was first reached
+    """
+    return len(best_fitness_each_generation) - 1 - int(np.argmin(best_fitness_each_generation))
+
+
+def finalize_fittest_individual(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        chromosome: ndarray,
+        fitness_function: Callable[[ndarray, ndarray, ndarray, bool, int], tuple[ndarray, ndarray]]
+) -> tuple[ndarray, float]:
+    """
+    Evaluate the fittest individual of a run stopped early once more with final set, since its last generation was
+    not known to be final. The Baldwinian variants thereby return the optimized genes matching the fitness.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param chromosome: The genes of the fittest individual
+    :param fitness_function: Fitness function used by the run
+    :return: A tuple of the final genes and their fitness
+    """
+    chromosomes, fitness_values = fitness_function(flow_matrix, distance_matrix, chromosome[np.newaxis, :], True)
+    return chromosomes[0], fitness_values[0]
+
+
+def bind_local_search_state(
+        fitness_function: Callable[..., tuple[ndarray, ndarray]],
+        config: SolverConfig,
+        cache: LocalSearchCache,
+        worker_pool: WorkerPool | None = None
+) -> Callable[..., tuple[ndarray, ndarray]]:
+    """
+    Bind the cache of the local search results and the pool of worker processes to a fitness function translated
+    without them, see translate_strings_to_functions.
+    :param fitness_function: The fitness function
+    :param config: The configuration the fitness function was translated from
+    :param cache: The cache for the local search results
+    :param worker_pool: The pool of worker processes for the local search, None in a worker process
+    :return: The fitness function using the cache and the pool (unchanged if it does not apply a local search)
+    """
+    if evaluates_without_local_search(config):
+        return fitness_function
+    return partial(fitness_function, cache=cache, worker_pool=worker_pool)
+
+
+def evaluates_without_local_search(config: SolverConfig) -> bool:
+    """
+    :param config: The configuration of the run
+    :return: Whether the fitness function evaluates the chromosomes as they are (the standard variant), such that
+    children can be evaluated incrementally from their parents
+    """
+    return config.variant == "standard"
+
+
+def run_sparse_flow(config: SolverConfig, flow_matrix: ndarray, symmetric: bool) -> SparseFlow | None:
+    """
+    :param config: The configuration of the run
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param symmetric: Whether the instance is symmetric, see is_symmetric_instance
+    :return: The flow matrix in sparse form if its density is at most sparse_flow_density, selecting the sparse
+    kernels, see build_sparse_flow
+    """
+    if config.sparse_flow_density <= 0 or flow_density(flow_matrix) > config.sparse_flow_density:
+        return None
+    return build_sparse_flow(flow_matrix, symmetric)
+
+
+def run_candidate_lists(config: SolverConfig, flow_matrix: ndarray, distance_matrix: ndarray) -> CandidateLists | None:
+    """
+    :param config: The configuration of the run
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :return: The candidate lists of the instance if the local search of the run uses them, see build_candidate_lists
+    """
+    if config.local_search_function != "two_opt_dont_look_bits" or config.candidate_list_size <= 0:
+        return None
+    return build_candidate_lists(flow_matrix, distance_matrix, config.candidate_list_size)
+
+
+def inherits_dont_look_bits(config: SolverConfig) -> bool:
+    """
+    :param config: The configuration of the run
+    :return: Whether children inherit the don't-look bits of the positions they share with their parents. This requires
+    locally optimized parents (the Lamarckian variant) and a local search with don't-look bits
+    """
+    return (config.variant == "lamarckian" and config.fitness_function == "bulk_basic" and
+            config.local_search_function == "two_opt_dont_look_bits")
+
+
+def evolve_island(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        task: tuple[Island, tuple[Callable, Callable, Callable, Callable], int, int, bool, SolverConfig]
+) -> tuple[Island, list[tuple[int, float, int, int]]]:
+    """
+    Evolve one island for a number of generations, executed by the worker processes of Solver.island_evolution_loop.
+    An island without fitness values is evaluated first. The local search results are cached in the worker process.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param task: A six tuple of the island, the fitness, selection, recombination and mutation function, the index of
+    the first generation, the number of generations, whether to evaluate the children incrementally and the configuration
+    :return: A tuple of the evolved island and a list of its population_statistics each generation (including the
+    initial population if it was evaluated)
+    """
+    island, (fitness_function, selection_function, recombination_function, mutation_function), first_generation, \
+        number_of_generations, incremental_evaluation, config = task
+    fitness_function = bind_local_search_state(fitness_function, config,
+                                               worker_local_search_cache(config.local_search_cache_max_bytes))
+    random_state = RandomState()
+    random_state.set_state(island.random_state)
+    population, population_fitness = island.population, island.population_fitness
+
+    statistics_each_generation = []
+    if population_fitness is None:
+        population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, False)
+        statistics_each_generation.append(population_statistics(population, population_fitness))
+
+    for generation in range(first_generation, first_generation + number_of_generations):
+        population, population_fitness = evolve_generation(
+            flow_matrix, distance_matrix, population, population_fitness, fitness_function, selection_function,
+            recombination_function, mutation_function, generation, generation == config.number_of_generations - 1,
+            incremental_evaluation, config.tournament_size, config.mutation_prob, random_state, inherits_dont_look_bits(config))
+        statistics_each_generation.append(population_statistics(population, population_fitness))
+
+    return Island(population, population_fitness, random_state.get_state()), statistics_each_generation
+
+
+def evolve_generation(
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        population: ndarray,
+        population_fitness: ndarray,
+        fitness_function: Callable[[ndarray, ndarray, ndarray, bool, int], tuple[ndarray, ndarray]],
+        selection_function: Callable[[ndarray, ndarray, int], ndarray],
+        recombination_function: Callable[[ndarray, ndarray], tuple[ndarray, ndarray]],
+        mutation_function: Callable[[ndarray], ndarray],
+        generation: int,
+        final: bool,
+        incremental_evaluation: bool,
+        tournament_size: int,
+        mutation_prob: float,
+        random_state: RandomState | None = None,
+        track_changes: bool = False
+) -> tuple[ndarray, ndarray]:
+    """
+    Evolve the population by one generation: selection, recombination, mutation, evaluation and elitism. The time of
+    each phase is added to the current metrics.
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param population: The current population
+    :param population_fitness: The fitness values of the current population
+    :param fitness_function: Fitness function to be used
+    :param selection_function: Selection function to be used
+    :param recombination_function: Recombination function to be used
+    :param mutation_function: Mutation function to be used
+    :param generation: The index of the generation
+    :param final: Whether this is the last generation, passed on to the fitness function
+    :param incremental_evaluation: Whether to evaluate the children incrementally from their parents, only valid for
+    fitness functions without local search, see evaluates_without_local_search
+    :param tournament_size: The size of the tournaments of the tournament selections
+    :param mutation_prob: The probability of mutating a child
+    :param random_state: The random number generator, the global one by default
+    :param track_changes: Whether to pass the positions in which the children differ from their reference parents to
+    the fitness function as changed_positions, see inherits_dont_look_bits
+    :return: A tuple of the new population and its fitness values
+    """
+    metrics = current_metrics()
+
+    # Take the fittest individual to secure a spot in the new generation
+    index_of_fittest_individual = np.argmin(population_fitness)
+    fittest_individual = population[index_of_fittest_individual]
+    fitness_of_fittest_individual = population_fitness[index_of_fittest_individual]
+
+    # Selection
+    with metrics.phase("selection"):
+        selected_chromosomes = selection_function(population, population_fitness, tournament_size, random_state=random_state)
+
+    # Check if parents for one child are equal in which case replace those
+    with metrics.phase("parent_repair"):
+        selected_chromosomes = replace_equal_parents(selected_chromosomes, population, population_fitness, selection_function,
+                                                     tournament_size, random_state)
+
+    # Recombine
+    changed_positions = None
+    with metrics.phase("recombination"):
+        if incremental_evaluation or track_changes:
+            selected_fitness = lookup_population_fitness(population, population_fitness, selected_chromosomes)
+            population, reference_chromosomes, reference_fitness, changed_positions = recombine_chromosomes(
+                selected_chromosomes, recombination_function, selected_fitness, random_state)
+        else:
+            population = recombine_chromosomes(selected_chromosomes, recombination_function, random_state=random_state)
+
+    # Mutate
+    with metrics.phase("mutation"):
+        population = apply_mutation_to_population(population, mutation_function, mutation_prob, changed_positions, random_state)
+
+    # Evaluate the new population (and possibly apply Lamarckian evolution)
+    with metrics.phase("evaluation"):
+        if incremental_evaluation:
+            population_fitness = bulk_incremental_fitness_function(flow_matrix, distance_matrix, reference_chromosomes,
+                                                                   reference_fitness, population, changed_positions)
+        elif track_changes:
+            population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, final, generation + 1,
+                                                              changed_positions=changed_positions)
+        else:
+            population, population_fitness = fitness_function(flow_matrix, distance_matrix, population, final, generation + 1)
+
+    # Force the fittest individual to survive by replacing worst in new population with best from last population
+    worst_individual = np.argmax(population_fitness)
+    population[worst_individual] = fittest_individual
+    population_fitness[worst_individual] = fitness_of_fittest_individual
+
+    return population, population_fitness
+
+
+def translate_strings_for_instance(
+        config: SolverConfig,
+        flow_matrix: ndarray,
+        distance_matrix: ndarray,
+        cache: LocalSearchCache | None = None,
+        worker_pool: WorkerPool | None = None
+) -> tuple[Callable, Callable, Callable, Callable]:
+    """
+    Translate the function strings of a configuration like translate_strings_to_functions, selecting the kernels
+    specialized for the instance: the candidate lists, the symmetric kernels and the sparse kernels.
+    :param config: The configuration providing the variant and the function strings
+    :param flow_matrix: Two-dimensional numpy array representing the flow matrix
+    :param distance_matrix: Two-dimensional numpy array representing the distance matrix
+    :param cache: The cache for the local search results, see translate_strings_to_functions
+    :param worker_pool: The pool of worker processes for the local search, see translate_strings_to_functions
+    :return: Four tuple of the fitness, selection, recombination and mutation function
+    """
+    symmetric = is_symmetric_instance(flow_matrix, distance_matrix)
+    return translate_strings_to_functions(config, cache, run_candidate_lists(config, flow_matrix, distance_matrix), symmetric,
+                                          run_sparse_flow(config, flow_matrix, symmetric), worker_pool)
+
+
+def translate_strings_to_functions(
+        config: SolverConfig,
+        cache: LocalSearchCache | None = None,
+        candidate_lists: CandidateLists | None = None,
+        symmetric: bool = False,
+        sparse_flow: SparseFlow | None = None,
+        worker_pool: WorkerPool | None = None
+) -> tuple[Callable[[ndarray, ndarray, ndarray, bool, int], tuple[ndarray, ndarray]], Callable[[ndarray, ndarray, int], ndarray], Callable[[ndarray, ndarray], tuple[ndarray, ndarray]], Callable[[ndarray], ndarray]]:
+    """
+    Translate the function strings of a configuration to the corresponding functions. The parameters of the local
+    search (the number of iterations or moves, the tabu search and annealing parameters, the kernel backend, the
+    candidate lists, the number of workers, the worker pool and the cache) are bound to the fitness function.
+    :param config: The configuration providing the variant and the function strings
+    :param cache: The cache for the local search results, None for no cache across generations (e.g. for functions sent
+    to worker processes, see bind_local_search_state)
+    :param candidate_lists: The candidate lists of the instance for two_opt_dont_look_bits, see run_candidate_lists
+    :param symmetric: Whether the instance is symmetric, selecting the specialized fitness function of the standard
+    variant and kernels of two_opt, see is_symmetric_instance
+    :param sparse_flow: The flow matrix in sparse form if the sparse kernels are to be used, see run_sparse_flow
+    :param worker_pool: The pool of worker processes for the local search, see parallel_map. None for functions sent
+    to worker processes, which do not start pools themselves
+    :return: Four tuple of the fitness, selection, recombination and mutation function
+    """
+    fitness_function, selection_function, recombination_function, mutation_function = None, None, None, None
+    local_search_function = None
+
+    match config.local_search_function:
+        case "two_opt":
+            local_search_function = partial(get_backend(config.kernel_backend, symmetric, sparse_flow).two_opt,
+                                            number_of_iterations=config.number_of_iterations_for_opt)
+        case "two_opt_delta_matrix":
+            local_search_function = partial(two_opt_delta_matrix, number_of_iterations=config.number_of_iterations_for_opt)
+        case "two_opt_dont_look_bits":
+            local_search_function = partial(two_opt_dont_look_bits, number_of_iterations=config.number_of_iterations_for_opt,
+                                            candidate_lists=candidate_lists)
+        case "robust_tabu_search":
+            local_search_function = partial(robust_tabu_search, number_of_iterations=config.tabu_search_iterations,
+                                            time_budget=config.tabu_search_time_budget, seed=config.seed)
+        case "simulated_annealing":
+            local_search_function = partial(simulated_annealing, number_of_moves=config.simulated_annealing_moves,
+                                            initial_temperature=config.simulated_annealing_initial_temperature,
+                                            final_temperature=config.simulated_annealing_final_temperature,
+                                            cooling_schedule=config.cooling_schedule, seed=config.seed)
+
+    if sparse_flow is not None:
+        plain_fitness_function = partial(bulk_sparse_fitness_function, sparse_flow=sparse_flow)
+    else:
+        plain_fitness_function = bulk_symmetric_fitness_function if symmetric else bulk_basic_fitness_function
+    local_search_parameters = {"cache": cache, "number_of_workers": config.number_of_workers, "worker_pool": worker_pool}
+    match config.fitness_function:
+        case "bulk_basic":
+            match config.variant:
+                case "standard":
+                    fitness_function = plain_fitness_function
+                case "baldwinian":
+                    fitness_function = partial(bulk_basic_fitness_function_baldwinian, local_search_function=local_search_function,
+                                               progress_bar=config.progress_bar, **local_search_parameters)
+                case "lamarckian":
+                    fitness_function = partial(bulk_basic_fitness_function_lamarckian, local_search_function=local_search_function,
+                                               progress_bar=config.progress_bar, **local_search_parameters)
+        case "bulk_batched_best" | "bulk_batched_first":
+            best_improvement = config.fitness_function == "bulk_batched_best"
+            match config.variant:
+                case "standard":
+                    fitness_function = plain_fitness_function
+                case "baldwinian":
+                    fitness_function = partial(bulk_batched_fitness_function_baldwinian, best_improvement=best_improvement,
+                                               number_of_moves=config.number_of_moves_for_batched_opt, **local_search_parameters)
+                case "lamarckian":
+                    fitness_function = partial(bulk_batched_fitness_function_lamarckian, best_improvement=best_improvement,
+                                               number_of_moves=config.number_of_moves_for_batched_opt, **local_search_parameters)
+
+    match config.selection_function:
+        case "roulette_wheel":
+            selection_function = roulette_wheel_selection
+        case "stochastic_universal_sampling":
+            selection_function = stochastic_universal_sampling_selection
+        case "tournament_two":
+            selection_function = tournament_selection_two_tournament
+        case "tournament_two_bulk":
+            selection_function = tournament_selection_two_tournament_bulk
+        case "tournament_k_bulk":
+            selection_function = tournament_selection_k_tournament_bulk
+        case "tournament_k_bulk_no_dups":
+            selection_function = tournament_selection_k_tournament_bulk_no_duplicates
+        case "tournament_k_no_dups_unbiased":
+            selection_function = tournament_selection_k_tournament_no_duplicates_unbiased
+
+    match config.recombination_function:
+        case "order":
+            recombination_function = order_crossing
+        case "partially_mapped":
+            recombination_function = partially_mapped_crossover
+        case "bulk_order":
+            recombination_function = bulk_order_crossing
+        case "bulk_partially_mapped":
+            recombination_function = bulk_partially_mapped_crossover
+
+    match config.mutation_function:
+        case "swap":
+            mutation_function = swap_mutation
+
+    if not all([fitness_function, selection_function, recombination_function, mutation_function, local_search_function]):
+        raise ValueError("Invalid function string provided")
+
+    return fitness_function, selection_function, recombination_function, mutation_function
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from src.benchmark import grid_cells, parse_setting, run_grid, summarize, load_cell_results, time_to_solution
+
+
+def test_grid_cells():
+    cells = grid_cells(["standard", "lamarckian"], ["nug16a.dat"], range(2), {"mutation_prob": [0.2, 0.4], "tournament_size": [3]})
+
+    assert len(cells) == 2 * 2 * 2
+    assert len({cell.name for cell in cells}) == len(cells)
+    assert cells[0].name == "standard_nug16a_mutation_prob=0.2_tournament_size=3_seed0"
+    # The grid values override the hyperparameters of the variant
+    assert {cell.config.mutation_prob for cell in cells} == {0.2, 0.4}
+    assert {cell.config.population_size for cell in cells} == {100, 20}
+    assert [cell.config.seed for cell in cells[:4]] == [0, 0, 1, 1]
+
+
+def test_parse_setting():
+    assert parse_setting("mutation_prob=0.1,0.3") == ("mutation_prob", [0.1, 0.3])
+    assert parse_setting("population_size=8") == ("population_size", [8])
+    assert parse_setting("incremental_evaluation=false,true") == ("incremental_evaluation", [False, True])
+    with pytest.raises(ValueError):
+        parse_setting("unknown=1")
+
+
+def test_time_to_solution():
+    assert time_to_solution([10, 8, 8, 7, 7], [1.0, 2.0, 3.0, 4.0]) == 6.0
+    assert time_to_solution([10, 10], [1.0]) == 0.0
+
+
+def test_summarize():
+    results = [{"variant": "standard", "problem": "nug16a.dat", "hyperparameters": {}, "best_fitness": fitness,
+                "time_to_solution": time, "total_time": 2 * time} for fitness, time in [(10, 1.0), (14, 3.0)]]
+    results.append({"variant": "lamarckian", "problem": "nug16a.dat", "hyperparameters": {"mutation_prob": 0.2},
+                    "best_fitness": 9, "time_to_solution": 0.5, "total_time": 1.0})
+
+    lamarckian, standard = summarize(results)
+    assert (lamarckian["runs"], lamarckian["hyperparameters"], lamarckian["std_fitness"]) == (1, "mutation_prob=0.2", 0.0)
+    assert (standard["runs"], standard["best_fitness"], standard["mean_fitness"]) == (2, 10, 12.0)
+    assert standard["std_fitness"] == pytest.approx(2 ** 1.5)
+    assert (standard["mean_time_to_solution"], standard["mean_total_time"]) == (2.0, 4.0)
+
+
+@pytest.mark.parametrize("number_of_workers", [1, 2])
+def test_run_grid_skips_finished_cells(tmp_path, number_of_workers):
+    cells = grid_cells(["standard"], ["nug16a.dat"], range(2), {"population_size": [6], "number_of_generations": [3]})
+    folder = str(tmp_path)
+
+    assert run_grid(cells, folder, number_of_workers) == 2
+    results = load_cell_results(folder)
+    assert sorted(result["seed"] for result in results) == [0, 1]
+    assert all(os.path.exists(f"{folder}/cells/{cell.name}_run.csv") for cell in cells)
+
+    # A resumed grid only runs the cells without a result
+    os.remove(f"{folder}/cells/{cells[1].name}.json")
+    assert run_grid(cells, folder, number_of_workers) == 1
+    # Seeded cells are repeatable, only the times differ
+    assert [(result["seed"], result["best_chromosome"]) for result in load_cell_results(folder)] == \
+        [(result["seed"], result["best_chromosome"]) for result in results]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from dataclasses import replace
+
+from src.checkpoint import Checkpoint, save_checkpoint, load_checkpoint
+from src.evolutionary_tools.local_search_cache import LocalSearchCache
+from src.solver import Solver, SolverConfig
+
+
+def test_save_and_load_checkpoint(tmp_path):
+    cache = LocalSearchCache()
+    cache.store(b"a" * 16, np.array([2, 0, 1]), 7)
+    cache.store(b"b" * 16, np.array([1, 2, 0]), 5)
+    cache.lookup(b"a" * 16)
+    np.random.seed(3)
+    checkpoint = Checkpoint(4, np.array([[0, 1, 2], [2, 1, 0]]), np.array([9, 8]), [10, 9], [0.5, 0.25],
+                            np.random.get_state(), cache.state(), {"problem": "nug16a.dat"})
+
+    path = tmp_path / "run.checkpoint.npz"
+    save_checkpoint(str(path), checkpoint)
+    loaded = load_checkpoint(str(path))
+    assert [file.name for file in tmp_path.iterdir()] == ["run.checkpoint.npz"]
+
+    assert loaded.generation == 4
+    assert np.array_equal(loaded.population, checkpoint.population)
+    assert np.array_equal(loaded.population_fitness, checkpoint.population_fitness)
+    assert loaded.best_fitness_each_generation == [10, 9]
+    assert loaded.time_per_generation == [0.5, 0.25]
+    assert loaded.run_parameters == {"problem": "nug16a.dat"}
+
+    np.random.set_state(loaded.random_state)
+    assert np.random.rand() == np.random.RandomState(3).rand()
+
+    restored = LocalSearchCache()
+    restored.restore(loaded.cache_state)
+    assert restored.statistics() == cache.statistics()
+    assert list(restored.entries) == list(cache.entries)
+
+
+@pytest.mark.parametrize("variant", ["standard", "lamarckian"])
+def test_resume_continues_bit_for_bit(tmp_path, variant):
+    config = SolverConfig(variant, "bulk_basic", "roulette_wheel", "bulk_partially_mapped", "swap", "two_opt_delta_matrix",
+                          population_size=8, number_of_generations=12, checkpoint_interval=5, seed=0)
+    path = str(tmp_path / "run.checkpoint.npz")
+
+    solver = Solver(config)
+    best_chromosome, best_fitness, best_fitness_each_generation, _, _ = solver.solve("nug16a.dat", checkpoint_path=path)
+    statistics = solver.cache.statistics()
+
+    # The last checkpoint was written after generation 10, the run is continued from there with a different seed
+    checkpoint = load_checkpoint(path)
+    assert checkpoint.generation == 10
+    resumed_solver = Solver(replace(config, seed=1))
+    resumed = resumed_solver.solve("nug16a.dat", resume_checkpoint=checkpoint)
+
+    assert np.array_equal(resumed[0], best_chromosome)
+    assert resumed[1] == best_fitness
+    assert resumed[2] == best_fitness_each_generation
+    assert resumed_solver.cache.statistics() == statistics
@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.evolutionary_tools.chromosome import generate_random_chromosomes
+from src.evolutionary_tools.dtypes import narrowest_dtype, compact_matrix, permutation_dtype
+
+
+def test_narrowest_dtype():
+    assert narrowest_dtype(0, 1) == np.uint8
+    assert narrowest_dtype(0, 256) == np.uint16
+    assert narrowest_dtype(0, 100000) == np.uint32
+    assert narrowest_dtype(-1, 127) == np.int8
+    assert narrowest_dtype(-1, 128) == np.int16
+
+
+def test_compact_matrix():
+    matrix = np.array([[0, 3], [70000, 0]], dtype=np.int32)
+    compacted = compact_matrix(matrix)
+    assert compacted.dtype == np.uint32
+    assert np.array_equal(compacted, matrix)
+    assert compact_matrix(compacted) is compacted
+
+
+def test_permutation_dtype():
+    assert permutation_dtype(256) == np.uint8
+    assert permutation_dtype(257) == np.uint16
+    chromosomes = generate_random_chromosomes(3, 300)
+    assert chromosomes.dtype == np.uint16
+    assert all(np.array_equal(np.sort(chromosome), np.arange(300)) for chromosome in chromosomes)
@@ -1,8 +1,15 @@
 import numpy as np
+import pytest
 
+from src.evolutionary_tools.backends import available_backends, get_backend
 from src.evolutionary_tools.chromosome import generate_random_chromosomes
-from src.evolutionary_tools.fitness_function import bulk_basic_fitness_function, basic_fitness_function
-from src.read_data import read_data
+from src.config import FITNESS_CHUNK_SIZE
+from src.evolutionary_tools.fitness_function import bulk_basic_fitness_function, basic_fitness_function, \
+    bulk_incremental_fitness_function, bulk_symmetric_fitness_function, bulk_sparse_fitness_function
+from src.evolutionary_tools.mutation import apply_mutation_to_population, swap_mutation
+from src.evolutionary_tools.recombine import recombine_chromosomes, partially_mapped_crossover
+from src.evolutionary_tools.sparse_flow import build_sparse_flow
+from src.read_data import read_data, is_symmetric_instance
 
 
 def test_bulk_basic_fitness_function():
@@ -19,6 +26,57 @@ def test_bulk_basic_fitness_function():
     assert np.array_equal(fitness_values, expected)
 
 
+def test_bulk_basic_fitness_function_multiple_chunks():
+    flow_matrix, distance_matrix = read_data("tai60a.dat")
+    population = generate_random_chromosomes(FITNESS_CHUNK_SIZE * 2 + 3, 60)
+
+    fitness_values = bulk_basic_fitness_function(flow_matrix, distance_matrix, population)[1]
+
+    expected = [basic_fitness_function(flow_matrix, distance_matrix, chromosome) for chromosome in population]
+    assert np.array_equal(fitness_values, expected)
+
+
+@pytest.mark.parametrize("file", ["chr18b.dat", "tai60a.dat", "tai256c.dat"])
+def test_bulk_symmetric_fitness_function(file):
+    flow_matrix, distance_matrix = read_data(file)
+    population = generate_random_chromosomes(FITNESS_CHUNK_SIZE + 3, flow_matrix.shape[0])
+
+    expected = bulk_basic_fitness_function(flow_matrix, distance_matrix, population)[1]
+    assert np.array_equal(bulk_symmetric_fitness_function(flow_matrix, distance_matrix, population)[1], expected)
+
+
+@pytest.mark.parametrize("file", ["bur26a.dat", "chr18b.dat", "tai256c.dat"])
+def test_sparse_fitness_functions(file):
+    flow_matrix, distance_matrix = read_data(file)
+    population = generate_random_chromosomes(FITNESS_CHUNK_SIZE + 3, flow_matrix.shape[0])
+    sparse_flow = build_sparse_flow(flow_matrix, is_symmetric_instance(flow_matrix, distance_matrix))
+
+    expected = bulk_basic_fitness_function(flow_matrix, distance_matrix, population)[1]
+    assert np.array_equal(bulk_sparse_fitness_function(flow_matrix, distance_matrix, population, sparse_flow=sparse_flow)[1], expected)
+    for backend in available_backends():
+        fitness = get_backend(backend, sparse_flow=sparse_flow).fitness
+        assert [fitness(flow_matrix, distance_matrix, chromosome) for chromosome in population] == list(expected)
+
+
+@pytest.mark.parametrize("file", ["bur26a.dat", "tai60a.dat"])
+def test_bulk_incremental_fitness_function(file):
+    flow_matrix, distance_matrix = read_data(file)
+    number_of_facilities = flow_matrix.shape[0]
+    parents = generate_random_chromosomes(40, number_of_facilities)
+    # Pairs of nearly identical parents, such that the children differ from them in only a few positions
+    parents[1::2] = parents[::2]
+    parents[1::2, [0, 1]] = parents[1::2, [1, 0]]
+    parent_fitness = bulk_basic_fitness_function(flow_matrix, distance_matrix, parents)[1]
+
+    children, reference_chromosomes, reference_fitness, changed_positions = recombine_chromosomes(
+        parents, partially_mapped_crossover, parent_fitness)
+    children = apply_mutation_to_population(children, swap_mutation, 0.5, changed_positions)
+
+    fitness_values = bulk_incremental_fitness_function(flow_matrix, distance_matrix, reference_chromosomes,
+                                                       reference_fitness, children, changed_positions)
+    assert np.array_equal(fitness_values, bulk_basic_fitness_function(flow_matrix, distance_matrix, children)[1])
+
+
 def test_basic_fitness_function_value_of_best():
     flow_matrix, distance_matrix = read_data("tai256c.dat")
 
@@ -28,3 +86,24 @@ def test_basic_fitness_function_value_of_best():
     expected = 44792836
     assert basic_fitness_function(flow_matrix, distance_matrix, chromosome) == expected
 
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backend_fitness_matches_basic_fitness_function(backend):
+    flow_matrix, distance_matrix = read_data("tai256c.dat")
+    population = generate_random_chromosomes(3, 256)
+
+    fitness = get_backend(backend).fitness
+    for chromosome in population:
+        assert fitness(flow_matrix, distance_matrix, chromosome) == basic_fitness_function(flow_matrix, distance_matrix, chromosome)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backend_fitness_value_of_best(backend):
+    flow_matrix, distance_matrix = read_data("tai256c.dat")
+
+    chromosome = [49, 111, 251, 87, 188, 46, 203, 229, 130, 216, 112, 64, 55, 7, 169, 158, 63, 246, 20, 207, 67, 37, 143, 32, 72, 77, 34, 124, 244, 238, 60, 43, 218, 171, 178, 139, 52, 57, 190, 109, 12, 255, 97, 69, 104, 115, 9, 106, 14, 210, 136, 236, 173, 3, 40, 74, 102, 22, 166, 199, 248, 141, 214, 161, 121, 186, 94, 242, 147, 29, 154, 184, 117, 176, 17, 144, 0, 221, 91, 208, 164, 151, 181, 84, 233, 132, 134, 225, 195, 212, 26, 82, 254, 83, 172, 116, 157, 2, 128, 133, 18, 28, 73, 44, 135, 187, 140, 90, 232, 226, 56, 110, 146, 211, 185, 167, 142, 66, 162, 53, 252, 168, 219, 145, 65, 118, 86, 101, 180, 127, 107, 220, 152, 41, 192, 96, 62, 228, 247, 71, 23, 105, 155, 138, 33, 75, 125, 222, 99, 19, 198, 6, 174, 163, 191, 196, 230, 38, 234, 122, 159, 1, 13, 165, 48, 31, 25, 241, 24, 205, 45, 15, 113, 30, 119, 253, 182, 249, 88, 120, 123, 85, 61, 16, 194, 103, 160, 202, 47, 156, 79, 76, 21, 95, 170, 177, 240, 213, 189, 80, 215, 200, 92, 223, 175, 131, 239, 201, 148, 108, 204, 68, 179, 235, 42, 217, 58, 183, 209, 5, 10, 35, 250, 126, 98, 227, 206, 231, 237, 245, 114, 78, 50, 59, 70, 4, 93, 54, 197, 89, 137, 150, 39, 8, 11, 193, 27, 81, 243, 224, 100, 149, 51, 36, 153, 129]
+    chromosome = np.array(chromosome)
+
+    expected = 44792836
+    assert get_backend(backend).fitness(flow_matrix, distance_matrix, chromosome) == expected
+
@@ -1,7 +1,15 @@
 import numpy as np
+import pytest
 
+from src.evolutionary_tools.backends import available_backends, get_backend
 from src.evolutionary_tools.fitness_function import basic_fitness_function
-from src.evolutionary_tools.greedy_optimizations import calculate_delta_cost
+from src.evolutionary_tools.greedy_optimizations import calculate_delta_cost, calculate_delta_matrix, two_opt, \
+    two_opt_delta_matrix, permute_distance_matrix, calculate_delta_rows, swap_and_update_delta_matrix, \
+    bulk_two_opt, calculate_delta_costs, two_opt_dont_look_bits, build_candidate_lists, robust_tabu_search, \
+    simulated_annealing
+from src.evolutionary_tools.metrics import Metrics, use_metrics
+from src.evolutionary_tools.sparse_flow import build_sparse_flow
+from src.read_data import read_data
 
 
 def test_calculate_delta_cost():
@@ -22,5 +30,247 @@ def test_calculate_delta_cost():
     assert computed_delta == expected_delta
 
 
+@pytest.mark.parametrize("backend", available_backends())
+def test_backend_delta_cost(backend):
+    flow = np.array([[0, 10, 1, 1], [10, 0, 1, 1], [1, 1, 0, 1], [1, 1, 1, 0]])
+    distance = np.array([[0, 5, 1, 1], [5, 0, 1, 1], [1, 1, 0, 1], [1, 1, 1, 0]])
+
+    route = np.array([0, 1, 2, 3])
+    new_route = np.array([0, 2, 1, 3])
+
+    computed_delta = get_backend(backend).delta_cost(flow, distance, route, 1, 2)
+    expected_delta = basic_fitness_function(flow, distance, new_route) - basic_fitness_function(flow, distance, route)
+
+    assert computed_delta == expected_delta
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_calculate_delta_cost_matches_reference(backend):
+    flow_matrix, distance_matrix = read_data("bur26a.dat")
+    chromosome = np.random.permutation(26)
+    for i, j in [(0, 5), (3, 25), (12, 13)]:
+        expected = calculate_delta_cost(flow_matrix, distance_matrix, chromosome, i, j)
+        assert get_backend(backend).delta_cost(flow_matrix, distance_matrix, chromosome, i, j) == expected
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_kernels_do_not_overflow_compact_dtypes(backend):
+    # Unsigned uint8 flows and uint16 distances, whose differences wrap around unless computed in int64
+    flow_matrix, distance_matrix = read_data("bur26a.dat")
+    chromosome = np.random.permutation(26)
+    wide_flow, wide_distance = flow_matrix.astype(np.int64), distance_matrix.astype(np.int64)
+    kernels = get_backend(backend)
+    assert kernels.fitness(flow_matrix, distance_matrix, chromosome.astype(np.uint8)) == \
+        kernels.fitness(wide_flow, wide_distance, chromosome)
+    for i, j in [(0, 5), (3, 25), (12, 13)]:
+        assert kernels.delta_cost(flow_matrix, distance_matrix, chromosome.astype(np.uint8), i, j) == \
+            kernels.delta_cost(wide_flow, wide_distance, chromosome, i, j)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_symmetric_kernels_match_general_kernels(backend):
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    chromosome = np.random.permutation(16)
+    kernels, symmetric_kernels = get_backend(backend), get_backend(backend, symmetric=True)
+
+    for i, j in [(0, 15), (3, 7), (5, 5)]:
+        assert symmetric_kernels.delta_cost(flow_matrix, distance_matrix, chromosome, i, j) == \
+            kernels.delta_cost(flow_matrix, distance_matrix, chromosome, i, j)
+    assert np.array_equal(symmetric_kernels.two_opt(flow_matrix, distance_matrix, chromosome),
+                          kernels.two_opt(flow_matrix, distance_matrix, chromosome))
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("file, symmetric", [("bur26a.dat", False), ("chr18b.dat", False), ("chr18b.dat", True)])
+def test_sparse_kernels_match_general_kernels(backend, file, symmetric):
+    flow_matrix, distance_matrix = read_data(file)
+    n = flow_matrix.shape[0]
+    chromosome = np.random.permutation(n)
+    kernels = get_backend(backend)
+    sparse_kernels = get_backend(backend, sparse_flow=build_sparse_flow(flow_matrix, symmetric))
+
+    for i, j in [(0, n - 1), (3, 7), (5, 5)]:
+        assert sparse_kernels.delta_cost(flow_matrix, distance_matrix, chromosome, i, j) == \
+            kernels.delta_cost(flow_matrix, distance_matrix, chromosome, i, j)
+    assert np.array_equal(sparse_kernels.two_opt(flow_matrix, distance_matrix, chromosome),
+                          kernels.two_opt(flow_matrix, distance_matrix, chromosome))
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_two_opt_backends_equivalent(backend):
+    flow_matrix, distance_matrix = read_data("bur26a.dat")
+    for _ in range(3):
+        chromosome = np.random.permutation(26)
+        expected = two_opt(flow_matrix, distance_matrix, chromosome)
+        assert np.array_equal(get_backend(backend).two_opt(flow_matrix, distance_matrix, chromosome), expected)
+
+
+def test_calculate_delta_matrix():
+    # Asymmetric matrices with non-zero diagonals, such that all terms of the delta cost matter
+    flow = np.array([[3, 10, 1, 4], [2, 0, 1, 1], [7, 1, 5, 1], [1, 6, 1, 0]])
+    distance = np.array([[1, 5, 1, 8], [5, 2, 3, 1], [1, 9, 0, 1], [4, 1, 1, 6]])
+    route = np.array([2, 0, 3, 1])
+
+    current_cost = basic_fitness_function(flow, distance, route)
+    delta_matrix = calculate_delta_matrix(flow, distance, route)
+    for i in range(len(route)):
+        for j in range(len(route)):
+            new_route = route.copy()
+            new_route[i], new_route[j] = route[j], route[i]
+            assert delta_matrix[i, j] == basic_fitness_function(flow, distance, new_route) - current_cost
+
+
+def test_swap_and_update_delta_matrix():
+    np.random.seed(0)
+    flow = np.random.randint(0, 10, (7, 7))
+    distance = np.random.randint(0, 10, (7, 7))
+    chromosomes = np.array([np.random.permutation(7) for _ in range(3)])
+
+    permuted_distance = permute_distance_matrix(distance, chromosomes)
+    delta_matrices = calculate_delta_rows(flow, permuted_distance, np.tile(np.arange(7), (3, 1)))
+    swap_and_update_delta_matrix(delta_matrices, flow, distance, chromosomes, permuted_distance, np.array([0, 2, 6]), np.array([3, 5, 1]))
+
+    assert np.array_equal(permuted_distance, permute_distance_matrix(distance, chromosomes))
+    for index, chromosome in enumerate(chromosomes):
+        assert np.array_equal(delta_matrices[index], calculate_delta_matrix(flow, distance, chromosome))
+
+
+def test_two_opt_delta_matrix_same_local_optimum():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    np.random.seed(1)
+    for _ in range(5):
+        chromosome = np.random.permutation(16)
+        expected = two_opt(flow_matrix, distance_matrix, chromosome)
+        assert np.array_equal(two_opt_delta_matrix(flow_matrix, distance_matrix, chromosome), expected)
+
+
+def test_bulk_two_opt_reaches_local_optima():
+    flow_matrix, distance_matrix = read_data("chr18b.dat")
+    np.random.seed(2)
+    chromosomes = np.array([np.random.permutation(18) for _ in range(5)])
+
+    for best_improvement in [True, False]:
+        optimized = bulk_two_opt(flow_matrix, distance_matrix, chromosomes, best_improvement, chunk_size=2)
+        # Chunking must not change the result
+        assert np.array_equal(optimized, bulk_two_opt(flow_matrix, distance_matrix, chromosomes, best_improvement, chunk_size=5))
+        for chromosome, optimized_chromosome in zip(chromosomes, optimized):
+            assert np.array_equal(np.sort(optimized_chromosome), np.arange(18))
+            assert basic_fitness_function(flow_matrix, distance_matrix, optimized_chromosome) <= basic_fitness_function(flow_matrix, distance_matrix, chromosome)
+            assert np.all(calculate_delta_matrix(flow_matrix, distance_matrix, optimized_chromosome) >= 0)
+
+
+
+def test_calculate_delta_costs():
+    np.random.seed(3)
+    flow = np.random.randint(0, 10, (8, 8))
+    distance = np.random.randint(0, 10, (8, 8))
+    chromosome = np.random.permutation(8)
+
+    delta_matrix = calculate_delta_matrix(flow, distance, chromosome)
+    for i in range(8):
+        partners = np.delete(np.arange(8), i)
+        assert np.array_equal(calculate_delta_costs(flow, distance, chromosome, i, partners), delta_matrix[i, partners])
+
+
+def test_two_opt_dont_look_bits_improves():
+    flow_matrix, distance_matrix = read_data("chr18b.dat")
+    np.random.seed(4)
+    for _ in range(3):
+        chromosome = np.random.permutation(18)
+        optimized = two_opt_dont_look_bits(flow_matrix, distance_matrix, chromosome, number_of_iterations=100)
+        assert np.array_equal(np.sort(optimized), np.arange(18))
+        assert basic_fitness_function(flow_matrix, distance_matrix, optimized) < basic_fitness_function(flow_matrix, distance_matrix, chromosome)
+
+
+def test_two_opt_dont_look_bits_scans_only_reset_positions():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    np.random.seed(5)
+    local_optimum = two_opt_dont_look_bits(flow_matrix, distance_matrix, np.random.permutation(16), number_of_iterations=100)
+
+    metrics = Metrics()
+    with use_metrics(metrics):
+        # All bits set: nothing is scanned
+        assert np.array_equal(two_opt_dont_look_bits(flow_matrix, distance_matrix, local_optimum,
+                                                     dont_look_bits=np.ones(16, dtype=bool)), local_optimum)
+        assert metrics.counters["delta_evaluations"] == 0
+
+        # A swap mutation resets the bits of the two swapped positions only
+        child = local_optimum.copy()
+        child[[2, 9]] = child[[9, 2]]
+        dont_look_bits = np.ones(16, dtype=bool)
+        dont_look_bits[[2, 9]] = False
+        optimized = two_opt_dont_look_bits(flow_matrix, distance_matrix, child, dont_look_bits=dont_look_bits)
+    assert basic_fitness_function(flow_matrix, distance_matrix, optimized) <= basic_fitness_function(flow_matrix, distance_matrix, child)
+    assert 2 * 15 <= metrics.counters["delta_evaluations"] < 16 * 15
+
+
+def test_candidate_lists():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    candidate_lists = build_candidate_lists(flow_matrix, distance_matrix, 4)
+
+    assert candidate_lists.flow_neighbours.shape == candidate_lists.location_neighbours.shape == (16, 4)
+    for i in range(16):
+        interaction = flow_matrix[i].astype(np.int64) + flow_matrix[:, i]
+        assert i not in candidate_lists.flow_neighbours[i]
+        assert np.min(interaction[candidate_lists.flow_neighbours[i]]) >= np.max(np.delete(interaction, np.append(candidate_lists.flow_neighbours[i], i)))
+        assert i not in candidate_lists.location_neighbours[i]
+
+    np.random.seed(6)
+    chromosome = np.random.permutation(16)
+    optimized = two_opt_dont_look_bits(flow_matrix, distance_matrix, chromosome, 100, candidate_lists=candidate_lists)
+    assert np.array_equal(np.sort(optimized), np.arange(16))
+    assert basic_fitness_function(flow_matrix, distance_matrix, optimized) < basic_fitness_function(flow_matrix, distance_matrix, chromosome)
+
+
 if __name__ == '__main__':
     test_calculate_delta_cost()
+
+
+def test_robust_tabu_search_escapes_local_optimum():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    chromosome = two_opt_delta_matrix(flow_matrix, distance_matrix, np.random.permutation(16), number_of_iterations=100)
+
+    optimized = robust_tabu_search(flow_matrix, distance_matrix, chromosome, number_of_iterations=200)
+
+    assert np.array_equal(np.sort(optimized), np.arange(16))
+    assert basic_fitness_function(flow_matrix, distance_matrix, optimized) < basic_fitness_function(flow_matrix, distance_matrix, chromosome)
+    assert np.array_equal(optimized, robust_tabu_search(flow_matrix, distance_matrix, chromosome, number_of_iterations=200))
+
+
+def test_robust_tabu_search_budget():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    chromosome = np.random.permutation(16)
+
+    metrics = Metrics()
+    with use_metrics(metrics):
+        robust_tabu_search(flow_matrix, distance_matrix, chromosome, number_of_iterations=25)
+    assert metrics.counters["accepted_swaps"] == 25
+
+    metrics.clear()
+    with use_metrics(metrics):
+        robust_tabu_search(flow_matrix, distance_matrix, chromosome, number_of_iterations=10 ** 9, time_budget=0.05)
+    assert 0 < metrics.counters["accepted_swaps"] < 10 ** 9
+
+
+@pytest.mark.parametrize("cooling_schedule", ["geometric", "linear"])
+def test_simulated_annealing_improves(cooling_schedule):
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    chromosome = np.random.permutation(16)
+
+    metrics = Metrics()
+    with use_metrics(metrics):
+        optimized = simulated_annealing(flow_matrix, distance_matrix, chromosome, number_of_moves=500,
+                                        cooling_schedule=cooling_schedule)
+
+    assert np.array_equal(np.sort(optimized), np.arange(16))
+    assert basic_fitness_function(flow_matrix, distance_matrix, optimized) < basic_fitness_function(flow_matrix, distance_matrix, chromosome)
+    assert np.array_equal(optimized, simulated_annealing(flow_matrix, distance_matrix, chromosome, number_of_moves=500,
+                                                         cooling_schedule=cooling_schedule))
+    assert metrics.counters["local_search_iterations"] == 500
+    assert 0 < metrics.counters["accepted_swaps"] < 500
+
+
+def test_simulated_annealing_invalid_cooling_schedule():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    with pytest.raises(ValueError):
+        simulated_annealing(flow_matrix, distance_matrix, np.arange(16), cooling_schedule="exponential")
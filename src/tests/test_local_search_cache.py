@@ -0,0 +1,71 @@
+import numpy as np
+
+from src.evolutionary_tools.fitness_function import optimize_population, bulk_basic_fitness_function
+from src.evolutionary_tools.local_search_cache import LocalSearchCache, chromosome_key, entry_size
+
+
+def test_local_search_cache_lru_eviction():
+    chromosomes = [np.random.permutation(8) for _ in range(3)]
+    cache = LocalSearchCache(max_bytes=2 * entry_size(chromosomes[0]))
+
+    cache.store(chromosome_key(chromosomes[0]), chromosomes[0], 10)
+    cache.store(chromosome_key(chromosomes[1]), chromosomes[1], 11)
+    # Use the first entry, such that the second one is the least recently used
+    assert cache.lookup(chromosome_key(chromosomes[0]))[1] == 10
+    cache.store(chromosome_key(chromosomes[2]), chromosomes[2], 12)
+
+    assert cache.lookup(chromosome_key(chromosomes[1])) is None
+    assert cache.lookup(chromosome_key(chromosomes[2]))[1] == 12
+    assert cache.statistics() == {"hits": 2, "misses": 1, "evictions": 1, "entries": 2, "used_bytes": 2 * entry_size(chromosomes[0])}
+
+
+def test_optimize_population_skips_cached_and_duplicate_chromosomes():
+    flow = np.random.randint(0, 10, (6, 6))
+    distance = np.random.randint(0, 10, (6, 6))
+    chromosome = np.random.permutation(6)
+    chromosomes = np.array([chromosome, chromosome, np.random.permutation(6)])
+    cache = LocalSearchCache()
+    optimized_counts = []
+
+    def reverse(missing):
+        optimized_counts.append(len(missing))
+        return missing[:, ::-1].copy()
+
+    optimized, fitness = optimize_population(flow, distance, chromosomes, reverse, cache)
+    assert np.array_equal(optimized, chromosomes[:, ::-1])
+    assert np.array_equal(fitness, bulk_basic_fitness_function(flow, distance, chromosomes[:, ::-1])[1])
+
+    optimized_again, fitness_again = optimize_population(flow, distance, chromosomes, reverse, cache)
+    assert np.array_equal(optimized_again, optimized)
+    assert np.array_equal(fitness_again, fitness)
+    assert optimized_counts[0] == len(np.unique(chromosomes, axis=0))
+    assert len(optimized_counts) == 1
+
+
+def test_optimize_population_keys_cache_by_dont_look_bits():
+    flow = np.random.randint(0, 10, (6, 6))
+    distance = np.random.randint(0, 10, (6, 6))
+    chromosomes = np.array([np.random.permutation(6)])
+    cache = LocalSearchCache()
+    searched_bits = []
+
+    def search(missing, dont_look_bits):
+        searched_bits.append(dont_look_bits.copy())
+        # Positions with a set bit stay in place, such that the result depends on the bits
+        optimized = missing.copy()
+        free = np.flatnonzero(~dont_look_bits[0])
+        optimized[0, free] = missing[0, free[::-1]]
+        return optimized
+
+    restricted = np.array([[True, True, False, False, True, True]])
+    unrestricted = np.zeros((1, 6), dtype=bool)
+    optimized_restricted, _ = optimize_population(flow, distance, chromosomes, search, cache, restricted)
+    optimized_unrestricted, _ = optimize_population(flow, distance, chromosomes, search, cache, unrestricted)
+
+    # Different bits miss the cache and return the result of a fresh search
+    assert len(searched_bits) == 2
+    assert np.array_equal(optimized_unrestricted, chromosomes[:, ::-1])
+    assert not np.array_equal(optimized_restricted, optimized_unrestricted)
+    # Without set bits, the key equals that of a search without bits
+    optimize_population(flow, distance, chromosomes, lambda missing: missing[:, ::-1].copy(), cache)
+    assert cache.statistics()["hits"] == 1
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+from src.main import build_argument_parser, config_from_arguments
+from src.solver import SolverConfig
+
+
+def test_config_from_arguments():
+    parser = build_argument_parser()
+    config = config_from_arguments(parser.parse_args([]))
+    assert config.local_search_function == SolverConfig().local_search_function
+    assert config.population_size == SolverConfig().population_size
+
+    arguments = parser.parse_args(["--variant", "standard", "--population-size", "50", "--mutation-prob", "0.3",
+                                   "--no-incremental-evaluation", "--seed", "7", "--local-search", "two_opt_delta_matrix"])
+    config = config_from_arguments(arguments)
+    assert (config.variant, config.population_size, config.mutation_prob) == ("standard", 50, 0.3)
+    assert not config.incremental_evaluation
+    assert (config.seed, config.local_search_function) == (7, "two_opt_delta_matrix")
+    assert config_from_arguments(parser.parse_args(["--profile"])).profile
+
+
+def test_headless_progress_bar():
+    parser = build_argument_parser()
+    assert not config_from_arguments(parser.parse_args(["--headless"])).progress_bar
+    assert config_from_arguments(parser.parse_args(["--headless", "--progress-bar"])).progress_bar
+
+
+def test_headless_run_does_not_import_plotting(tmp_path):
+    code = ("import sys\n"
+            "from src.main import main\n"
+            f"main(['--headless', '--problem', 'nug16a.dat', '--output-dir', {str(tmp_path)!r}, '--population-size', '4',\n"
+            "      '--number-of-generations', '2', '--checkpoint-interval', '0', '--local-search', 'two_opt'])\n"
+            "assert 'matplotlib' not in sys.modules and 'tqdm' not in sys.modules\n")
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+    assert any(file.endswith("_lamarckian.txt") for file in os.listdir(tmp_path))
+    assert not any(file.endswith(".png") for file in os.listdir(tmp_path))
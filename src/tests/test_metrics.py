@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+
+from src.evolutionary_tools.greedy_optimizations import two_opt_delta_matrix
+from src.evolutionary_tools.metrics import Metrics, METRICS
+
+
+def test_phase_and_count():
+    metrics = Metrics()
+    with metrics.phase("selection"):
+        pass
+    with metrics.phase("selection"):
+        pass
+    metrics.count("accepted_swaps", 3)
+    metrics.count("accepted_swaps")
+
+    assert metrics.phase_calls["selection"] == 2
+    assert metrics.phase_seconds["selection"] >= 0
+    assert metrics.counters["accepted_swaps"] == 4
+
+
+def test_merge_and_summary(tmp_path):
+    metrics = Metrics()
+    metrics.count("local_searches", 2)
+    metrics.count("delta_evaluations", 10)
+    other = Metrics()
+    other.count("local_searches", 2)
+    other.count("accepted_swaps", 6)
+    with other.phase("local_search"):
+        pass
+
+    metrics.merge(other.state())
+    summary = metrics.summary()
+
+    assert summary["counters"] == {"local_searches": 4, "delta_evaluations": 10, "accepted_swaps": 6}
+    assert summary["phase_calls"] == {"local_search": 1}
+    assert summary["per_individual"] == {"local_search_iterations": 0, "delta_evaluations": 2.5, "accepted_swaps": 1.5}
+
+    metrics.export(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as file:
+        assert json.load(file) == summary
+
+
+def test_local_search_counters():
+    flow_matrix = np.array([[0, 5, 2], [5, 0, 3], [2, 3, 0]])
+    distance_matrix = np.array([[0, 1, 8], [1, 0, 4], [8, 4, 0]])
+    METRICS.clear()
+
+    two_opt_delta_matrix(flow_matrix, distance_matrix, np.array([0, 1, 2]))
+
+    assert METRICS.counters["local_search_iterations"] >= 1
+    assert METRICS.counters["delta_evaluations"] >= 9
@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.micro_benchmark import Instance, Kernel, compare_to_baseline, time_kernel, MAXIMUM_REPEATS
+
+
+def test_time_kernel():
+    calls = []
+    kernel = Kernel("test", lambda instance: (instance.flow_matrix.shape[0],), calls.append)
+    instance = Instance("test", np.zeros((3, 3)), np.zeros((3, 3)), np.zeros((2, 3)), np.zeros(2))
+    timing = time_kernel(kernel, instance, repeat=4, max_time=10)
+
+    # Fast kernels are repeated until MINIMUM_TIME has passed
+    assert timing["repeats"] == MAXIMUM_REPEATS or timing["repeats"] >= 4
+    assert len(calls) == timing["repeats"] + 1
+    assert 0 <= timing["min"] <= timing["median"]
+
+
+def test_compare_to_baseline():
+    baseline = {"results": {"a@x": {"min": 1.0}, "b@x": {"min": 1.0}}}
+    results = {"results": {"a@x": {"min": 1.2}, "b@x": {"min": 1.5}, "c@x": {"min": 9.0}}}
+
+    assert compare_to_baseline(results, baseline, 0.25) == ["b@x"]
+    assert compare_to_baseline(results, baseline, 0.1) == ["a@x", "b@x"]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.evolutionary_tools.migration import migrate, source_islands
+
+
+def test_source_islands():
+    assert source_islands(0, 4, "ring") == [3]
+    assert source_islands(2, 4, "ring") == [1]
+    assert source_islands(0, 1, "ring") == []
+    assert source_islands(1, 3, "fully_connected") == [0, 2]
+    with pytest.raises(ValueError):
+        source_islands(0, 2, "star")
+
+
+def test_migrate_ring():
+    populations = [np.array([[island, gene] for gene in range(4)]) for island in range(3)]
+    populations_fitness = [np.array([10, 20, 30, 40]) + island for island in range(3)]
+
+    migrate(populations, populations_fitness, 2, "ring")
+
+    # Island 0 replaced its two worst individuals by the two fittest of island 2
+    assert np.array_equal(populations[0], [[0, 0], [0, 1], [2, 1], [2, 0]])
+    assert np.array_equal(populations_fitness[0], [10, 20, 22, 12])
+    assert np.array_equal(populations[1][2:], [[0, 1], [0, 0]])
+
+
+def test_migrate_fully_connected_skips_known_individuals():
+    populations = [np.array([[0, 1], [1, 0], [2, 2]]), np.array([[0, 1], [3, 3], [4, 4]])]
+    populations_fitness = [np.array([1, 5, 9]), np.array([1, 2, 8])]
+
+    migrate(populations, populations_fitness, 2, "fully_connected")
+
+    # [0, 1] is part of both islands, so only one individual migrates in each direction
+    assert np.array_equal(populations[0], [[0, 1], [1, 0], [3, 3]])
+    assert np.array_equal(populations_fitness[0], [1, 5, 2])
+    assert np.array_equal(populations[1], [[0, 1], [3, 3], [1, 0]])
+    assert np.array_equal(populations_fitness[1], [1, 2, 5])
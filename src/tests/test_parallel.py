@@ -0,0 +1,34 @@
+from functools import partial
+
+import numpy as np
+
+from src.evolutionary_tools.greedy_optimizations import apply_local_search, bulk_two_opt, two_opt, two_opt_dont_look_bits
+from src.evolutionary_tools.parallel import parallel_optimize, shutdown_worker_pool
+from src.read_data import read_data
+
+
+def test_parallel_optimize_matches_serial():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    chromosomes = np.array([np.random.permutation(16) for _ in range(7)])
+
+    try:
+        for optimize_chromosomes in [bulk_two_opt, partial(apply_local_search, local_search_function=two_opt)]:
+            expected = optimize_chromosomes(flow_matrix, distance_matrix, chromosomes)
+            optimized = parallel_optimize(flow_matrix, distance_matrix, chromosomes, optimize_chromosomes, 2)
+            assert np.array_equal(optimized, expected)
+    finally:
+        shutdown_worker_pool()
+
+
+def test_parallel_optimize_passes_dont_look_bits():
+    flow_matrix, distance_matrix = read_data("nug16a.dat")
+    chromosomes = np.array([np.random.permutation(16) for _ in range(7)])
+    dont_look_bits = np.random.rand(7, 16) < 0.5
+    optimize_chromosomes = partial(apply_local_search, local_search_function=two_opt_dont_look_bits)
+
+    try:
+        expected = optimize_chromosomes(flow_matrix, distance_matrix, chromosomes, dont_look_bits=dont_look_bits)
+        optimized = parallel_optimize(flow_matrix, distance_matrix, chromosomes, optimize_chromosomes, 2, dont_look_bits)
+        assert np.array_equal(optimized, expected)
+    finally:
+        shutdown_worker_pool()
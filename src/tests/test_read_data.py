@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.read_data import read_data, parse_instance, is_symmetric_instance
+
+
+def test_parse_instance_with_wrapped_rows():
+    content = b"  2\n\n 1 2\n3\n 4\n\t5   6\r\n7 8\n"
+    flow_matrix, distance_matrix = parse_instance(content)
+    assert np.array_equal(flow_matrix, [[1, 2], [3, 4]])
+    assert np.array_equal(distance_matrix, [[5, 6], [7, 8]])
+    assert flow_matrix.dtype == np.int32
+
+    with pytest.raises(ValueError):
+        parse_instance(b"2\n1 2 3 4\n5 6 7\n")
+
+
+@pytest.mark.parametrize("file", ["bur26a.dat", "chr18b.dat", "nug16a.dat", "tai60a.dat", "tai256c.dat"])
+def test_read_data_matches_loadtxt(file):
+    number_of_facilities = int(np.loadtxt(f"data/{file}", max_rows=1))
+    data = np.loadtxt(f"data/{file}", skiprows=1)
+
+    flow_matrix, distance_matrix = read_data(file)
+    assert np.array_equal(flow_matrix, data[:number_of_facilities])
+    assert np.array_equal(distance_matrix, data[number_of_facilities:])
+
+
+def test_read_data_compacts_matrices():
+    flow_matrix, distance_matrix = read_data("tai256c.dat")
+    assert flow_matrix.dtype == np.uint8
+    assert distance_matrix.dtype == np.uint32
+    assert not flow_matrix.flags.writeable
+
+
+def test_read_data_cache(tmp_path):
+    data_folder, cache_folder = tmp_path / "data", tmp_path / "cache"
+    data_folder.mkdir()
+    (data_folder / "tiny.dat").write_bytes(b"2\n0 1\n1 0\n\n0 3\n3 0\n")
+
+    parsed = read_data("tiny.dat", str(data_folder), str(cache_folder))
+    # One file per matrix, cached in its compact type
+    assert len(os.listdir(cache_folder)) == 2
+    cached = read_data("tiny.dat", str(data_folder), str(cache_folder))
+    assert all(np.array_equal(a, b) for a, b in zip(parsed, cached))
+    assert all(a.dtype == b.dtype == np.uint8 for a, b in zip(parsed, cached))
+    assert not cached[0].flags.writeable
+    # The cached matrices are memory-mapped, not copied into memory
+    assert isinstance(cached[0].base, np.memmap)
+
+    # A changed instance is parsed again
+    (data_folder / "tiny.dat").write_bytes(b"2\n0 2\n2 0\n\n0 3\n3 0\n")
+    assert np.array_equal(read_data("tiny.dat", str(data_folder), str(cache_folder))[0], [[0, 2], [2, 0]])
+    assert len(os.listdir(cache_folder)) == 4
+
+
+def test_is_symmetric_instance():
+    assert is_symmetric_instance(*read_data("nug16a.dat"))
+    assert is_symmetric_instance(*read_data("tai256c.dat"))
+    assert not is_symmetric_instance(*read_data("bur26a.dat"))
+
+    symmetric = np.array([[0, 1], [1, 2]])
+    assert is_symmetric_instance(symmetric, np.array([[0, 3], [3, 0]]))
+    # Both diagonals nonzero: each facility contributes a cost on its own
+    assert not is_symmetric_instance(symmetric, np.array([[1, 3], [3, 1]]))
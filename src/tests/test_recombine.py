@@ -1,8 +1,10 @@
 from unittest.mock import patch
 
 import numpy as np
+import pytest
 
-from src.evolutionary_tools.recombine import partially_mapped_crossover, order_crossing
+from src.evolutionary_tools.recombine import partially_mapped_crossover, order_crossing, track_changes_to_parents, \
+    bulk_partially_mapped_crossover, bulk_order_crossing, recombine_chromosomes
 
 
 def test_order_crossing():
@@ -55,3 +57,48 @@ def test_partially_mapped_crossover_two():
         child_one, child_two = partially_mapped_crossover(parent_one, parent_two)
         assert np.array_equal(child_one, expected_child_one)
         assert np.array_equal(child_two, expected_child_two)
+
+
+@pytest.mark.parametrize("recombination_function", [order_crossing, partially_mapped_crossover])
+def test_crossover_of_compact_chromosomes(recombination_function):
+    # 256 genes use every value of uint8, so the -1 padding of the children does not fit the type of the parents
+    parent_one, parent_two = np.random.permutation(256).astype(np.uint8), np.random.permutation(256).astype(np.uint8)
+    for child in recombination_function(parent_one, parent_two):
+        assert child.dtype == np.uint8
+        assert np.array_equal(np.sort(child), np.arange(256))
+
+
+def test_track_changes_to_parents():
+    parents = np.array([[0, 1, 2, 3, 4, 5], [5, 4, 3, 2, 1, 0]])
+    parent_fitness = np.array([10, 20])
+    children = np.array([[5, 4, 3, 2, 0, 1], [0, 1, 2, 3, 4, 5]])
+
+    reference_chromosomes, reference_fitness, changed_positions = track_changes_to_parents(parents, parent_fitness, children)
+    assert np.array_equal(reference_chromosomes, parents[[1, 0]])
+    assert np.array_equal(reference_fitness, [20, 10])
+    assert np.array_equal(changed_positions, [[False, False, False, False, True, True], [False] * 6])
+
+
+@pytest.mark.parametrize("recombination_function, bulk_recombination_function", [
+    (order_crossing, bulk_order_crossing),
+    (partially_mapped_crossover, bulk_partially_mapped_crossover),
+])
+def test_bulk_recombination_matches_pairwise(recombination_function, bulk_recombination_function):
+    parents = np.array([np.random.permutation(20) for _ in range(40)])
+    crossover_points = np.array([np.sort(np.random.choice(20, 2, replace=False)) for _ in range(20)])
+
+    children = bulk_recombination_function(parents, crossover_points)
+    for pair in range(20):
+        with patch("numpy.random.choice", return_value=crossover_points[pair].copy()):
+            expected = recombination_function(parents[2 * pair], parents[2 * pair + 1])
+        assert np.array_equal(children[2 * pair], expected[0])
+        assert np.array_equal(children[2 * pair + 1], expected[1])
+
+
+@pytest.mark.parametrize("bulk_recombination_function", [bulk_order_crossing, bulk_partially_mapped_crossover])
+def test_recombine_chromosomes_bulk(bulk_recombination_function):
+    parents = np.array([np.random.permutation(30) for _ in range(10)])
+
+    children = recombine_chromosomes(parents, bulk_recombination_function)
+    assert children.shape == parents.shape
+    assert np.array_equal(np.sort(children, axis=1), np.sort(parents, axis=1))
@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.checkpoint import load_checkpoint
+from src.run_log import GenerationRecord, RunLogReader, RunLogWriter, population_statistics, read_run_log
+from src.solver import Solver, SolverConfig
+
+
+def test_population_statistics():
+    population = np.array([[0, 1, 2], [2, 1, 0], [0, 1, 2]])
+    assert population_statistics(population, np.array([4, 8, 6])) == (4, 6.0, 8, 2)
+
+
+def test_reader_returns_only_new_complete_records(tmp_path):
+    path = str(tmp_path / "run.csv")
+    reader = RunLogReader(path)
+    with RunLogWriter(path) as run_log:
+        run_log.write(GenerationRecord(0, 10, 12.5, 15, 3, 0.0, 0.0))
+        run_log.file.flush()
+        assert reader.read() == [GenerationRecord(0, 10, 12.5, 15, 3, 0.0, 0.0)]
+
+        # A partially written record is returned once it is complete
+        run_log.file.write("1,9,11.0")
+        run_log.file.flush()
+        assert reader.read() == []
+        run_log.file.write(",14,2,0.5,0.5\n")
+    assert reader.read() == [GenerationRecord(1, 9, 11.0, 14, 2, 0.5, 0.5)]
+    assert reader.read() == []
+
+
+def test_resumed_run_log_matches_uninterrupted_one(tmp_path):
+    solver = Solver(SolverConfig("standard", "bulk_basic", "roulette_wheel", "bulk_order", "swap", population_size=8,
+                                 number_of_generations=12, checkpoint_interval=5, seed=0))
+    checkpoint_path, run_log_path = str(tmp_path / "run.checkpoint.npz"), str(tmp_path / "run.csv")
+
+    _, _, best_fitness_each_generation, _, _ = solver.solve("nug16a.dat", checkpoint_path=checkpoint_path, run_log_path=run_log_path)
+    records = read_run_log(run_log_path)
+    assert [record.generation for record in records] == list(range(13))
+    assert [record.best_fitness for record in records] == best_fitness_each_generation
+
+    # The records after the checkpoint (generation 10) are replaced by the ones of the resumed run
+    solver.solve("nug16a.dat", resume_checkpoint=load_checkpoint(checkpoint_path), run_log_path=run_log_path)
+    resumed_records = read_run_log(run_log_path)
+    assert [record[:5] for record in resumed_records] == [record[:5] for record in records]
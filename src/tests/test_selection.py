@@ -1,8 +1,11 @@
 from unittest.mock import patch
 
 import numpy as np
+import pytest
 
-from src.evolutionary_tools.selection import tournament_selection_two_tournament, tournament_selection_two_tournament_bulk
+from src.evolutionary_tools.selection import tournament_selection_two_tournament, tournament_selection_two_tournament_bulk, \
+    stochastic_universal_sampling_selection, tournament_selection_k_tournament_no_duplicates_unbiased, \
+    draw_tournaments_without_duplicates, replace_equal_parents, roulette_wheel_selection
 
 
 def test_tournament_selection_two_tournament():
@@ -45,3 +48,45 @@ def test_tournament_selection_two_tournament_bulk():
         with patch("numpy.random.rand", return_value=mocked_rand):
             selected_chromosomes = tournament_selection_two_tournament_bulk(population, population_fitness, 2)
     assert np.array_equal(selected_chromosomes, expected_selected_chromosomes)
+
+
+def test_stochastic_universal_sampling_selection():
+    population = np.arange(4)[:, np.newaxis]
+    population_fitness = np.array([1, 1, 2, 4])
+
+    # Every chromosome is selected floor or ceil of its expected number of times
+    for _ in range(20):
+        counts = np.bincount(stochastic_universal_sampling_selection(population, population_fitness, 2)[:, 0], minlength=4)
+        assert counts[0] + counts[1] == 1
+        assert np.array_equal(counts[2:], [1, 2])
+
+
+def test_draw_tournaments_without_duplicates():
+    for population_size, tournament_size in [(100, 5), (10, 10), (20, 10)]:
+        tournaments = draw_tournaments_without_duplicates(population_size, tournament_size)
+        assert tournaments.shape == (population_size, tournament_size)
+        assert np.all(np.diff(np.sort(tournaments, axis=1), axis=1) > 0)
+        assert tournaments.min() >= 0 and tournaments.max() < population_size
+
+    with pytest.raises(ValueError, match="Tournament size 11 exceeds population size 10"):
+        draw_tournaments_without_duplicates(10, 11)
+
+
+def test_tournament_selection_k_tournament_no_duplicates_unbiased():
+    population = np.arange(5)[:, np.newaxis]
+    population_fitness = np.array([3, 1, 4, 0, 2])
+
+    # With p = 0 the first fighter after sorting by fitness always wins, with p = 1 the last one
+    assert np.all(tournament_selection_k_tournament_no_duplicates_unbiased(population, population_fitness, 5, p=0) == 3)
+    assert np.all(tournament_selection_k_tournament_no_duplicates_unbiased(population, population_fitness, 5, p=1) == 2)
+
+
+def test_replace_equal_parents():
+    population = np.array([np.random.permutation(10) for _ in range(20)])
+    population_fitness = np.arange(1, 21)
+    selected_chromosomes = population[np.repeat(np.arange(10), 2)]
+
+    selected_chromosomes = replace_equal_parents(selected_chromosomes, population, population_fitness, roulette_wheel_selection, 2)
+    assert not np.any(np.all(selected_chromosomes[0::2] == selected_chromosomes[1::2], axis=1))
+    # The first parent of each pair is kept
+    assert np.array_equal(selected_chromosomes[0::2], population[:10])
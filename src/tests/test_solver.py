@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+
+import src.solver
+
+from src.evolutionary_tools import parallel
+from src.solver import Solver, SolverConfig
+
+
+def test_seeded_solve_is_repeatable():
+    solver = Solver(SolverConfig("lamarckian", "bulk_basic", "roulette_wheel", "bulk_partially_mapped", "swap",
+                                 "two_opt_delta_matrix", population_size=6, number_of_generations=4, seed=5))
+
+    first = solver.solve("nug16a.dat")
+    second = solver.solve("nug16a.dat")
+
+    assert np.array_equal(first.best_chromosome, second.best_chromosome)
+    assert first.best_fitness_each_generation == second.best_fitness_each_generation
+
+
+def test_concurrent_solves_are_independent():
+    configs = [SolverConfig(variant, "bulk_basic", "tournament_k_bulk", "bulk_order", "swap", "two_opt_delta_matrix",
+                            population_size=6, number_of_generations=5, seed=seed)
+               for variant, seed in [("standard", 1), ("lamarckian", 2), ("baldwinian", 3), ("lamarckian", 2)]]
+    sequential = [Solver(config).solve("nug16a.dat") for config in configs]
+
+    solvers = [Solver(config) for config in configs]
+    with ThreadPoolExecutor(max_workers=len(solvers)) as executor:
+        concurrent = list(executor.map(lambda solver: solver.solve("nug16a.dat"), solvers))
+
+    for expected, result in zip(sequential, concurrent):
+        assert np.array_equal(result.best_chromosome, expected.best_chromosome)
+        assert result.best_fitness_each_generation == expected.best_fitness_each_generation
+    # Each solver counts only its own local searches
+    assert solvers[0].metrics.counters.get("local_searches", 0) == 0
+    assert solvers[1].metrics.counters["local_searches"] == solvers[3].metrics.counters["local_searches"] > 0
+
+
+def test_sparse_kernels_do_not_change_the_result():
+    config = SolverConfig("standard", "bulk_basic", "tournament_k_bulk", "bulk_order", "swap", population_size=8,
+                          number_of_generations=5, incremental_evaluation=False, seed=4)
+    sparse = Solver(config).solve("chr18b.dat")
+    dense = Solver(replace(config, sparse_flow_density=0)).solve("chr18b.dat")
+
+    assert np.array_equal(sparse.best_chromosome, dense.best_chromosome)
+    assert sparse.best_fitness_each_generation == dense.best_fitness_each_generation
+
+
+def test_inherited_dont_look_bits_reduce_delta_evaluations(monkeypatch):
+    config = SolverConfig("lamarckian", "bulk_basic", "roulette_wheel", "bulk_partially_mapped", "swap", "two_opt_dont_look_bits",
+                          population_size=8, number_of_generations=6, seed=7)
+    inherited = Solver(config)
+    inherited.solve("chr18b.dat")
+
+    monkeypatch.setattr(src.solver, "inherits_dont_look_bits", lambda config: False)
+    scanned = Solver(config)
+    scanned.solve("chr18b.dat")
+
+    assert inherited.metrics.counters["local_searches"] > 0
+    assert (inherited.metrics.summary()["per_individual"]["delta_evaluations"] <
+            scanned.metrics.summary()["per_individual"]["delta_evaluations"])
+
+
+def test_island_solve_uses_only_its_own_cache_and_pool(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("The default worker pool was used by a solver")
+
+    monkeypatch.setattr(parallel.DEFAULT_WORKER_POOL, "get", fail)
+    config = SolverConfig("lamarckian", "bulk_basic", "roulette_wheel", "bulk_partially_mapped", "swap", "two_opt_delta_matrix",
+                          population_size=6, number_of_generations=50, number_of_islands=2, migration_interval=5,
+                          number_of_workers=2, max_generations_without_improvement=1, seed=3, checkpoint_interval=0,
+                          progress_bar=False)
+    solver = Solver(config)
+    result = solver.solve("nug16a.dat")
+
+    # The final evaluation of the fittest individual of the early stopped run is cached by the solver
+    assert result.stop_reason == "stagnation"
+    assert len(solver.cache) > 0
+    assert result.best_fitness == min(result.best_fitness_each_generation)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.evolutionary_tools.sparse_flow import build_sparse_flow, flow_density, flow_edges
+from src.read_data import read_data
+
+
+def test_build_sparse_flow():
+    flow_matrix = np.array([[0, 2, 0], [0, 0, 3], [4, 0, 5]])
+    sparse_flow = build_sparse_flow(flow_matrix)
+
+    dense = np.zeros_like(flow_matrix)
+    transposed = np.zeros_like(flow_matrix)
+    for row in range(3):
+        entries = slice(sparse_flow.indptr[row], sparse_flow.indptr[row + 1])
+        dense[row, sparse_flow.indices[entries]] = sparse_flow.data[entries]
+        entries = slice(sparse_flow.transposed_indptr[row], sparse_flow.transposed_indptr[row + 1])
+        transposed[row, sparse_flow.transposed_indices[entries]] = sparse_flow.transposed_data[entries]
+
+    assert np.array_equal(dense, flow_matrix)
+    assert np.array_equal(transposed, flow_matrix.T)
+    assert flow_density(flow_matrix) == 4 / 9
+
+
+def test_flow_edges_of_symmetric_instance():
+    flow_matrix, _ = read_data("chr18b.dat")
+    sources, targets, weights = flow_edges(build_sparse_flow(flow_matrix, symmetric=True))
+
+    assert np.all(sources < targets)
+    assert weights.sum() == flow_matrix.sum()
@@ -0,0 +1,57 @@
+import pytest
+
+from src.solver import Solver, SolverConfig, count_generations_without_improvement, stop_reason
+
+
+def test_count_generations_without_improvement():
+    assert count_generations_without_improvement([10]) == 0
+    assert count_generations_without_improvement([10, 8, 8, 8]) == 2
+    assert count_generations_without_improvement([10, 9, 8, 7]) == 0
+
+
+def test_stop_reason():
+    config = SolverConfig(time_budget=0, target_fitness=0, max_generations_without_improvement=0, max_fitness_evaluations=0)
+    assert stop_reason(config, 5, 1000, 1e6, 10 ** 9) is None
+
+    config = SolverConfig(time_budget=0, target_fitness=5, max_generations_without_improvement=0, max_fitness_evaluations=0)
+    assert stop_reason(config, 6, 0, 0.0, 0) is None
+    assert stop_reason(config, 5, 0, 0.0, 0) == "target_fitness"
+
+    config = SolverConfig(time_budget=2.5, target_fitness=5, max_generations_without_improvement=10, max_fitness_evaluations=100)
+    assert stop_reason(config, 6, 10, 0.0, 0) == "stagnation"
+    assert stop_reason(config, 6, 0, 2.5, 0) == "time_budget"
+    assert stop_reason(config, 6, 0, 0.0, 99) is None
+    assert stop_reason(config, 6, 0, 0.0, 100) == "fitness_evaluations"
+
+
+@pytest.mark.parametrize("criterion, value, reason", [
+    ("max_generations_without_improvement", 3, "stagnation"),
+    ("max_fitness_evaluations", 8 * 5, "fitness_evaluations"),
+    ("target_fitness", 10 ** 9, "target_fitness"),
+])
+def test_evolution_loop_stops_early(criterion, value, reason):
+    config = SolverConfig("standard", "bulk_basic", "roulette_wheel", "bulk_order", "swap", population_size=8,
+                          number_of_generations=200, seed=0, **{criterion: value})
+
+    _, best_fitness, best_fitness_each_generation, time_per_generation, stopped_by = Solver(config).solve("nug16a.dat")
+
+    assert stopped_by == reason
+    assert len(time_per_generation) < 200
+    assert best_fitness == min(best_fitness_each_generation)
+    if reason == "stagnation":
+        assert count_generations_without_improvement(best_fitness_each_generation) == 3
+    elif reason == "fitness_evaluations":
+        assert len(time_per_generation) == 4
+    else:
+        assert len(time_per_generation) == 0
+
+
+def test_island_loop_stops_early():
+    config = SolverConfig(number_of_islands=2, migration_interval=5, max_generations_without_improvement=1, population_size=8,
+                          number_of_generations=50, seed=1, checkpoint_interval=0, progress_bar=False)
+
+    _, best_fitness, best_fitness_each_generation, time_per_generation, stopped_by = Solver(config).solve("nug16a.dat")
+
+    assert stopped_by == "stagnation"
+    assert len(time_per_generation) < 50
+    assert best_fitness <= min(best_fitness_each_generation)